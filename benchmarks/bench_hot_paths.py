@@ -0,0 +1,282 @@
+"""
+Microbenchmarks for the bot's hot paths.
+
+Measures throughput and memory allocation of get_local_time, build_keyboard,
+inline city search, a full-catalogue /convert and a full button_handler dispatch (with lightweight fake Update and
+CallbackQuery objects) over synthetic catalogues of increasing size.
+
+Usage:
+    python benchmarks/bench_hot_paths.py                      # print results
+    python benchmarks/bench_hot_paths.py --save baseline.json # write a baseline
+    python benchmarks/bench_hot_paths.py --compare baseline.json --tolerance 0.2
+
+With --compare the exit status is 1 when any benchmark's throughput drops
+by more than the tolerance relative to the baseline.
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import logging
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Keep logs, favorites and the update offset out of files in the checkout
+os.environ.setdefault("LOG_FILE", "")
+os.environ.setdefault("FAVORITES_DB", "")
+os.environ.setdefault("OFFSET_FILE", "")
+
+import bot_enhanced  # noqa: E402
+
+DEFAULT_SIZES = (100, 1_000, 10_000, 100_000)
+ZONES = sorted(set(bot_enhanced.CITY_TIMEZONES.values()))
+
+
+# ---------------------- FAKES ----------------------
+class FakeUser:
+    def __init__(self, user_id):
+        self.id = user_id
+        self.username = f"user{user_id}"
+        self.first_name = "Bench"
+
+
+class FakeMessage:
+    chat_id = 1
+    message_id = 1
+
+    async def reply_text(self, text, **kwargs):
+        return None
+
+
+class FakeCallbackQuery:
+    def __init__(self, data, user):
+        self.data = data
+        self.from_user = user
+        self.message = FakeMessage()
+        self.inline_message_id = None
+
+    async def answer(self, *args, **kwargs):
+        return True
+
+    async def edit_message_reply_markup(self, reply_markup=None, **kwargs):
+        return True
+
+
+class FakeUpdate:
+    def __init__(self, query):
+        self.callback_query = query
+
+
+# ---------------------- HARNESS ----------------------
+def synthetic_catalogue(size: int) -> dict:
+    """Return a catalogue of `size` cities spread over the real zones."""
+    return {f"City {i:06d}": ZONES[i % len(ZONES)] for i in range(size)}
+
+
+def install_catalogue(cities: dict) -> float:
+    """Swap in a catalogue and return the seconds spent rebuilding caches."""
+    bot_enhanced.CITY_TIMEZONES.clear()
+    bot_enhanced.CITY_TIMEZONES.update(cities)
+    started = time.perf_counter()
+    bot_enhanced.rebuild_keyboard_cache()
+    return time.perf_counter() - started
+
+
+def measure(func, ops: int, rounds: int) -> dict:
+    """Time `func(ops)` over several rounds and sample its allocations once."""
+    func(min(ops, 100))  # warm up
+    timings = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        func(ops)
+        timings.append(time.perf_counter() - started)
+    best = min(timings)
+
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    func(ops)
+    after, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "ops": ops,
+        "ops_per_sec": round(ops / best, 1),
+        "mean_us": round(best / ops * 1e6, 3),
+        "peak_alloc_bytes": peak - before,
+        "retained_bytes_per_op": round((after - before) / ops, 2),
+    }
+
+
+def bench_get_local_time(cities: list):
+    cycle = itertools.cycle(cities)
+
+    def run(ops):
+        for _ in range(ops):
+            bot_enhanced.get_local_time(next(cycle))
+
+    return run
+
+
+def bench_build_keyboard(pages: int):
+    cycle = itertools.cycle(range(0, pages, max(1, pages // 997)))
+
+    def run(ops):
+        for _ in range(ops):
+            bot_enhanced.build_keyboard(next(cycle))
+
+    return run
+
+
+def bench_search(cities: list):
+    bot_enhanced.search_cities("")  # build the index outside the timed loop
+    queries = [city[:length] for city in cities[:200] for length in (3, 5, 8)] + ["torotno", "zzz"]
+    cycle = itertools.cycle(queries)
+
+    def run(ops):
+        for _ in range(ops):
+            bot_enhanced.search_cities(next(cycle))
+
+    return run
+
+
+def bench_convert(cities: list):
+    bot_enhanced.zone_groups()  # group the catalogue outside the timed loop
+    requests = itertools.cycle(f"3:30pm {city}" for city in cities[:50])
+
+    def run(ops):
+        for _ in range(ops):
+            bot_enhanced.convert_time(next(requests))
+
+    return run
+
+
+def bench_button_handler(cities: list, pages: int):
+    loop = asyncio.new_event_loop()
+    user = FakeUser(1)
+    data = itertools.cycle(
+        [bot_enhanced.city_data("city", city) for city in cities[:500]]
+        + [bot_enhanced.callbacks.page_data(page) for page in range(min(pages, 500))]
+    )
+    handler = bot_enhanced.button_handler
+    bot_enhanced.EDITS.window = 0  # send edits inline so they are part of the measurement
+
+    async def dispatch(ops):
+        for _ in range(ops):
+            await handler(FakeUpdate(FakeCallbackQuery(next(data), user)), None)
+
+    def run(ops):
+        loop.run_until_complete(dispatch(ops))
+
+    return run
+
+
+def run_benchmarks(sizes, ops: int, rounds: int) -> dict:
+    original = dict(bot_enhanced.CITY_TIMEZONES)
+    results = {}
+    try:
+        for size in sizes:
+            rebuild = install_catalogue(synthetic_catalogue(size))
+            cities = list(bot_enhanced.CITY_TIMEZONES)
+            pages = bot_enhanced.page_count()
+            results[f"rebuild_keyboard_cache[n={size}]"] = {
+                "ops": 1, "ops_per_sec": round(1 / rebuild, 3), "mean_us": round(rebuild * 1e6, 1),
+            }
+            results[f"get_local_time[n={size}]"] = measure(bench_get_local_time(cities), ops, rounds)
+            results[f"build_keyboard[n={size}]"] = measure(bench_build_keyboard(pages), ops, rounds)
+            results[f"search_cities[n={size}]"] = measure(bench_search(cities), ops, rounds)
+            results[f"convert_all[n={size}]"] = measure(bench_convert(cities), max(1, ops // 1000), rounds)
+            results[f"button_handler[n={size}]"] = measure(
+                bench_button_handler(cities, pages), max(1, ops // 10), rounds
+            )
+            print(f"  catalogue of {size:>7} cities done", file=sys.stderr)
+    finally:
+        install_catalogue(original)
+    return results
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    """Return (name, baseline ops/s, current ops/s, change) for regressions."""
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if not previous:
+            continue
+        change = current["ops_per_sec"] / previous["ops_per_sec"] - 1
+        if change < -tolerance:
+            regressions.append((name, previous["ops_per_sec"], current["ops_per_sec"], change))
+    return regressions
+
+
+def print_table(results: dict, baseline: dict = None):
+    header = f"{'benchmark':<36} {'ops/s':>14} {'mean µs':>10} {'peak KiB':>10}"
+    if baseline:
+        header += f" {'vs base':>9}"
+    print(header)
+    print("-" * len(header))
+    for name, row in results.items():
+        line = (
+            f"{name:<36} {row['ops_per_sec']:>14,.1f} {row['mean_us']:>10.2f} "
+            f"{row.get('peak_alloc_bytes', 0) / 1024:>10.1f}"
+        )
+        if baseline and name in baseline:
+            line += f" {row['ops_per_sec'] / baseline[name]['ops_per_sec'] - 1:>+9.1%}"
+        print(line)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=lambda s: [int(x) for x in s.split(",")], default=DEFAULT_SIZES,
+                        help="comma-separated catalogue sizes (default: 100,1000,10000,100000)")
+    parser.add_argument("--ops", type=int, default=20_000, help="operations per round")
+    parser.add_argument("--rounds", type=int, default=5, help="timing rounds; the best is kept")
+    parser.add_argument("--save", metavar="PATH", help="write results as a JSON baseline")
+    parser.add_argument("--compare", metavar="PATH", help="compare against a JSON baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="allowed relative throughput drop before failing (default: 0.2)")
+    parser.add_argument("--with-logging", action="store_true",
+                        help="keep INFO logging enabled inside the handlers")
+    args = parser.parse_args(argv)
+
+    if not args.with_logging:
+        logging.getLogger().setLevel(logging.WARNING)
+
+    results = run_benchmarks(args.sizes, args.ops, args.rounds)
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as fh:
+            baseline = json.load(fh)["results"]
+    print_table(results, baseline)
+
+    if args.save:
+        payload = {
+            "meta": {
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "created": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+                "ops": args.ops,
+                "rounds": args.rounds,
+            },
+            "results": results,
+        }
+        with open(args.save, "w", encoding="utf-8") as fh:
+            json.dump(payload, fh, indent=2)
+        print(f"\n💾 Baseline written to {args.save}")
+
+    if baseline:
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f"\n❌ {len(regressions)} benchmark(s) regressed by more than {args.tolerance:.0%}:")
+            for name, before, after, change in regressions:
+                print(f"  {name}: {before:,.1f} -> {after:,.1f} ops/s ({change:+.1%})")
+            return 1
+        print("\n✅ No regressions against baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,138 @@
+"""
+World-clock board for /board.
+
+The board lists every city grouped by its current UTC offset, with the
+local time shown once per group. ZoneGroups indexes the catalogue by zone
+once, so rendering an instant computes one offset per distinct zone rather
+than one per city, and the finished board is split into message-sized
+chunks when it is rendered. BoardCache keeps the chunks for the current
+(catalogue version, minute), so every /board in that minute, however many
+arrive at once, shares a single render.
+"""
+
+import heapq
+from datetime import datetime, timedelta, timezone
+
+from telegram.helpers import escape_markdown
+
+MESSAGE_LIMIT = 4096  # characters Telegram allows in one message
+SEPARATOR = ", "
+
+
+def format_offset(offset: timedelta) -> str:
+    """UTC offset as text: timedelta(hours=-3, minutes=-30) -> "UTC−03:30"."""
+    minutes = int(offset.total_seconds()) // 60
+    sign = "+" if minutes >= 0 else "−"
+    hours, minutes = divmod(abs(minutes), 60)
+    return f"UTC{sign}{hours:02d}:{minutes:02d}"
+
+
+class ZoneGroups:
+    """City names indexed by IANA zone, keeping their given order."""
+
+    def __init__(self, names, zone_of):
+        self.names = names
+        self.zones = {}  # zone -> positions in names
+        for position, name in enumerate(names):
+            self.zones.setdefault(zone_of(name), []).append(position)
+        self._lines = {}  # zones tuple -> rendered, escaped city list
+
+    def by_offset(self, local_time, timestamp: float) -> list:
+        """Return [(utc offset, local datetime, zones)] at timestamp, west to east.
+
+        local_time(zone, timestamp) returns an aware datetime, e.g.
+        tztables.ZoneTables.localtime.
+        """
+        offsets = {}
+        for zone in self.zones:
+            local = local_time(zone, timestamp)
+            entry = offsets.setdefault(local.utcoffset(), (local, []))
+            entry[1].append(zone)
+        return [(offset, offsets[offset][0], tuple(offsets[offset][1])) for offset in sorted(offsets)]
+
+    def names_in(self, zones) -> list:
+        """Names of the cities in zones, in their given order."""
+        lists = [self.zones[zone] for zone in zones]
+        positions = lists[0] if len(lists) == 1 else heapq.merge(*lists)
+        return [self.names[position] for position in positions]
+
+    def line(self, zones) -> str:
+        """The escaped, comma-separated city list of zones.
+
+        Which zones share an offset only changes at DST transitions, so each
+        combination is rendered once.
+        """
+        text = self._lines.get(zones)
+        if text is None:
+            text = self._lines[zones] = escape_markdown(SEPARATOR.join(self.names_in(zones)))
+        return text
+
+
+def render_offsets(title: str, groups: ZoneGroups, local_time, timestamp: float, limit: int = MESSAGE_LIMIT) -> list:
+    """Render every city at timestamp under its offset's local time, as message chunks."""
+    lines = [title, ""]
+    for offset, local, zones in groups.by_offset(local_time, timestamp):
+        lines.append(f"🕐 **{local:%I:%M %p}** ({format_offset(offset)})")
+        lines.append(groups.line(zones))
+        lines.append("")
+    return split_message(lines[:-1], limit)
+
+
+def render_board(groups: ZoneGroups, local_time, timestamp: float, limit: int = MESSAGE_LIMIT) -> list:
+    """Render the world clock at timestamp as a list of message chunks."""
+    utc = datetime.fromtimestamp(timestamp, timezone.utc)
+    return render_offsets(f"🌍 **World clock** - {utc:%H:%M} UTC", groups, local_time, timestamp, limit)
+
+
+def split_message(lines, limit: int = MESSAGE_LIMIT) -> list:
+    """Join lines into chunks of at most limit characters, breaking between lines.
+
+    A line longer than limit is broken between city names.
+    """
+    chunks = []
+    current = ""
+    for line in lines:
+        for piece in _pieces(line, limit):
+            candidate = f"{current}\n{piece}" if current else piece
+            if len(candidate) <= limit:
+                current = candidate
+            else:
+                chunks.append(current)
+                current = piece
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def _pieces(line: str, limit: int):
+    start = 0
+    while len(line) - start > limit:
+        cut = line.rfind(SEPARATOR, start, start + limit)
+        if cut <= start:
+            # A single name longer than a message.
+            yield line[start:start + limit]
+            start += limit
+        else:
+            yield line[start:cut]
+            start = cut + len(SEPARATOR)
+    yield line[start:]
+
+
+class BoardCache:
+    """Holds the board for the current (catalogue version, minute)."""
+
+    def __init__(self, render):
+        self.render = render  # epoch seconds of the minute -> list of chunks
+        self.renders = 0
+        self._key = None
+        self._chunks = ()
+
+    def get(self, version, timestamp: float) -> tuple:
+        """Return the chunks for timestamp's minute, rendering them on the first request."""
+        minute = int(timestamp // 60)
+        key = (version, minute)
+        if key != self._key:
+            self._chunks = tuple(self.render(minute * 60))
+            self._key = key
+            self.renders += 1
+        return self._chunks
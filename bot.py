@@ -115,7 +115,7 @@ CITY_TIMEZONES = {
     "Saanich": "America/Vancouver",
     "Terrebonne": "America/Toronto",
     "Milton": "America/Toronto",
-    "St. John’s": "America/St_Johns",
+    "St. John's": "America/St_Johns",
     "Thunder Bay": "America/Toronto",
     "Waterloo": "America/Toronto",
 }
@@ -1,20 +1,107 @@
+import asyncio
+import collections
+import functools
 import logging
 import os
+import signal
+import sys
+import time
 from datetime import datetime
 import pytz
-from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
+from telegram import (
+    Update,
+    InlineKeyboardButton,
+    InlineKeyboardMarkup,
+    InlineQueryResultArticle,
+    InputTextMessageContent,
+)
+from telegram.helpers import escape_markdown
 from telegram.ext import (
     Application,
     CommandHandler,
     CallbackQueryHandler,
     ContextTypes,
+    InlineQueryHandler,
+    TypeHandler,
 )
 
+from board import BoardCache, ZoneGroups, render_board, render_offsets
+import callbacks
+from callbacks import CallbackCodec
+from catalogue import MappedCatalogue, menu_order
+from concurrency import ChatOrderedApplication
+from convert import describe_note, parse_request, source_instant
+from edits import EditCoalescer, message_key
+from favorites import FavoritesStore
+from health import HEALTH, add_health_routes
+from httpd import HTTPServer
+from log_setup import parse_sample_rates, setup_logging
+from metrics import ERRORS, REGISTRY, UPDATES, InstrumentedRequest, add_metrics_route, timed
+from offsets import OffsetStore, TrackedApplication, UpdateTracker, stop_within
+from outbound import OutboundScheduler, Priority
+from overload import OverloadGuard
+from profiling import CAPTURE_KINDS, TRACER, Profiler
+from search import AliasTable, CityIndex
+from sharding import ShardedApplication, WorkerPool, receive_updates, worker_path
+import startup
+from tztables import ZoneTables, parse_years
+from watch import WatchScheduler
+
 # ---------------------- CONFIG ----------------------
 BOT_TOKEN = os.getenv("BOT_TOKEN")
 LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FILE = os.getenv("LOG_FILE", "bot.log")  # Empty disables file logging
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text").lower()  # "text" or "json"
+LOG_MAX_BYTES = int(os.getenv("LOG_MAX_BYTES", 10 * 1024 * 1024))
+LOG_BACKUP_COUNT = int(os.getenv("LOG_BACKUP_COUNT", 5))
+LOG_SAMPLE_RATES = os.getenv("LOG_SAMPLE_RATES", "")  # e.g. "button_press=10"
 PORT = int(os.getenv("PORT", 5000))
 WEBHOOK_URL = os.getenv("WEBHOOK_URL")  # For production webhook mode
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET")  # Random per run when unset
+UPDATE_QUEUE_SIZE = int(os.getenv("UPDATE_QUEUE_SIZE", 1000))
+BOT_API_BASE_URL = os.getenv("BOT_API_BASE_URL")  # e.g. a local Bot API server
+# Max updates in flight across chats so one chat's outbound pacing never holds up
+# the others; 0 falls back to python-telegram-bot's sequential mode
+UPDATE_CONCURRENCY = int(os.getenv("UPDATE_CONCURRENCY", 64))
+# Outbound flood control (messages per second)
+OUTBOUND_GLOBAL_RATE = float(os.getenv("OUTBOUND_GLOBAL_RATE", 30))
+OUTBOUND_CHAT_RATE = float(os.getenv("OUTBOUND_CHAT_RATE", 1))
+OUTBOUND_GROUP_RATE = float(os.getenv("OUTBOUND_GROUP_RATE", 20 / 60))
+# Seconds to hold menu edits so bursts of taps collapse into one; 0 disables
+EDIT_COALESCE_WINDOW = float(os.getenv("EDIT_COALESCE_WINDOW", 0.25))
+# Seconds Telegram may cache inline results; they show the time, so keep it short
+INLINE_CACHE_TIME = int(os.getenv("INLINE_CACHE_TIME", 5))
+INLINE_RESULTS = 20
+# Seconds a shutdown may spend finishing in-flight updates and queued sends
+SHUTDOWN_TIMEOUT = float(os.getenv("SHUTDOWN_TIMEOUT", 10))
+# File holding the last processed update offset across restarts; empty disables
+OFFSET_FILE = os.getenv("OFFSET_FILE", "update_offset.json")
+# Skip messages older than this many seconds (e.g. sent during downtime); 0 handles all
+MAX_UPDATE_AGE = float(os.getenv("MAX_UPDATE_AGE", 0))
+# Build search indexes, zone tables and the first menu page before reporting ready
+WARM_UP = os.getenv("WARM_UP", "1") != "0"
+# Degraded mode: event-loop lag in seconds, or updates queued or in flight, that
+# trigger it (0 ignores that signal), and seconds load must stay low to leave it
+OVERLOAD_LAG = float(os.getenv("OVERLOAD_LAG", 0.5))
+OVERLOAD_PENDING = int(os.getenv("OVERLOAD_PENDING", 500))
+OVERLOAD_RECOVER_SECONDS = float(os.getenv("OVERLOAD_RECOVER_SECONDS", 10))
+# Worker processes behind a single intake, sharded by chat; 0 runs in-process
+WORKERS = int(os.getenv("WORKERS", 0))
+# SQLite file holding each user's favorite and recent cities; empty keeps them in memory
+FAVORITES_DB = os.getenv("FAVORITES_DB", "favorites.db")
+# Compact catalogue file built with catalogue.py; replaces the built-in cities
+CATALOGUE_PATH = os.getenv("CATALOGUE_PATH")
+# Live /watch clocks: minutes each one keeps updating and how many a chat may run
+WATCH_MINUTES = int(os.getenv("WATCH_MINUTES", 60))
+WATCH_MAX_PER_CHAT = int(os.getenv("WATCH_MAX_PER_CHAT", 5))
+# Years covered by the precomputed UTC offset tables; other years fall back to pytz
+TZ_TABLE_YEARS = os.getenv("TZ_TABLE_YEARS", "1970-2037")
+# Trace one update in N (handler, Bot API calls and hot helpers); 0 disables
+TRACE_SAMPLE_RATE = int(os.getenv("TRACE_SAMPLE_RATE", 0))
+# Telegram user ids allowed to run /profile, comma-separated
+ADMIN_IDS = {int(user_id) for user_id in os.getenv("ADMIN_IDS", "").replace(",", " ").split()}
+# Directory /profile writes its captures to
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
 CITIES_PER_PAGE = 6
 
 # ---------------------- CITY TIMEZONES ----------------------
@@ -123,65 +210,507 @@ CITY_TIMEZONES = {
     "Waterloo": "America/Toronto",
 }
 
+if CATALOGUE_PATH:
+    CITY_TIMEZONES = MappedCatalogue(CATALOGUE_PATH)
+
 # ---------------------- LOGGING ----------------------
-logging.basicConfig(
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-    level=getattr(logging, LOG_LEVEL, logging.INFO),
-    handlers=[
-        logging.FileHandler("bot.log"),
-        logging.StreamHandler()
-    ]
+setup_logging(
+    level=LOG_LEVEL,
+    log_file=worker_path(LOG_FILE),
+    json_format=LOG_FORMAT == "json",
+    max_bytes=LOG_MAX_BYTES,
+    backup_count=LOG_BACKUP_COUNT,
+    sample_rates=parse_sample_rates(LOG_SAMPLE_RATES),
 )
 logger = logging.getLogger(__name__)
 
+# ---------------------- OUTBOUND QUEUE ----------------------
+OUTBOUND = OutboundScheduler(
+    global_rate=OUTBOUND_GLOBAL_RATE,
+    chat_rate=OUTBOUND_CHAT_RATE,
+    group_rate=OUTBOUND_GROUP_RATE,
+)
+REGISTRY.gauge_callback(
+    "bot_outbound_queue_depth", "Bot API calls waiting for a rate-limit slot.",
+    OUTBOUND.depth_by_priority, ("priority",),
+)
+REGISTRY.counter_callback(
+    "bot_outbound_retries_total", "Calls retried after a 429 retry_after.", lambda: OUTBOUND.retries
+)
 
-# ---------------------- HELPERS ----------------------
-def build_keyboard(page: int = 0):
-    """Builds a paginated inline keyboard of cities."""
-    cities = list(CITY_TIMEZONES.keys())
-    start = page * CITIES_PER_PAGE
-    end = start + CITIES_PER_PAGE
-    page_cities = cities[start:end]
+EDITS = EditCoalescer(window=EDIT_COALESCE_WINDOW)
+REGISTRY.counter_callback(
+    "bot_menu_edits_total", "Menu edits by outcome.",
+    lambda: {("sent",): EDITS.sent, ("skipped",): EDITS.skipped, ("coalesced",): EDITS.coalesced},
+    ("outcome",),
+)
 
-    keyboard = []
-    for city in page_cities:
-        keyboard.append([InlineKeyboardButton(city, callback_data=f"city:{city}")])
+FAVORITES = FavoritesStore(FAVORITES_DB)
+REGISTRY.counter_callback(
+    "bot_favorites_cache_total", "Favorites lookups by LRU outcome.",
+    lambda: {("hit",): FAVORITES.hits, ("miss",): FAVORITES.misses}, ("outcome",),
+)
+REGISTRY.gauge_callback(
+    "bot_favorites_pending_writes", "Users with favorites not yet written to disk.",
+    lambda: FAVORITES.pending_writes,
+)
+
+# ---------------------- UPDATE OFFSETS ----------------------
+TRACKER = UpdateTracker(max_age=MAX_UPDATE_AGE)
+OFFSETS = OffsetStore(OFFSET_FILE)
+REGISTRY.counter_callback(
+    "bot_updates_discarded_total", "Updates skipped as already handled or too old.",
+    lambda: {("duplicate",): TRACKER.duplicates, ("stale",): TRACKER.stale}, ("reason",),
+)
+
+# ---------------------- LOAD SHEDDING ----------------------
+# Past OVERLOAD_LAG or OVERLOAD_PENDING the bot degrades (see overload.py):
+# button presses are answered only from caches, expensive commands get a
+# busy reply and the per-update INFO lines below are not logged.
+BUSY_TEXT = "⏳ The bot is very busy right now. Please try again in a moment."
+
+
+def on_load_change(degraded: bool, reason: str):
+    logger.setLevel(logging.WARNING if degraded else logging.NOTSET)
+
+
+LOAD = OverloadGuard(
+    lag=lambda: HEALTH.lag_monitor.lag,
+    work=lambda: TRACKER.pending,
+    lag_threshold=OVERLOAD_LAG,
+    work_threshold=OVERLOAD_PENDING,
+    recover_after=OVERLOAD_RECOVER_SECONDS,
+    on_change=on_load_change,
+)
+REGISTRY.gauge_callback("bot_degraded", "1 while the bot is shedding load.", lambda: int(LOAD.degraded))
+REGISTRY.counter_callback(
+    "bot_overload_transitions_total", "Switches into and out of degraded mode.",
+    lambda: {(mode,): count for mode, count in LOAD.transitions.items()}, ("to",),
+)
+SHED = REGISTRY.counter("bot_requests_shed_total", "Requests answered with a busy reply.", ("kind",))
+
+
+def unless_overloaded(handler):
+    """Answer handler's command with BUSY_TEXT instead of running it while degraded."""
+
+    @functools.wraps(handler)
+    async def wrapper(update: Update, context: ContextTypes.DEFAULT_TYPE):
+        if LOAD.degraded:
+            SHED.inc("command")
+            await OUTBOUND.send(Priority.REPLY, update.effective_chat.id, update.message.reply_text, BUSY_TEXT)
+            return None
+        return await handler(update, context)
+
+    return wrapper
+
+
+# ---------------------- KEYBOARD CACHE ----------------------
+# The menu lists cities alphabetically. Pages are rendered on first use and
+# kept in a bounded cache, so large catalogues cost nothing up front. The
+# catalogue version is bumped on each rebuild so callers can tell when
+# cached pages (and anything derived from the catalogue) are stale.
+# Buttons name cities by their index in menu order; see callbacks.py.
+PAGE_CACHE_SIZE = 1024
+LETTERS = "ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+_catalogue_version = 0
+_menu = None  # city names in menu order, read on first use; see catalogue.menu_order
+_menu_size = 0
+_page_cache = collections.OrderedDict()
+_letter_keyboard = None
+_codec = None
+
+
+def _render_page(cities, page: int, page_count: int) -> InlineKeyboardMarkup:
+    """Render a single page of the city menu."""
+    codec = callback_codec()
+    start = page * CITIES_PER_PAGE
+    keyboard = [
+        [InlineKeyboardButton(city, callback_data=codec.city_data(callbacks.CITY, index))]
+        for index, city in enumerate(cities[start:start + CITIES_PER_PAGE], start)
+    ]
 
     # Pagination controls
     navigation = []
     if page > 0:
-        navigation.append(InlineKeyboardButton("⬅️ Prev", callback_data=f"page:{page-1}"))
-    if end < len(cities):
-        navigation.append(InlineKeyboardButton("Next ➡️", callback_data=f"page:{page+1}"))
+        navigation.append(InlineKeyboardButton("⬅️ Prev", callback_data=callbacks.page_data(page - 1)))
+    if page < page_count - 1:
+        navigation.append(InlineKeyboardButton("Next ➡️", callback_data=callbacks.page_data(page + 1)))
     if navigation:
         keyboard.append(navigation)
 
-    # Add refresh button
-    keyboard.append([InlineKeyboardButton("🔄 Refresh", callback_data=f"page:{page}")])
+    # Shortcuts and refresh button
+    keyboard.append([
+        InlineKeyboardButton("⭐ Mine", callback_data=callbacks.MINE_DATA),
+        InlineKeyboardButton("🔤 A–Z", callback_data=callbacks.LETTERS_DATA),
+        InlineKeyboardButton("🔄 Refresh", callback_data=callbacks.page_data(page)),
+    ])
+
+    return InlineKeyboardMarkup(keyboard)
+
+
+def rebuild_keyboard_cache() -> int:
+    """Re-read the menu order from CITY_TIMEZONES, drop cached pages and return the new version."""
+    global _catalogue_version, _menu, _menu_size, _letter_keyboard, _codec
+    _menu = menu_order(CITY_TIMEZONES)
+    _menu_size = len(CITY_TIMEZONES)
+    _page_cache.clear()
+    _letter_keyboard = None
+    _codec = None
+    _catalogue_version += 1
+    return _catalogue_version
+
+
+def callback_codec() -> CallbackCodec:
+    """The callback data codec of the current catalogue, fingerprinted on first use."""
+    global _codec
+    _check_catalogue()
+    if _codec is None:
+        _codec = CallbackCodec(_menu, _menu.fingerprint())
+    return _codec
+
+
+def city_data(action: str, city: str):
+    """Callback data for a city button, or None if the city is no longer in the catalogue."""
+    codec = callback_codec()
+    index = codec.names.position(city)
+    return codec.city_data(action, index) if index >= 0 else None
+
+
+def register_cities(cities: dict) -> int:
+    """Add cities to the built-in catalogue and invalidate the keyboard cache.
 
+    A catalogue loaded from CATALOGUE_PATH is read-only; rebuild its file instead.
+    """
+    if isinstance(CITY_TIMEZONES, MappedCatalogue):
+        raise TypeError(
+            f"{CITY_TIMEZONES.path} is read-only; add the cities to its source and rebuild it with catalogue.py build"
+        )
+    CITY_TIMEZONES.update(cities)
+    return rebuild_keyboard_cache()
+
+
+def catalogue_version() -> int:
+    """Return the version stamp of the current menu."""
+    _check_catalogue()
+    return _catalogue_version
+
+
+def page_is_cached(page: int) -> bool:
+    """Whether build_keyboard(page) would be served without rendering."""
+    _check_catalogue()
+    return min(max(page, 0), page_count() - 1) in _page_cache
+
+
+def page_count() -> int:
+    """Return the number of pages in the city menu."""
+    _check_catalogue()
+    return max(1, -(-len(_menu) // CITIES_PER_PAGE))
+
+
+def letter_page(letter: str) -> int:
+    """Return the first menu page with a city starting with letter, or -1."""
+    _check_catalogue()
+    index = _menu.first_index(letter)
+    return index // CITIES_PER_PAGE if index >= 0 else -1
+
+
+def letter_keyboard() -> InlineKeyboardMarkup:
+    """Return the jump-to-letter keyboard, listing only letters that have cities."""
+    global _letter_keyboard
+    _check_catalogue()
+    if _letter_keyboard is None:
+        letters = [letter for letter in LETTERS if _menu.first_index(letter) >= 0]
+        keyboard = [
+            [InlineKeyboardButton(letter, callback_data=callbacks.letter_data(letter)) for letter in letters[i:i + 6]]
+            for i in range(0, len(letters), 6)
+        ]
+        keyboard.append([InlineKeyboardButton("🔙 Back to Menu", callback_data=callbacks.page_data(0))])
+        _letter_keyboard = InlineKeyboardMarkup(keyboard)
+    return _letter_keyboard
+
+
+def personal_keyboard(user_cities) -> InlineKeyboardMarkup:
+    """Render a user's favorite (⭐) and recent (🕘) cities as the first menu page."""
+    keyboard = []
+    for city in user_cities.shortlist(CITIES_PER_PAGE):
+        data = city_data(callbacks.CITY, city)
+        if data is not None:
+            keyboard.append([InlineKeyboardButton(
+                f"{'⭐' if city in user_cities.favorites else '🕘'} {city}", callback_data=data
+            )])
+    keyboard.append([
+        InlineKeyboardButton("📚 All cities ➡️", callback_data=callbacks.page_data(0)),
+        InlineKeyboardButton("🔤 A–Z", callback_data=callbacks.LETTERS_DATA),
+    ])
     return InlineKeyboardMarkup(keyboard)
 
 
+def city_keyboard(city: str, favorite: bool) -> InlineKeyboardMarkup:
+    """Buttons under a city's time: toggle favorite and go back to the menu."""
+    return InlineKeyboardMarkup([
+        [InlineKeyboardButton(
+            "★ Remove from favorites" if favorite else "⭐ Add to favorites",
+            callback_data=city_data(callbacks.FAVORITE, city),
+        )],
+        [InlineKeyboardButton("🔙 Back to Menu", callback_data=callbacks.MINE_DATA)],
+    ])
+
+
+async def first_page(user_id: int) -> InlineKeyboardMarkup:
+    """The user's own cities if they have any, else the first catalogue page."""
+    user_cities = await FAVORITES.load(user_id)
+    return personal_keyboard(user_cities) if user_cities else build_keyboard(0)
+
+
+def _check_catalogue():
+    # The menu is first read here rather than at import, so importing the bot
+    # does not sort the catalogue; a changed size means it was edited in
+    # place without going through register_cities.
+    if _menu is None or _menu_size != len(CITY_TIMEZONES):
+        rebuild_keyboard_cache()
+
+
+# ---------------------- SEARCH ----------------------
+# The inline-query index and the /time alias table are built lazily, once
+# per catalogue version.
+_search_index = None
+_alias_table = None
+_search_version = None
+
+
+def _refresh_search():
+    global _search_index, _alias_table, _search_version
+    _check_catalogue()
+    if _search_version != _catalogue_version:
+        _search_index = CityIndex(CITY_TIMEZONES, limit=INLINE_RESULTS)
+        _alias_table = AliasTable(CITY_TIMEZONES)
+        _search_version = _catalogue_version
+
+
+def search_cities(query: str) -> tuple:
+    """Return up to INLINE_RESULTS city names matching query, best first."""
+    _refresh_search()
+    return _search_index.search(query)
+
+
+def resolve_city(text: str):
+    """Return the city a user typed ("trois rivieres", "st johns"), or None."""
+    _refresh_search()
+    return _alias_table.resolve(text)
+
+
+# ---------------------- HELPERS ----------------------
+def build_keyboard(page: int = 0):
+    """Return the inline keyboard for a page of cities, rendering it on first use."""
+    _check_catalogue()
+    pages = page_count()
+    page = min(max(page, 0), pages - 1)
+    keyboard = _page_cache.get(page)
+    if keyboard is None:
+        keyboard = _page_cache[page] = _render_page(_menu, page, pages)
+        if len(_page_cache) > PAGE_CACHE_SIZE:
+            _page_cache.popitem(last=False)
+    else:
+        _page_cache.move_to_end(page)
+    return keyboard
+
+
+# ---------------------- TIME CACHE ----------------------
+# Many cities share an IANA zone and the rendered text only changes once a
+# second, so resolved tz objects and rendered strings are cached per zone.
+# Offsets come from precomputed transition tables (see tztables); pytz is
+# only needed to place wall times, as /convert does.
+TIME_FORMAT = "%I:%M:%S %p\n📅 %A, %B %d, %Y"
+TZ_TABLES = ZoneTables(*parse_years(TZ_TABLE_YEARS))
+_tz_cache: dict = {}
+_rendered_times: dict = {}  # zone name -> (epoch second, rendered text)
+TIME_CACHE_STATS = {"hits": 0, "misses": 0}
+
+
+def resolve_zone(tz_name: str):
+    """Return the pytz timezone for tz_name, resolving each zone only once."""
+    tz = _tz_cache.get(tz_name)
+    if tz is None:
+        tz = _tz_cache[tz_name] = pytz.timezone(tz_name)
+    return tz
+
+
+def time_cache_stats() -> dict:
+    """Return hit/miss counters and the hit ratio of the rendered time cache."""
+    hits, misses = TIME_CACHE_STATS["hits"], TIME_CACHE_STATS["misses"]
+    total = hits + misses
+    return {"hits": hits, "misses": misses, "ratio": hits / total if total else 0.0}
+
+
+REGISTRY.counter_callback(
+    "bot_time_cache_hits_total", "Rendered time cache hits.", lambda: TIME_CACHE_STATS["hits"]
+)
+REGISTRY.counter_callback(
+    "bot_time_cache_misses_total", "Rendered time cache misses.", lambda: TIME_CACHE_STATS["misses"]
+)
+REGISTRY.gauge_callback(
+    "bot_time_cache_hit_ratio", "Share of get_local_time calls served from cache.",
+    lambda: time_cache_stats()["ratio"],
+)
+
+
+def zone_time(tz_name: str) -> str:
+    """Return the formatted current time in an IANA zone, rendered at most once a second."""
+    second = int(time.time())
+    cached = _rendered_times.get(tz_name)
+    if cached is not None and cached[0] == second:
+        TIME_CACHE_STATS["hits"] += 1
+        return cached[1]
+
+    TIME_CACHE_STATS["misses"] += 1
+    now = TZ_TABLES.localtime(tz_name, second)
+    text = now.strftime(TIME_FORMAT)
+    _rendered_times[tz_name] = (second, text)
+    return text
+
+
+def clock_change(tz_name: str, now: float = None) -> str:
+    """Describe the zone's next offset change, or "" when none is scheduled."""
+    change = TZ_TABLES.next_change(tz_name, time.time() if now is None else now)
+    if change is None:
+        return ""
+    instant, before, after = change
+    local = datetime.fromtimestamp(instant, before)
+    return f"🔁 Clocks change {local:%a, %b %d} at {local:%I:%M %p} ({before.tzname(None)} → {after.tzname(None)})"
+
+
 def get_local_time(city: str) -> str:
     """Return formatted local time for a given city."""
     try:
-        tz_name = CITY_TIMEZONES[city]
-        tz = pytz.timezone(tz_name)
-        now = datetime.now(tz)
-        date_str = now.strftime("%B %d, %Y")
-        time_str = now.strftime("%I:%M:%S %p")
-        day_str = now.strftime("%A")
-        return f"{time_str}\n📅 {day_str}, {date_str}"
+        return zone_time(CITY_TIMEZONES[city])
     except Exception as e:
-        logger.error(f"Error fetching time for {city}: {e}")
+        logger.error("Error fetching time for %s: %s", city, e)
         return "❌ Timezone not found."
 
 
+# ---------------------- WORLD CLOCK BOARD ----------------------
+# Cities grouped by zone, rebuilt once per catalogue version, so /board and
+# /convert compute one offset per zone rather than one per city.
+_zone_groups = None
+_zone_groups_version = None
+
+
+def zone_groups() -> ZoneGroups:
+    """Return the catalogue's cities grouped by zone, in menu order."""
+    global _zone_groups, _zone_groups_version
+    _check_catalogue()
+    if _zone_groups_version != _catalogue_version:
+        _zone_groups = ZoneGroups(_menu, CITY_TIMEZONES.__getitem__)
+        _zone_groups_version = _catalogue_version
+    return _zone_groups
+
+
+BOARD = BoardCache(lambda timestamp: render_board(zone_groups(), TZ_TABLES.localtime, timestamp))
+REGISTRY.counter_callback("bot_board_renders_total", "World clock boards rendered.", lambda: BOARD.renders)
+
+
+def world_board() -> tuple:
+    """Return the /board message chunks for the current minute."""
+    _check_catalogue()
+    return BOARD.get(catalogue_version(), time.time())
+
+
+def convert_time(text: str, now: float = None) -> list:
+    """Answer a /convert request ("3pm Toronto [to Vancouver]") as message chunks."""
+    request = parse_request(text)
+    if request is None:
+        return ["ℹ️ Usage: `/convert 3pm Toronto to Vancouver`, or `/convert 15:30 Toronto` for every city"]
+    hour, minute, source_text, target_text = request
+    source = resolve_city(source_text)
+    target = resolve_city(target_text) if target_text else None
+    for typed, city in ((source_text, source), (target_text, target)):
+        if typed and city is None:
+            return [f"❌ I don't know a city called \"{escape_markdown(typed)}\"."]
+
+    instant, note = source_instant(
+        resolve_zone(CITY_TIMEZONES[source]), hour, minute, time.time() if now is None else now
+    )
+    warning = describe_note(note, source, hour, minute, instant)
+    if target is None:
+        title = f"🔁 **{instant:%I:%M %p}** in **{source}** ({instant:%a %b %d}) is:"
+        chunks = render_offsets(title, zone_groups(), TZ_TABLES.localtime, instant.timestamp())
+        return [warning] + chunks if warning else chunks
+
+    converted = TZ_TABLES.localtime(CITY_TIMEZONES[target], instant.timestamp())
+    reply = f"🔁 **{instant:%I:%M %p}** in **{source}** is **{converted:%I:%M %p}** in **{target}**"
+    if converted.date() != instant.date():
+        reply += f" ({converted:%a %b %d})"
+    return [f"{reply}\n{warning}" if warning else reply]
+
+
+# ---------------------- LIVE CLOCKS ----------------------
+# Watched messages are edited once a minute, so they show no seconds.
+WATCH_TIME_FORMAT = "%I:%M %p\n📅 %A, %B %d, %Y"
+WATCH_MARKUP = InlineKeyboardMarkup([[InlineKeyboardButton("⏹ Stop", callback_data=callbacks.UNWATCH_DATA)]])
+
+
+def watch_time(tz_name: str, now: float = None) -> str:
+    """Return the minute of now (default: the current time) in an IANA zone."""
+    return TZ_TABLES.localtime(tz_name, time.time() if now is None else now).strftime(WATCH_TIME_FORMAT)
+
+
+def watch_text(city: str, time_info: str) -> str:
+    return f"🕐 **{city}** (live)\n\n{time_info}"
+
+
+async def send_watch_edit(watcher, text: str):
+    await OUTBOUND.send(
+        Priority.BACKGROUND, watcher.chat_id, watcher.bot.edit_message_text,
+        text, chat_id=watcher.chat_id, message_id=watcher.message_id,
+        parse_mode='Markdown', reply_markup=WATCH_MARKUP,
+    )
+
+
+WATCHES = WatchScheduler(
+    render=watch_time, format_text=watch_text, send=send_watch_edit,
+    lifetime=WATCH_MINUTES * 60, max_per_chat=WATCH_MAX_PER_CHAT,
+)
+REGISTRY.gauge_callback("bot_watchers", "Live clock messages being updated.", lambda: len(WATCHES))
+REGISTRY.gauge_callback("bot_watched_zones", "Distinct zones with live clocks.", lambda: WATCHES.zones)
+REGISTRY.counter_callback(
+    "bot_watch_edits_total", "Live clock edits by outcome.",
+    lambda: {("sent",): WATCHES.edits, ("skipped",): WATCHES.skipped, ("dropped",): WATCHES.dropped},
+    ("outcome",),
+)
+
+
+# ---------------------- WARM-UP ----------------------
+# Indexes and tables are built on first use. A warm-up builds them ahead of
+# the first update, off the event loop, so the first user does not pay.
+def warm_up() -> dict:
+    """Build the lazily constructed catalogue structures; returns their sizes.
+
+    For a memory-mapped catalogue only the first menu page and the zone
+    tables are built: the search index, aliases and zone groups hold every
+    city, so they would decode the whole file. They are built on first use.
+    """
+    with startup.phase("warm_up"):
+        build_keyboard(0)
+        if isinstance(CITY_TIMEZONES, MappedCatalogue):
+            zones = CITY_TIMEZONES.zones()
+        else:
+            search_cities("")
+            zones = zone_groups().zones
+        rows = TZ_TABLES.build(zones)
+    return {"cities": len(CITY_TIMEZONES), "zones": len(zones), "tz_table_rows": rows}
+
+
+REGISTRY.gauge_callback(
+    "bot_startup_seconds", "Seconds spent in each startup phase.",
+    lambda: {(name,): seconds for name, seconds in startup.PHASES.items()}, ("phase",),
+)
+
+
 # ---------------------- HANDLERS ----------------------
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle /start command."""
     user = update.effective_user
-    logger.info(f"User {user.id} ({user.username}) started the bot")
+    logger.info("User %s (%s) started the bot", user.id, user.username, extra={"event": "start"})
     
     welcome_message = (
         f"👋 Hello {user.first_name}!\n\n"
@@ -191,11 +720,15 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
         "🔄 Use the navigation buttons to browse all available cities."
     )
     
-    await update.message.reply_text(
+    keyboard = await first_page(user.id)
+    message = await OUTBOUND.send(
+        Priority.REPLY, update.effective_chat.id, update.message.reply_text,
         welcome_message,
-        reply_markup=build_keyboard(page=0),
+        reply_markup=keyboard,
         parse_mode='Markdown'
     )
+    if message is not None:
+        EDITS.remember((message.chat_id, message.message_id), keyboard)
 
 
 async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -204,19 +737,27 @@ async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         "🤖 **Time Zone Bot Help**\n\n"
         "**Available Commands:**\n"
         "• `/start` - Show city selection menu\n"
+        "• `/time <city>` - Current time in a city\n"
+        "• `/watch <city>` - A clock that updates every minute\n"
+        "• `/board` - Every city grouped by UTC offset\n"
+        "• `/convert 3pm <city> [to <city>]` - Convert a time\n"
         "• `/help` - Show this help message\n"
         "• `/about` - About this bot\n\n"
         "**How to use:**\n"
         "1. Use `/start` to see the city list\n"
         "2. Click on any city to get current time\n"
         "3. Use ⬅️ Next ➡️ buttons to navigate\n"
-        "4. Use 🔄 Refresh to update the menu\n\n"
+        "4. Use 🔄 Refresh to update the menu\n"
+        "5. Or type my @username and a city name in any chat\n\n"
         "**Supported Regions:**\n"
         "• 🇺🇸 Top 50 US cities\n"
         "• 🇨🇦 Top 50 Canadian cities"
     )
     
-    await update.message.reply_text(help_text, parse_mode='Markdown')
+    await OUTBOUND.send(
+        Priority.REPLY, update.effective_chat.id, update.message.reply_text,
+        help_text, parse_mode='Markdown'
+    )
 
 
 async def about_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -235,58 +776,554 @@ async def about_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         "**Last Updated:** 2025"
     )
     
-    await update.message.reply_text(about_text, parse_mode='Markdown')
+    await OUTBOUND.send(
+        Priority.REPLY, update.effective_chat.id, update.message.reply_text,
+        about_text, parse_mode='Markdown'
+    )
+
+
+async def show_city(query, chat_id, city):
+    user_cities = await FAVORITES.record_use(query.from_user.id, city)
+    await OUTBOUND.send(
+        Priority.REPLY, chat_id, query.message.reply_text,
+        f"🕐 **{city}**\n\n{get_local_time(city)}",
+        parse_mode='Markdown',
+        reply_markup=city_keyboard(city, city in user_cities.favorites)
+    )
+
+
+async def stop_watch(query, chat_id, _):
+    WATCHES.remove(chat_id, query.message.message_id)
+    await OUTBOUND.send(Priority.EDIT, chat_id, query.edit_message_reply_markup, reply_markup=None)
+
+
+async def show_page(query, chat_id, page):
+    return build_keyboard(page)
+
+
+async def show_mine(query, chat_id, _):
+    return await first_page(query.from_user.id)
+
+
+async def toggle_favorite(query, chat_id, city):
+    return city_keyboard(city, await FAVORITES.toggle_favorite(query.from_user.id, city))
+
+
+async def show_letters(query, chat_id, _):
+    return letter_keyboard()
+
+
+async def show_letter(query, chat_id, letter):
+    return build_keyboard(max(0, letter_page(letter)))
+
+
+# Action -> handler(query, chat_id, value). Handlers that return a keyboard
+# have it swapped into the pressed message through the edit coalescer.
+BUTTON_ACTIONS = {
+    callbacks.CITY: show_city,
+    callbacks.UNWATCH: stop_watch,
+    callbacks.PAGE: show_page,
+    callbacks.MINE: show_mine,
+    callbacks.FAVORITE: toggle_favorite,
+    callbacks.LETTERS: show_letters,
+    callbacks.LETTER: show_letter,
+}
+BUTTON_PRESSES = REGISTRY.counter(
+    "bot_button_presses_total", "Button presses by action and callback data format.", ("action", "format")
+)
+STALE_BUTTON = "⌛ The city list has changed; here is the current menu."
+
+
+def press_is_cached(press, user_id: int) -> bool:
+    """Whether a press can be answered without rendering a keyboard or reading favorites from disk."""
+    if press.format == "stale" or press.action in (callbacks.CITY, callbacks.FAVORITE, callbacks.MINE):
+        return FAVORITES.cached(user_id)
+    if press.action == callbacks.PAGE:
+        return page_is_cached(press.value)
+    if press.action == callbacks.LETTER:
+        return page_is_cached(max(0, letter_page(press.value)))
+    if press.action == callbacks.LETTERS:
+        return _letter_keyboard is not None
+    return True  # stopping a live clock only removes work
 
 
 async def button_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle button presses from inline keyboard."""
     query = update.callback_query
-    await query.answer()
+    chat_id = query.message.chat_id if query.message else None
+    press = callback_codec().decode(query.data or "")
+    stale = press is not None and press.format == "stale"
+    busy = LOAD.degraded and press is not None and not press_is_cached(press, query.from_user.id)
+    await OUTBOUND.send(
+        Priority.ANSWER, chat_id, query.answer, BUSY_TEXT if busy else STALE_BUTTON if stale else None
+    )
 
     user = query.from_user
-    logger.info(f"User {user.id} ({user.username}) pressed button: {query.data}")
+    logger.info(
+        "User %s (%s) pressed button: %s", user.id, user.username, query.data,
+        extra={"event": "button_press"},
+    )
+    if press is None:
+        BUTTON_PRESSES.inc("unknown", "unknown")
+        return
+    BUTTON_PRESSES.inc(press.action, press.format)
+    if busy:
+        SHED.inc("button")
+        return
 
     try:
-        if query.data.startswith("city:"):
-            city = query.data.split(":", 1)[1]
-            time_info = get_local_time(city)
-            
-            response_text = f"🕐 **{city}**\n\n{time_info}"
-            
-            # Create a "Back to Menu" button
-            back_keyboard = InlineKeyboardMarkup([
-                [InlineKeyboardButton("🔙 Back to Menu", callback_data="page:0")]
-            ])
-            
-            await query.message.reply_text(
-                response_text,
-                parse_mode='Markdown',
-                reply_markup=back_keyboard
+        if stale:
+            # A button from an older catalogue: its city index may now name another city.
+            markup = await first_page(user.id)
+        else:
+            markup = await BUTTON_ACTIONS[press.action](query, chat_id, press.value)
+        if markup is not None:
+            await EDITS.edit(
+                message_key(query), markup,
+                lambda markup: OUTBOUND.send(
+                    Priority.EDIT, chat_id, query.edit_message_reply_markup, reply_markup=markup
+                ),
             )
 
-        elif query.data.startswith("page:"):
-            page = int(query.data.split(":", 1)[1])
-            await query.edit_message_reply_markup(reply_markup=build_keyboard(page))
-
     except Exception as e:
-        logger.error(f"Error in button_handler: {e}")
-        await query.message.reply_text("❌ An error occurred. Please try again.")
+        logger.error("Error in button_handler: %s", e)
+        await OUTBOUND.send(
+            Priority.REPLY, chat_id, query.message.reply_text,
+            "❌ An error occurred. Please try again."
+        )
+
+
+async def time_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Handle /time <city>."""
+    text = " ".join(context.args)
+    if not text:
+        reply = "ℹ️ Usage: `/time <city>`, e.g. `/time trois rivieres`"
+    else:
+        city = resolve_city(text)
+        if city is not None:
+            reply = f"🕐 **{city}**\n\n{get_local_time(city)}"
+            change = clock_change(CITY_TIMEZONES[city])
+            if change:
+                reply += f"\n{change}"
+        else:
+            suggestions = search_cities(text)[:3]
+            reply = f"❌ I don't know a city called \"{escape_markdown(text)}\"."
+            if suggestions:
+                reply += "\nDid you mean " + ", ".join(suggestions) + "?"
+            reply += "\nUse /start to browse all cities."
+
+    await OUTBOUND.send(
+        Priority.REPLY, update.effective_chat.id, update.message.reply_text,
+        reply, parse_mode='Markdown'
+    )
+
+
+async def watch_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Handle /watch <city>: send the time and keep it updated every minute."""
+    text = " ".join(context.args)
+    city = resolve_city(text) if text else None
+    chat_id = update.effective_chat.id
+    if city is None:
+        await OUTBOUND.send(
+            Priority.REPLY, chat_id, update.message.reply_text,
+            "ℹ️ Usage: `/watch <city>`, e.g. `/watch toronto`", parse_mode='Markdown'
+        )
+        return
+
+    zone = CITY_TIMEZONES[city]
+    message = await OUTBOUND.send(
+        Priority.REPLY, chat_id, update.message.reply_text,
+        watch_text(city, watch_time(zone)), parse_mode='Markdown', reply_markup=WATCH_MARKUP
+    )
+    if message is not None and not WATCHES.add(chat_id, message.message_id, city, zone, context.bot):
+        await OUTBOUND.send(
+            Priority.REPLY, chat_id, update.message.reply_text,
+            f"⚠️ This chat already has {WATCHES.max_per_chat} live clocks; stop one to add another."
+        )
+
+
+async def board_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Handle /board: every city grouped by UTC offset."""
+    for chunk in world_board():
+        await OUTBOUND.send(
+            Priority.REPLY, update.effective_chat.id, update.message.reply_text,
+            chunk, parse_mode='Markdown'
+        )
+
+
+async def convert_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Handle /convert <time> <city> [to <city>]."""
+    for chunk in convert_time(" ".join(context.args)):
+        await OUTBOUND.send(
+            Priority.REPLY, update.effective_chat.id, update.message.reply_text,
+            chunk, parse_mode='Markdown'
+        )
+
+
+async def inline_query(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Answer inline queries (`@bot tor…`) with matching cities and their local time."""
+    query = update.inline_query
+    results = []
+    for position, city in enumerate(search_cities(query.query)):
+        time_info = get_local_time(city)
+        results.append(InlineQueryResultArticle(
+            id=str(position),
+            title=f"🕐 {city}",
+            description=time_info.split("\n", 1)[0],
+            input_message_content=InputTextMessageContent(
+                f"🕐 **{city}**\n\n{time_info}", parse_mode='Markdown'
+            ),
+        ))
+    await OUTBOUND.send(Priority.ANSWER, None, query.answer, results, cache_time=INLINE_CACHE_TIME)
 
 
 async def error_handler(update: object, context: ContextTypes.DEFAULT_TYPE):
     """Log errors caused by Updates."""
+    ERRORS.inc(type(context.error).__name__)
     logger.error("Exception while handling an update:", exc_info=context.error)
 
 
 # ---------------------- HEALTH CHECK ----------------------
 async def health_check(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Health check endpoint for monitoring."""
-    await update.message.reply_text("✅ Bot is running normally!")
+    await OUTBOUND.send(
+        Priority.REPLY, update.effective_chat.id, update.message.reply_text,
+        "✅ Bot is running normally!"
+    )
+
+
+async def track_update(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Record update arrival for /health and /metrics; runs ahead of every other handler."""
+    record_update(update)
+
+
+def record_update(update: Update):
+    HEALTH.record_update()
+    UPDATES.inc(update_type(update))
+
+
+def update_type(update: Update) -> str:
+    """Return the name of the payload field set on an update, e.g. "callback_query"."""
+    for field in Update.ALL_TYPES:
+        if getattr(update, field, None) is not None:
+            return field
+    return "unknown"
+
+
+# ---------------------- PROFILING ----------------------
+# Tracing wraps these only while it is on; see profiling.py.
+TRACER.instrument(sys.modules[__name__], (
+    "get_local_time", "zone_time", "build_keyboard", "city_keyboard", "first_page", "letter_keyboard",
+    "search_cities", "resolve_city", "world_board", "convert_time",
+))
+TRACER.instrument(FAVORITES, ("load", "record_use", "toggle_favorite"), "favorites.")
+TRACER.instrument(logger, ("info", "warning", "error"), "log.")
+TRACER.set_rate(TRACE_SAMPLE_RATE)
+PROFILER = Profiler(PROFILE_DIR)
+REGISTRY.counter_callback("bot_traces_total", "Updates traced.", lambda: TRACER.traced)
+REGISTRY.counter_callback("bot_profiles_total", "Profiles captured with /profile.", lambda: PROFILER.captures)
+PROFILE_USAGE = (
+    "🔬 **Profiling**\n\n"
+    "• `/profile trace <N>` - Trace one update in N (0 stops)\n"
+    "• `/profile cpu <seconds>` - cProfile the event loop\n"
+    "• `/profile sample <seconds>` - Sample the event loop's stack\n"
+    "• `/profile traces` - Show the latest traces"
+)
+
+
+def profile_status() -> str:
+    tracing = f"1 in {TRACER.rate} updates ({TRACER.traced} traced)" if TRACER.rate else "off"
+    capture = "{} for {:.0f} s".format(*PROFILER.current) if PROFILER.current else "none running"
+    return f"{PROFILE_USAGE}\n\nTracing: {tracing}\nCapture: {capture}"
+
+
+async def profile_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Handle /profile (admins only): toggle tracing or capture a time-boxed profile."""
+    user = update.effective_user
+    chat_id = update.effective_chat.id
+    if user is None or user.id not in ADMIN_IDS:
+        logger.warning("Refused /profile from user %s", user.id if user else None)
+        return
+
+    async def reply(text, **kwargs):
+        await OUTBOUND.send(Priority.REPLY, chat_id, update.message.reply_text, text, **kwargs)
+
+    args = context.args
+    kind = args[0].lower() if args else ""
+    try:
+        if kind == "trace":
+            TRACER.set_rate(int(args[1]))
+            await reply(profile_status(), parse_mode='Markdown')
+        elif kind == "traces":
+            traces = "\n".join(str(trace) for trace in TRACER.recent) or "No traces yet."
+            await reply(traces[-4000:])
+        elif kind in CAPTURE_KINDS:
+            async def send_summary(path, summary):
+                await reply(f"📈 {kind} profile saved to {path}\n\n{summary}"[:4000])
+
+            PROFILER.start(kind, float(args[1]) if len(args) > 1 else 30, send_summary)
+            await reply(f"📈 Capturing a {kind} profile for {PROFILER.current[1]:.0f} s...")
+        else:
+            await reply(profile_status(), parse_mode='Markdown')
+    except (IndexError, ValueError):
+        await reply(PROFILE_USAGE, parse_mode='Markdown')
+    except RuntimeError as e:
+        await reply(f"⚠️ {e}")
 
 
 # ---------------------- MAIN ----------------------
-def main():
-    """Run the bot."""
+def build_application(
+    token: str = None,
+    base_url: str = BOT_API_BASE_URL,
+    concurrency: int = UPDATE_CONCURRENCY,
+) -> Application:
+    """Create the Application with a bounded update queue and all handlers.
+
+    With concurrency > 0, updates from different chats are processed in
+    parallel (at most `concurrency` at a time) while each chat stays ordered.
+    """
+    builder = (
+        Application.builder()
+        .token(token or BOT_TOKEN)
+        .update_queue(asyncio.Queue(maxsize=UPDATE_QUEUE_SIZE))
+        .request(InstrumentedRequest(connection_pool_size=256))
+    )
+    if base_url:
+        builder = builder.base_url(base_url)
+    if concurrency > 0:
+        builder = builder.application_class(
+            ChatOrderedApplication, {"max_in_flight": concurrency, "tracker": TRACKER}
+        )
+    else:
+        builder = builder.application_class(TrackedApplication, {"tracker": TRACKER})
+    application = builder.build()
+
+    # Add handlers
+    application.add_handler(TypeHandler(Update, track_update), group=-1)
+    application.add_handler(CommandHandler("start", timed(start)))
+    application.add_handler(CommandHandler("help", timed(help_command)))
+    application.add_handler(CommandHandler("time", timed(time_command)))
+    application.add_handler(CommandHandler("watch", timed(unless_overloaded(watch_command))))
+    application.add_handler(CommandHandler("board", timed(unless_overloaded(board_command))))
+    application.add_handler(CommandHandler("convert", timed(unless_overloaded(convert_command))))
+    application.add_handler(CommandHandler("about", timed(about_command)))
+    application.add_handler(CommandHandler("health", timed(health_check)))
+    application.add_handler(CommandHandler("profile", timed(profile_command)))
+    application.add_handler(CallbackQueryHandler(timed(button_handler)))
+    application.add_handler(InlineQueryHandler(timed(inline_query)))
+    application.add_error_handler(error_handler)
+
+    REGISTRY.gauge_callback(
+        "bot_pending_updates", "Updates waiting in the intake queue.",
+        application.update_queue.qsize,
+    )
+    if isinstance(application, ChatOrderedApplication):
+        REGISTRY.gauge_callback(
+            "bot_updates_in_flight", "Updates accepted by chat lanes but not finished.",
+            lambda: application.in_flight,
+        )
+        REGISTRY.gauge_callback(
+            "bot_active_chat_lanes", "Chats with queued or running updates.",
+            lambda: application.active_lanes,
+        )
+    return application
+
+
+def install_stop_signals(stop_event: asyncio.Event):
+    """Set stop_event on SIGINT/SIGTERM where the platform supports it."""
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop_event.set)
+        except (NotImplementedError, RuntimeError):
+            pass
+
+
+async def serve(
+    application: Application,
+    http_server: HTTPServer = None,
+    webhook_url: str = WEBHOOK_URL,
+    stop_event: asyncio.Event = None,
+):
+    """Run update intake and the HTTP server on one event loop until stopped.
+
+    Uses webhook mode when webhook_url is set and long polling otherwise.
+    /health, /ready and /metrics are mounted on http_server; webhook mode always
+    listens on PORT, creating the server if none was passed in. Stops on
+    SIGINT/SIGTERM or when stop_event is set: intake stops first, then
+    in-flight updates and queued sends get SHUTDOWN_TIMEOUT seconds to finish
+    and the resume offset is saved for the next instance.
+    """
+    if webhook_url and http_server is None:
+        http_server = HTTPServer("0.0.0.0", PORT)
+    if http_server is not None:
+        add_health_routes(http_server, HEALTH)
+        add_metrics_route(http_server)
+
+    stop_event = stop_event or asyncio.Event()
+    install_stop_signals(stop_event)
+    sharded = isinstance(application, ShardedApplication)
+    workers_ok = application.pool.healthy if sharded else lambda: True
+    if http_server is not None:
+        # Answer /health and /ready (503 until ready) while the bot connects.
+        await http_server.start()
+    TRACKER.floor = OFFSETS.load()
+    if not OFFSETS.writable():
+        logger.error("💾 Cannot write the update offset to %s; restarts will not resume from it", OFFSET_FILE)
+    if TRACKER.floor is not None:
+        logger.info("⏩ Resuming from update %s", TRACKER.floor)
+    # Workers warm themselves up. In-process, warming overlaps connecting to
+    # Telegram and is awaited before intake starts: warm_up rebuilds the
+    # module's caches on another thread, which must not race with handlers.
+    warming = asyncio.get_running_loop().run_in_executor(None, warm_up) if WARM_UP and not sharded else None
+
+    async with application:
+        await application.start()
+        OUTBOUND.start()
+        if not sharded:
+            await FAVORITES.start()
+            WATCHES.start()
+            start_load_guard(application)
+        HEALTH.lag_monitor.start()
+        try:
+            if warming is not None:
+                logger.info("🔥 Warmed up: %s", await warming)
+            if webhook_url:
+                logger.info("🔗 Starting webhook mode on port %s...", http_server.port)
+                HEALTH.attach("webhook", lambda: application.running and http_server.serving and workers_ok())
+                from webhook import start_webhook  # only webhook deployments load it
+
+                await start_webhook(application, http_server, webhook_url, WEBHOOK_SECRET)
+            else:
+                logger.info("🔄 Starting polling mode...")
+                HEALTH.attach("polling", lambda: application.updater.running and workers_ok())
+                await application.updater.start_polling(
+                    allowed_updates=Update.ALL_TYPES,
+                    error_callback=HEALTH.record_intake_error,
+                )
+            HEALTH.ready = True
+            logger.info("✅ Ready %.2f s after start (%s)", startup.elapsed(), startup.summary())
+            print("✅ Bot is running... Press Ctrl+C to stop.")
+            await stop_event.wait()
+        finally:
+            HEALTH.ready = False
+            loop = asyncio.get_running_loop()
+            deadline = loop.time() + SHUTDOWN_TIMEOUT
+            if webhook_url:
+                from webhook import stop_webhook
+
+                await stop_webhook(application)
+            elif application.updater.running:
+                await application.updater.stop()
+            if http_server is not None:
+                await http_server.stop()
+            await HEALTH.lag_monitor.stop()
+            await LOAD.stop()
+            await WATCHES.stop()
+            await PROFILER.stop()
+            if not await stop_within(application, SHUTDOWN_TIMEOUT):
+                logger.warning(
+                    "⏱ Shutdown deadline hit with %s updates unfinished; those Telegram already "
+                    "considers delivered are lost", TRACKER.pending,
+                )
+            await EDITS.drain()
+            await OUTBOUND.stop(timeout=max(0.0, deadline - loop.time()))
+            await FAVORITES.stop()
+            await save_offset(application, confirm=not webhook_url)
+
+
+def start_load_guard(application: Application):
+    """Watch this process's lag and outstanding updates for overload."""
+    LOAD.work = lambda: application.update_queue.qsize() + TRACKER.pending
+    LOAD.start()
+
+
+async def save_offset(application: Application, confirm: bool):
+    """Persist the resume offset and, when polling, confirm it to Telegram.
+
+    Confirming means the next getUpdates starts at the offset even if the
+    file is lost. Unfinished updates of the last polled batch are delivered
+    again; earlier batches were already acknowledged by the poller, so
+    their unfinished updates are lost (see offsets.py).
+    """
+    offset = TRACKER.offset
+    if offset is None:
+        return
+    try:
+        OFFSETS.save(offset)
+    except OSError as e:
+        logger.error("Could not save update offset %s: %s", offset, e)
+    if confirm:
+        try:
+            await application.bot.get_updates(offset=offset, limit=1, timeout=0)
+        except Exception as e:
+            logger.warning("Could not confirm update offset %s: %s", offset, e)
+    logger.info("💾 Next update offset: %s", offset)
+
+
+def build_intake(token: str = None, base_url: str = BOT_API_BASE_URL, workers: int = WORKERS) -> Application:
+    """Create an Application that only receives updates and shards them over `workers` processes."""
+    pool = WorkerPool(workers, run_worker)
+    builder = (
+        Application.builder()
+        .token(token or BOT_TOKEN)
+        .update_queue(asyncio.Queue(maxsize=UPDATE_QUEUE_SIZE))
+        .request(InstrumentedRequest())
+        .application_class(
+            ShardedApplication, {"pool": pool, "on_update": record_update, "tracker": TRACKER}
+        )
+    )
+    if base_url:
+        builder = builder.base_url(base_url)
+    application = builder.build()
+
+    REGISTRY.gauge_callback(
+        "bot_pending_updates", "Updates waiting in the intake queue.",
+        application.update_queue.qsize,
+    )
+    REGISTRY.gauge_callback("bot_workers_alive", "Worker processes running.", lambda: pool.alive)
+    REGISTRY.counter_callback(
+        "bot_worker_restarts_total", "Worker processes restarted after exiting.", lambda: pool.restarts
+    )
+    return application
+
+
+def run_worker(index: int, sock):
+    """Entry point of a worker process: handle the updates the intake sends over sock."""
+    # Ctrl+C reaches the whole process group; workers stop when the intake hangs up.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    # Chats are split across workers, so each gets a share of the global send rate.
+    OUTBOUND.global_rate = OUTBOUND_GLOBAL_RATE / max(1, WORKERS)
+    asyncio.run(_serve_worker(sock))
+
+
+async def _serve_worker(sock):
+    application = build_application()
+    async with application:
+        await application.start()
+        OUTBOUND.start()
+        await FAVORITES.start()
+        WATCHES.start()
+        HEALTH.lag_monitor.start()
+        start_load_guard(application)
+        if WARM_UP:
+            # Before receive_updates, which tells the intake this worker is ready.
+            await asyncio.get_running_loop().run_in_executor(None, warm_up)
+        try:
+            await receive_updates(sock, application)
+        finally:
+            await HEALTH.lag_monitor.stop()
+            await LOAD.stop()
+            await WATCHES.stop()
+            await PROFILER.stop()
+            await application.stop()
+            await EDITS.drain()
+            await OUTBOUND.stop()
+            await FAVORITES.stop()
+
+
+async def run(http_server: HTTPServer = None):
+    """Build the application for this deployment and serve it until stopped."""
     if not BOT_TOKEN:
         logger.error("❌ BOT_TOKEN is not set. Please set the environment variable.")
         print("❌ Error: BOT_TOKEN environment variable is required!")
@@ -296,22 +1333,23 @@ def main():
     logger.info("🚀 Starting Telegram Time Zone Bot...")
     
     # Create application
-    application = Application.builder().token(BOT_TOKEN).build()
+    if WORKERS > 0:
+        logger.info("🧩 Sharding updates over %s worker processes", WORKERS)
+        application = build_intake()
+    else:
+        application = build_application()
 
-    # Add handlers
-    application.add_handler(CommandHandler("start", start))
-    application.add_handler(CommandHandler("help", help_command))
-    application.add_handler(CommandHandler("about", about_command))
-    application.add_handler(CommandHandler("health", health_check))
-    application.add_handler(CallbackQueryHandler(button_handler))
-    application.add_error_handler(error_handler)
+    await serve(application, http_server)
+    logger.info("👋 Bot stopped")
 
-    # Run bot
-    # Always use polling mode for simplicity
-    logger.info("🔄 Starting polling mode...")
-    print("✅ Bot is running... Press Ctrl+C to stop.")
-    application.run_polling(allowed_updates=Update.ALL_TYPES)
+
+def main(http_server: HTTPServer = None):
+    """Run the bot."""
+    try:
+        asyncio.run(run(http_server))
+    except KeyboardInterrupt:
+        pass
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
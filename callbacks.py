@@ -0,0 +1,148 @@
+"""
+Compact callback data for inline buttons.
+
+Telegram returns at most 64 bytes of callback_data per button, which full
+city names ("city:Greater Sudbury") outgrow as the catalogue does. Buttons
+now carry a one-letter action tag and base-36 fields separated by dots:
+
+    c.k9x.2s    city #100 of the catalogue stamped k9x
+    f.k9x.2s    toggle that city as a favorite
+    p.3         menu page 3
+    l.T         first page of cities starting with T
+    m, a, u     the user's own cities, the A-Z keyboard, stop a live clock
+
+A city is sent as its index in menu order plus a stamp of the catalogue,
+so a button from before the catalogue changed decodes as stale instead of
+naming whichever city now sits at that index. Data in the older
+"action:argument" form still decodes, so buttons on messages sent before
+the switch keep working.
+"""
+
+from typing import NamedTuple
+
+CALLBACK_DATA_LIMIT = 64  # bytes Telegram allows in callback_data
+DIGITS = "0123456789abcdefghijklmnopqrstuvwxyz"
+STAMP_WIDTH = 3
+
+# Actions
+CITY = "city"
+FAVORITE = "fav"
+PAGE = "page"
+LETTER = "letter"
+MINE = "mine"
+LETTERS = "letters"
+UNWATCH = "unwatch"
+
+TAGS = {"c": CITY, "f": FAVORITE, "p": PAGE, "l": LETTER, "m": MINE, "a": LETTERS, "u": UNWATCH}
+TAG_OF = {action: tag for tag, action in TAGS.items()}
+CITY_ACTIONS = (CITY, FAVORITE)
+
+
+class Press(NamedTuple):
+    """A decoded button press.
+
+    value is the city name, page number or letter, depending on the action;
+    for a city from another catalogue it is None. format is "compact",
+    "legacy" or "stale".
+    """
+
+    action: str
+    value: object = None
+    format: str = "compact"
+
+
+def to_base36(number: int) -> str:
+    if number < 0:
+        raise ValueError(f"negative id: {number}")
+    digits = ""
+    while True:
+        number, digit = divmod(number, 36)
+        digits = DIGITS[digit] + digits
+        if not number:
+            return digits
+
+
+def from_base36(text: str) -> int:
+    """Parse a lowercase base-36 number; ValueError for anything else."""
+    if not text or text.strip(DIGITS):
+        raise ValueError(f"not base 36: {text!r}")
+    return int(text, 36)
+
+
+def encode(action: str, *fields) -> str:
+    """Callback data for action; ints are written in base 36."""
+    parts = [TAG_OF[action]]
+    parts.extend(to_base36(field) if isinstance(field, int) else field for field in fields)
+    data = ".".join(parts)
+    if len(data.encode("utf-8")) > CALLBACK_DATA_LIMIT:
+        raise ValueError(f"callback data too long: {data}")
+    return data
+
+
+MINE_DATA = encode(MINE)
+LETTERS_DATA = encode(LETTERS)
+UNWATCH_DATA = encode(UNWATCH)
+
+
+def page_data(page: int) -> str:
+    return encode(PAGE, page)
+
+
+def letter_data(letter: str) -> str:
+    return encode(LETTER, letter)
+
+
+class CallbackCodec:
+    """Encodes cities as indexes into one catalogue's menu order and decodes any callback data.
+
+    names is the menu order (catalogue.menu_order) and fingerprint a number
+    that changes whenever the order does (names.fingerprint()).
+    """
+
+    def __init__(self, names, fingerprint: int):
+        self.names = names
+        self.stamp = to_base36(fingerprint % 36 ** STAMP_WIDTH).rjust(STAMP_WIDTH, "0")
+
+    def city_data(self, action: str, index: int) -> str:
+        """Callback data for a city action on the city at index in menu order."""
+        return encode(action, self.stamp, index)
+
+    def decode(self, data: str):
+        """Return the Press for data, or None if it is not callback data of this bot."""
+        tag, _, rest = data.partition(".")
+        action = TAGS.get(tag)
+        if action is None:
+            return self._decode_legacy(data)
+        fields = rest.split(".") if rest else []
+        try:
+            if action in CITY_ACTIONS:
+                stamp, index = fields
+                index = from_base36(index)
+                if stamp != self.stamp or index >= len(self.names):
+                    return Press(action, None, "stale")
+                return Press(action, self.names[index])
+            if action == PAGE:
+                (page,) = fields
+                return Press(action, from_base36(page))
+            if action == LETTER:
+                (letter,) = fields
+                return Press(action, letter)
+        except ValueError:
+            return None
+        return Press(action) if not fields else None
+
+    def _decode_legacy(self, data: str):
+        """Decode the older "city:Toronto", "page:3" and "mine" forms."""
+        action, separator, value = data.partition(":")
+        if action not in TAG_OF or bool(separator) != (action in CITY_ACTIONS + (PAGE, LETTER)):
+            return None
+        if not separator:
+            return Press(action, None, "legacy")
+        if action == PAGE:
+            try:
+                return Press(action, int(value), "legacy")
+            except ValueError:
+                return None
+        if action in CITY_ACTIONS and self.names.position(value) < 0:
+            return Press(action, None, "stale")
+        return Press(action, value, "legacy")
@@ -0,0 +1,299 @@
+"""
+Compact, memory-mapped city catalogue.
+
+A catalogue file holds fixed-width records sorted by folded name, an
+interned table of zone names and a blob of display names:
+
+    header   magic b"CTZ2", record count, zone count, key width,
+             zone blob size, name blob size (little-endian u32s)
+    zones    zone names, UTF-8, newline-separated
+    records  count x (folded key: key_width bytes, zone index: u16,
+             name offset: u32, name length: u16)
+    names    display names, UTF-8
+
+MappedCatalogue memory-maps the file and decodes a record only when it is
+read, so opening a 100k-city catalogue costs about as much as opening a
+100-city one, and the pages are shared with the OS page cache. It is a
+read-only Mapping of city name to IANA zone; ``.names`` is the sequence of
+names in menu (alphabetical) order.
+
+Build one from a GeoNames dump (e.g. cities15000.txt) or a name<TAB>zone file:
+    python catalogue.py build cities15000.txt cities.ctz
+    python catalogue.py build --builtin cities.ctz
+"""
+
+import bisect
+import mmap
+import struct
+import sys
+import zlib
+from collections.abc import Mapping, Sequence
+
+from search import normalize
+
+MAGIC = b"CTZ2"
+OLD_MAGICS = (b"CTZ1",)  # same layout, keys folded by an older normalize()
+HEADER = struct.Struct("<4sIIIII")
+DEFAULT_KEY_WIDTH = 24
+
+
+def fold_key(name: str, width: int = DEFAULT_KEY_WIDTH) -> bytes:
+    """The fixed-width sort key of a name: folded, truncated and NUL-padded."""
+    return normalize(name).encode("utf-8")[:width].ljust(width, b"\0")
+
+
+def _prefix_bounds(keys, prefix: str) -> tuple:
+    """Return (lo, hi) of the entries in sorted `keys` starting with prefix."""
+    folded = normalize(prefix).encode("utf-8")
+    lo = bisect.bisect_left(keys, folded)
+    hi = bisect.bisect_left(keys, folded + b"\xff")
+    return lo, hi
+
+
+class SortedNames(Sequence):
+    """Names of an in-memory catalogue in menu order."""
+
+    def __init__(self, cities):
+        self._names = tuple(sorted(cities, key=lambda name: (fold_key(name), name)))
+        self._keys = tuple(fold_key(name) for name in self._names)
+
+    def __getitem__(self, index):
+        return self._names[index]
+
+    def __len__(self):
+        return len(self._names)
+
+    def first_index(self, prefix: str) -> int:
+        """Index of the first name whose folded form starts with prefix, or -1."""
+        lo, hi = _prefix_bounds(self._keys, prefix)
+        return lo if lo < hi else -1
+
+    def position(self, name: str) -> int:
+        """Index of name, or -1 if it is not in the catalogue."""
+        key = fold_key(name)
+        index = bisect.bisect_left(self._keys, key)
+        while index < len(self._names) and self._keys[index] == key:
+            if self._names[index] == name:
+                return index
+            index += 1
+        return -1
+
+    def fingerprint(self) -> int:
+        """CRC-32 of the names in order; changes whenever a name's index may have."""
+        return zlib.crc32("\n".join(self._names).encode("utf-8"))
+
+
+class _MappedKeys(Sequence):
+    """The record keys of a MappedCatalogue, sliced straight from the map."""
+
+    def __init__(self, catalogue):
+        self._catalogue = catalogue
+
+    def __getitem__(self, index):
+        return self._catalogue._key(index)
+
+    def __len__(self):
+        return len(self._catalogue)
+
+
+class _MappedNames(Sequence):
+    """Names of a MappedCatalogue in menu order, decoded on access."""
+
+    def __init__(self, catalogue):
+        self._catalogue = catalogue
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._catalogue.name_at(i) for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        return self._catalogue.name_at(index)
+
+    def __len__(self):
+        return len(self._catalogue)
+
+    def first_index(self, prefix: str) -> int:
+        """Index of the first name whose folded form starts with prefix, or -1."""
+        lo, hi = _prefix_bounds(self._catalogue._keys, prefix)
+        return lo if lo < hi else -1
+
+    def position(self, name: str) -> int:
+        """Index of name, or -1 if it is not in the catalogue."""
+        return self._catalogue.index(name)
+
+    def fingerprint(self) -> int:
+        """CRC-32 of the records and names; changes whenever a name's index may have."""
+        return zlib.crc32(self._catalogue._map[self._catalogue._records_start:])
+
+
+class MappedCatalogue(Mapping):
+    """Read-only city -> zone mapping backed by a memory-mapped catalogue file."""
+
+    def __init__(self, path: str):
+        with open(path, "rb") as fh:
+            self._map = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, count, zone_count, key_width, zones_size, names_size = HEADER.unpack_from(self._map)
+        if magic in OLD_MAGICS:
+            raise ValueError(f"{path} was built by an older version; rebuild it with catalogue.py build")
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a city catalogue")
+        self.path = path
+        self._count = count
+        self._record = struct.Struct(f"<{key_width}sHIH")
+        self._key_width = key_width
+        zones_start = HEADER.size
+        self._records_start = zones_start + zones_size
+        self._names_start = self._records_start + count * self._record.size
+        if len(self._map) < self._names_start + names_size:
+            raise ValueError(f"{path} is truncated")
+        zones = bytes(self._map[zones_start:self._records_start]).decode("utf-8")
+        self._zones = tuple(zones.split("\n")) if zone_count else ()
+        self._keys = _MappedKeys(self)
+        self.names = _MappedNames(self)
+
+    def close(self):
+        self._map.close()
+
+    # ---------------------- RECORDS ----------------------
+    def _key(self, index: int) -> bytes:
+        start = self._records_start + index * self._record.size
+        return self._map[start:start + self._key_width]
+
+    def _unpack(self, index: int) -> tuple:
+        return self._record.unpack_from(self._map, self._records_start + index * self._record.size)
+
+    def name_at(self, index: int) -> str:
+        _, _, offset, length = self._unpack(index)
+        start = self._names_start + offset
+        return self._map[start:start + length].decode("utf-8")
+
+    def zone_at(self, index: int) -> str:
+        return self._zones[self._unpack(index)[1]]
+
+    def index(self, name: str) -> int:
+        """Position of name in menu order, or -1 if it is not in the catalogue."""
+        key = fold_key(name, self._key_width)
+        position = bisect.bisect_left(self._keys, key)
+        while position < self._count and self._key(position) == key:
+            if self.name_at(position) == name:
+                return position
+            position += 1
+        return -1
+
+    # ---------------------- MAPPING ----------------------
+    def __getitem__(self, name):
+        if not isinstance(name, str):
+            raise KeyError(name)
+        position = self.index(name)
+        if position < 0:
+            raise KeyError(name)
+        return self.zone_at(position)
+
+    def __contains__(self, name):
+        return isinstance(name, str) and self.index(name) >= 0
+
+    def __iter__(self):
+        return iter(self.names)
+
+    def __len__(self):
+        return self._count
+
+    def zones(self) -> tuple:
+        """The interned zone table."""
+        return self._zones
+
+
+def menu_order(cities) -> Sequence:
+    """Names of a catalogue in menu order, with first_index(prefix) for letter jumps."""
+    if isinstance(cities, MappedCatalogue):
+        return cities.names
+    return SortedNames(cities)
+
+
+# ---------------------- BUILDING ----------------------
+def write_catalogue(path: str, cities, key_width: int = DEFAULT_KEY_WIDTH) -> int:
+    """Write a name -> zone mapping as a catalogue file and return its record count."""
+    zones = sorted(set(cities.values()))
+    if len(zones) > 0xFFFF:
+        raise ValueError("too many distinct zones")
+    zone_ids = {zone: i for i, zone in enumerate(zones)}
+    record = struct.Struct(f"<{key_width}sHIH")
+
+    names = sorted(cities, key=lambda name: (fold_key(name, key_width), name))
+    records = bytearray()
+    blob = bytearray()
+    for name in names:
+        encoded = name.encode("utf-8")
+        if len(encoded) > 0xFFFF:
+            raise ValueError(f"name too long: {name[:40]}...")
+        records += record.pack(fold_key(name, key_width), zone_ids[cities[name]], len(blob), len(encoded))
+        blob += encoded
+
+    zone_blob = "\n".join(zones).encode("utf-8")
+    with open(path, "wb") as fh:
+        fh.write(HEADER.pack(MAGIC, len(names), len(zones), key_width, len(zone_blob), len(blob)))
+        fh.write(zone_blob)
+        fh.write(records)
+        fh.write(blob)
+    return len(names)
+
+
+def read_city_file(path: str) -> dict:
+    """Read a GeoNames cities dump or a name<TAB>zone file into a name -> zone dict.
+
+    GeoNames rows are taken by descending population. A name seen before is
+    disambiguated with its country (then admin1) code.
+    """
+    rows = []
+    with open(path, encoding="utf-8") as fh:
+        for line in fh:
+            columns = line.rstrip("\n").split("\t")
+            if len(columns) >= 18:  # GeoNames: name, country, admin1, population, timezone
+                population = int(columns[14] or 0)
+                rows.append((population, columns[1], columns[8], columns[10], columns[17]))
+            elif len(columns) == 2 and columns[0] and columns[1]:
+                rows.append((0, columns[0], "", "", columns[1]))
+    rows.sort(key=lambda row: -row[0])
+
+    cities = {}
+    for _, name, country, admin1, zone in rows:
+        if not zone:
+            continue
+        for candidate in (name, f"{name}, {country}", f"{name}, {country} {admin1}"):
+            if candidate not in cities:
+                break
+        else:
+            continue
+        cities[candidate] = zone
+    return cities
+
+
+def main(argv=None) -> int:
+    import argparse  # only the CLI needs it; keeps the bot's import light
+
+    parser = argparse.ArgumentParser(description="Build a compact city catalogue")
+    commands = parser.add_subparsers(dest="command", required=True)
+    build = commands.add_parser("build", help="write a catalogue file")
+    build.add_argument("source", nargs="?", help="GeoNames dump or name<TAB>zone file")
+    build.add_argument("output")
+    build.add_argument("--builtin", action="store_true", help="use the catalogue built into bot_enhanced")
+    build.add_argument("--key-width", type=int, default=DEFAULT_KEY_WIDTH)
+    args = parser.parse_args(argv)
+
+    if args.builtin:
+        import bot_enhanced
+
+        cities = dict(bot_enhanced.CITY_TIMEZONES)
+    elif args.source:
+        cities = read_city_file(args.source)
+    else:
+        parser.error("a source file or --builtin is required")
+    count = write_catalogue(args.output, cities, args.key_width)
+    print(f"✅ Wrote {count} cities to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
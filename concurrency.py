@@ -0,0 +1,119 @@
+"""
+Concurrent update processing with per-chat ordering.
+
+python-telegram-bot either processes updates one at a time or, with
+``concurrent_updates``, in parallel with no ordering at all. This
+Application subclass sits in between: every chat gets a FIFO lane, lanes
+run in parallel, and at most ``max_in_flight`` updates are queued or running
+across all lanes. When that bound is hit, process_update waits, which stalls
+the update fetcher and lets the bounded update queue push back on intake.
+"""
+
+import asyncio
+import collections
+
+from telegram.ext import Application
+
+
+def chat_key(update) -> object:
+    """Return the ordering key for an update: its chat, else its user."""
+    chat = getattr(update, "effective_chat", None)
+    if chat is not None:
+        return chat.id
+    user = getattr(update, "effective_user", None)
+    if user is not None:
+        return ("user", user.id)
+    return None
+
+
+class ChatOrderedApplication(Application):
+    """Application that runs different chats in parallel but each chat in order."""
+
+    def __init__(self, *, max_in_flight: int = 64, tracker=None, **kwargs):
+        super().__init__(**kwargs)
+        self.max_in_flight = max_in_flight
+        self.tracker = tracker  # offsets.UpdateTracker, told when updates finish
+        self._slots = asyncio.Semaphore(max_in_flight)
+        self._lanes = {}
+        self._in_flight = 0
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._lane_tasks = set()
+        self._abandoned = False  # set when a stop is cut off; later updates are left unhandled
+
+    @property
+    def in_flight(self) -> int:
+        """Updates accepted but not yet fully processed."""
+        return self._in_flight
+
+    @property
+    def active_lanes(self) -> int:
+        """Chats with at least one queued or running update."""
+        return len(self._lanes)
+
+    async def process_update(self, update: object) -> None:
+        """Queue update on its chat's lane, waiting while max_in_flight is reached."""
+        if self._abandoned or (self.tracker is not None and not self.tracker.accept(update)):
+            return
+        await self._slots.acquire()
+        if self._abandoned:
+            self._slots.release()
+            return
+        self._in_flight += 1
+        self._idle.clear()
+
+        key = chat_key(update)
+        lane = self._lanes.get(key)
+        if lane is not None:
+            lane.append(update)
+            return
+
+        lane = self._lanes[key] = collections.deque([update])
+        # Tracked here rather than with create_task: Application.stop() marks
+        # the application stopped before draining its queue, so lanes opened
+        # during the drain would escape it.
+        task = asyncio.get_running_loop().create_task(self._drain_lane(key, lane))
+        self._lane_tasks.add(task)
+        task.add_done_callback(self._lane_tasks.discard)
+
+    async def _drain_lane(self, key, lane: collections.deque):
+        try:
+            while lane:
+                try:
+                    await super().process_update(lane[0])
+                    if self.tracker is not None:
+                        self.tracker.done(lane[0])
+                finally:
+                    lane.popleft()
+                    self._in_flight -= 1
+                    self._slots.release()
+        finally:
+            # Only non-empty if this worker was cancelled; give back their slots.
+            for _ in lane:
+                self._in_flight -= 1
+                self._slots.release()
+            lane.clear()
+            del self._lanes[key]
+            if not self._lanes:
+                self._idle.set()
+
+    async def stop(self) -> None:
+        """Stop like Application.stop, then wait for every chat lane to finish.
+
+        If the stop is cancelled (e.g. by a shutdown deadline), the lanes are
+        cancelled too, and updates the fetcher still hands over afterwards
+        are not handled, leaving all of them unfinished.
+        """
+        try:
+            await super().stop()
+            if self._lane_tasks:
+                await asyncio.gather(*self._lane_tasks)
+        except asyncio.CancelledError:
+            self._abandoned = True
+            for task in self._lane_tasks:
+                task.cancel()
+            raise
+
+    async def wait_idle(self):
+        """Wait until every accepted update has been processed."""
+        await self._idle.wait()
@@ -0,0 +1,98 @@
+"""
+Wall-clock conversion for /convert.
+
+"/convert 3pm Toronto to Vancouver" converts one time between two cities;
+"/convert 3pm Toronto" shows that instant everywhere. The source wall time
+is localized once, with explicit handling for the DST edges: a time that
+happens twice (clocks fall back) resolves to the first occurrence, and a
+time that never happens (clocks spring forward) is moved forward by the
+gap. The resulting instant is then rendered per distinct zone through
+board.ZoneGroups, so converting into every city costs one offset lookup per
+zone rather than one localize() per city.
+"""
+
+import re
+from datetime import datetime
+
+import pytz
+
+AMBIGUOUS = "ambiguous"
+NONEXISTENT = "nonexistent"
+
+_TIME = re.compile(
+    r"^\s*(?:(?P<noon>noon)|(?P<midnight>midnight)|"
+    r"(?P<hour>\d{1,2})(?::(?P<minute>\d{2}))?\s*(?P<meridiem>[ap])\.?m?\.?)(?=\s|$)"
+    r"|^\s*(?P<hour24>\d{1,2}):(?P<minute24>\d{2})(?=\s|$)",
+    re.IGNORECASE,
+)
+_TO = re.compile(r"\s+(?:to|in|->|→)\s+", re.IGNORECASE)
+
+
+def parse_time(text: str):
+    """Parse the time at the start of text; returns (hour, minute, rest) or None.
+
+    Accepts "3pm", "3:30 p.m.", "15:00", "noon" and "midnight".
+    """
+    match = _TIME.match(text)
+    if match is None:
+        return None
+    rest = text[match.end():].strip()
+    if match["noon"]:
+        return 12, 0, rest
+    if match["midnight"]:
+        return 0, 0, rest
+    if match["hour24"] is not None:
+        hour, minute = int(match["hour24"]), int(match["minute24"])
+        if hour > 23 or minute > 59:
+            return None
+        return hour, minute, rest
+    hour, minute = int(match["hour"]), int(match["minute"] or 0)
+    if not 1 <= hour <= 12 or minute > 59:
+        return None
+    hour = hour % 12 + (12 if match["meridiem"].lower() == "p" else 0)
+    return hour, minute, rest
+
+
+def parse_request(text: str):
+    """Split "3pm Toronto to Vancouver" into (hour, minute, source, target or None)."""
+    parsed = parse_time(text)
+    if parsed is None:
+        return None
+    hour, minute, rest = parsed
+    parts = _TO.split(rest)
+    if len(parts) > 2:
+        # Only the last separator splits; earlier ones belong to the source name.
+        parts = [" to ".join(parts[:-1]), parts[-1]]
+    source = parts[0].strip()
+    if not source:
+        return None
+    target = parts[1].strip() if len(parts) == 2 else None
+    return hour, minute, source, target or None
+
+
+def localize(tz, naive: datetime):
+    """Attach tz to a wall time; returns (aware datetime, None | AMBIGUOUS | NONEXISTENT)."""
+    try:
+        return tz.localize(naive, is_dst=None), None
+    except pytz.AmbiguousTimeError:
+        return tz.localize(naive, is_dst=True), AMBIGUOUS
+    except pytz.NonExistentTimeError:
+        # Read the wall time with the pre-transition offset, which lands the
+        # instant after the gap: 2:30 on a spring-forward night becomes 3:30.
+        return tz.normalize(tz.localize(naive, is_dst=False)), NONEXISTENT
+
+
+def source_instant(tz, hour: int, minute: int, now: float):
+    """The instant `hour:minute` falls on today in tz; returns (aware datetime, note)."""
+    today = datetime.fromtimestamp(now, tz).date()
+    return localize(tz, datetime(today.year, today.month, today.day, hour, minute))
+
+
+def describe_note(note, city: str, hour: int, minute: int, instant: datetime) -> str:
+    """Explain how a DST edge was resolved, or "" when the time was unambiguous."""
+    wall = datetime(2000, 1, 1, hour, minute).strftime("%I:%M %p")
+    if note == AMBIGUOUS:
+        return f"⚠️ {wall} happens twice in {city} that day; using the first ({instant:%Z})."
+    if note == NONEXISTENT:
+        return f"⚠️ {wall} is skipped in {city} that day (clocks spring forward); using {instant:%I:%M %p %Z}."
+    return ""
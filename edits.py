@@ -0,0 +1,106 @@
+"""
+Deduplication and coalescing of inline-keyboard edits.
+
+Refresh re-sends the page already on screen and double-taps on Next/Prev
+fire the same edit twice; Telegram rejects both with "message is not
+modified" after spending an API call and a rate-limit slot. The coalescer
+remembers the markup last rendered on each message, skips edits that would
+not change it, and holds edits for a short window so a burst of taps on
+one message results in a single edit carrying the final state.
+"""
+
+import asyncio
+import collections
+import logging
+
+from telegram.error import BadRequest
+
+logger = logging.getLogger(__name__)
+
+
+def message_key(query) -> object:
+    """Identify the message a callback query came from, or None if unknown."""
+    if query.inline_message_id:
+        return query.inline_message_id
+    message = query.message
+    if message is None:
+        return None
+    return (message.chat_id, message.message_id)
+
+
+class EditCoalescer:
+    """Sends only the latest markup per message and skips edits that change nothing."""
+
+    def __init__(self, window: float = 0.25, max_messages: int = 10_000):
+        self.window = window
+        self.max_messages = max_messages
+        self.sent = 0
+        self.skipped = 0
+        self.coalesced = 0
+        self._rendered = collections.OrderedDict()  # key -> markup on screen
+        self._pending = {}  # key -> (send, markup) waiting for the window to close
+        self._tasks = set()
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    def remember(self, key, markup):
+        """Record that `markup` is what the message `key` currently shows."""
+        if key is None:
+            return
+        self._rendered[key] = markup
+        self._rendered.move_to_end(key)
+        while len(self._rendered) > self.max_messages:
+            self._rendered.popitem(last=False)
+
+    def forget(self, key):
+        self._rendered.pop(key, None)
+
+    async def edit(self, key, markup, send):
+        """Show `markup` on message `key` via `await send(markup)`, if it changes anything.
+
+        With a window, the edit is sent in the background once the window
+        closes; edits for the same message arriving meanwhile replace it.
+        """
+        if key in self._pending:
+            self._pending[key] = (send, markup)
+            self.coalesced += 1
+            return
+        if self.window <= 0 or key is None:
+            await self._apply(key, send, markup)
+            return
+        self._pending[key] = (send, markup)
+        task = asyncio.get_running_loop().create_task(self._flush_later(key))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def drain(self):
+        """Send every edit still waiting for its window."""
+        while self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    async def _flush_later(self, key):
+        try:
+            await asyncio.sleep(self.window)
+        finally:
+            send, markup = self._pending.pop(key)
+        try:
+            await self._apply(key, send, markup)
+        except Exception as e:
+            logger.warning("Coalesced edit failed: %s", e)
+
+    async def _apply(self, key, send, markup):
+        if key is not None and self._rendered.get(key) == markup:
+            self.skipped += 1
+            return
+        try:
+            await send(markup)
+        except BadRequest as e:
+            if "not modified" not in str(e).lower():
+                self.forget(key)
+                raise
+            self.skipped += 1
+        else:
+            self.sent += 1
+        self.remember(key, markup)
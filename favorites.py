@@ -0,0 +1,221 @@
+"""
+Per-user favorite and recently used cities.
+
+FavoritesStore keeps the entries of recently active users in an LRU and
+persists them to SQLite in WAL mode. Handlers only touch memory: changes
+mark the entry dirty and a background task writes every dirty entry in one
+transaction per flush interval. Cache misses and writes both run on a
+single database thread, so the event loop never blocks on disk and only
+active users are held in memory.
+
+The cache is per process. With WORKERS set, updates are routed by chat, so
+a user who uses the bot from two chats on different workers has an entry
+cached in each; whichever worker flushes last overwrites the other's
+changes. Private chats, where favorites are normally edited, always land
+on the same worker.
+
+Until start() is called the store is memory-only, which is what tests and
+benchmarks use. It stays memory-only, with an error logged, if start()
+cannot open the database (e.g. its directory is not writable), so the bot
+still runs and favorites last until restart.
+"""
+
+import asyncio
+import collections
+import concurrent.futures
+import json
+import logging
+import sqlite3
+import time
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS user_cities (
+    user_id   INTEGER PRIMARY KEY,
+    favorites TEXT NOT NULL,
+    recent    TEXT NOT NULL,
+    updated   REAL NOT NULL
+)
+"""
+
+
+class UserCities:
+    """A user's favorite cities and most recently used cities, newest first."""
+
+    __slots__ = ("favorites", "recent")
+
+    def __init__(self, favorites=(), recent=()):
+        self.favorites = list(favorites)
+        self.recent = list(recent)
+
+    def __bool__(self):
+        return bool(self.favorites or self.recent)
+
+    def shortlist(self, size: int) -> list:
+        """Favorites first, then recent cities that are not favorites."""
+        cities = self.favorites[:size]
+        cities += [city for city in self.recent if city not in cities][:size - len(cities)]
+        return cities
+
+
+class FavoritesStore:
+    """LRU of UserCities in front of a write-behind SQLite table."""
+
+    def __init__(
+        self,
+        path: str,
+        capacity: int = 10_000,
+        flush_interval: float = 1.0,
+        max_favorites: int = 10,
+        max_recent: int = 5,
+    ):
+        self.path = path
+        self.capacity = capacity
+        self.flush_interval = flush_interval
+        self.max_favorites = max_favorites
+        self.max_recent = max_recent
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self._cache = collections.OrderedDict()  # user_id -> UserCities
+        self._dirty = {}  # user_id -> UserCities not yet written
+        self._db = None
+        self._executor = None
+        self._flusher = None
+
+    @property
+    def pending_writes(self) -> int:
+        return len(self._dirty)
+
+    def cached(self, user_id: int) -> bool:
+        """Whether load(user_id) would be answered without reading the database."""
+        return self._db is None or user_id in self._cache or user_id in self._dirty
+
+    # ---------------------- LIFECYCLE ----------------------
+    async def start(self):
+        """Open the database and start flushing in the background."""
+        if self._flusher is not None or not self.path:
+            return
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix="favorites")
+        try:
+            self._db = await self._run(self._open)
+        except (sqlite3.Error, OSError) as e:
+            logger.error("Could not open favorites database %s, keeping favorites in memory only: %s", self.path, e)
+            self._executor.shutdown()
+            self._executor = None
+            return
+        self._flusher = asyncio.get_running_loop().create_task(self._flush_periodically())
+
+    async def stop(self):
+        """Write everything still pending and close the database."""
+        if self._flusher is None:
+            return
+        self._flusher.cancel()
+        try:
+            await self._flusher
+        except asyncio.CancelledError:
+            pass
+        self._flusher = None
+        await self.flush()
+        await self._run(self._db.close)
+        self._db = None
+        self._executor.shutdown()
+        self._executor = None
+
+    def _open(self) -> sqlite3.Connection:
+        db = sqlite3.connect(self.path, check_same_thread=False, timeout=5)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=NORMAL")
+        db.execute(SCHEMA)
+        db.commit()
+        return db
+
+    async def _run(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+
+    # ---------------------- READS ----------------------
+    async def load(self, user_id: int) -> UserCities:
+        """Return the user's cities, reading them from disk on a cache miss."""
+        entry = self._cache.get(user_id)
+        if entry is not None:
+            self.hits += 1
+            self._cache.move_to_end(user_id)
+            return entry
+        self.misses += 1
+        entry = self._dirty.get(user_id)
+        if entry is None and self._db is not None:
+            entry = await self._run(self._read, user_id)
+            # Another handler may have loaded it while we waited.
+            entry = self._cache.get(user_id, entry)
+        if entry is None:
+            entry = UserCities()
+        self._remember(user_id, entry)
+        return entry
+
+    def _read(self, user_id: int):
+        row = self._db.execute(
+            "SELECT favorites, recent FROM user_cities WHERE user_id = ?", (user_id,)
+        ).fetchone()
+        return UserCities(json.loads(row[0]), json.loads(row[1])) if row else None
+
+    def _remember(self, user_id: int, entry: UserCities):
+        self._cache[user_id] = entry
+        self._cache.move_to_end(user_id)
+        while len(self._cache) > self.capacity:
+            # Dirty entries stay reachable through _dirty until flushed.
+            self._cache.popitem(last=False)
+
+    # ---------------------- WRITES ----------------------
+    async def record_use(self, user_id: int, city: str) -> UserCities:
+        """Move city to the front of the user's recent cities."""
+        entry = await self.load(user_id)
+        if entry.recent[:1] != [city]:
+            entry.recent = [city] + [c for c in entry.recent if c != city][:self.max_recent - 1]
+            self._dirty[user_id] = entry
+        return entry
+
+    async def toggle_favorite(self, user_id: int, city: str) -> bool:
+        """Add or remove city from the user's favorites; returns whether it is now a favorite."""
+        entry = await self.load(user_id)
+        if city in entry.favorites:
+            entry.favorites.remove(city)
+            favorite = False
+        else:
+            entry.favorites = [city] + entry.favorites[:self.max_favorites - 1]
+            favorite = True
+        self._dirty[user_id] = entry
+        return favorite
+
+    async def flush(self):
+        """Write every dirty entry in a single transaction."""
+        if not self._dirty or self._db is None:
+            return
+        batch, self._dirty = self._dirty, {}
+        now = time.time()
+        rows = [
+            (user_id, json.dumps(entry.favorites), json.dumps(entry.recent), now)
+            for user_id, entry in batch.items()
+        ]
+        try:
+            await self._run(self._write, rows)
+        except sqlite3.Error as e:
+            logger.error("Writing %s favorites failed, will retry: %s", len(rows), e)
+            batch.update(self._dirty)
+            self._dirty = batch
+            return
+        self.writes += len(rows)
+
+    def _write(self, rows: list):
+        with self._db:
+            self._db.executemany(
+                "INSERT INTO user_cities (user_id, favorites, recent, updated) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(user_id) DO UPDATE SET favorites = excluded.favorites, "
+                "recent = excluded.recent, updated = excluded.updated",
+                rows,
+            )
+
+    async def _flush_periodically(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
@@ -0,0 +1,122 @@
+"""
+Live health and readiness state for the bot process.
+
+The HTTP server shares the bot's event loop, so /health and /ready can
+report what the bot is actually doing: whether the update intake (polling
+or webhook) is alive, when the last update arrived and how far the event
+loop is lagging behind its schedule.
+"""
+
+import asyncio
+import json
+import time
+from http import HTTPStatus
+
+from httpd import json_response
+
+
+class LoopLagMonitor:
+    """Measures event-loop lag by timing a periodic sleep."""
+
+    def __init__(self, interval: float = 0.5):
+        self.interval = interval
+        self.lag = 0.0
+        self.max_lag = 0.0
+        self._task = None
+
+    def start(self):
+        """Start sampling on the running loop."""
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        """Stop sampling."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            started = loop.time()
+            await asyncio.sleep(self.interval)
+            self.lag = max(0.0, loop.time() - started - self.interval)
+            self.max_lag = max(self.max_lag, self.lag)
+
+
+class BotHealth:
+    """Aggregated liveness/readiness state, updated by the bot runner."""
+
+    def __init__(self, max_lag: float = 5.0):
+        self.max_lag = max_lag
+        self.mode = None
+        self.started_at = None
+        self.ready = False
+        self.last_update_at = None
+        self.updates_seen = 0
+        self.last_intake_error = None
+        self.lag_monitor = LoopLagMonitor()
+        self._intake_alive = lambda: False
+
+    def attach(self, mode: str, intake_alive):
+        """Record the intake mode and a callable reporting whether it is running."""
+        self.mode = mode
+        self._intake_alive = intake_alive
+        self.started_at = time.time()
+
+    def record_update(self):
+        """Note that an update has just been received."""
+        self.last_update_at = time.time()
+        self.updates_seen += 1
+
+    def record_intake_error(self, error):
+        """Note a failure while fetching updates (polling error callback)."""
+        self.last_intake_error = {"at": time.time(), "error": repr(error)}
+
+    def intake_alive(self) -> bool:
+        return bool(self._intake_alive())
+
+    def healthy(self) -> bool:
+        return self.intake_alive() and self.lag_monitor.lag < self.max_lag
+
+    def snapshot(self) -> dict:
+        now = time.time()
+        return {
+            "status": "healthy" if self.healthy() else "unhealthy",
+            "ready": self.ready,
+            "mode": self.mode,
+            "intake_alive": self.intake_alive(),
+            "uptime_seconds": round(now - self.started_at, 1) if self.started_at else None,
+            "last_update_at": self.last_update_at,
+            "seconds_since_last_update": (
+                round(now - self.last_update_at, 1) if self.last_update_at else None
+            ),
+            "updates_seen": self.updates_seen,
+            "loop_lag_ms": round(self.lag_monitor.lag * 1000, 2),
+            "max_loop_lag_ms": round(self.lag_monitor.max_lag * 1000, 2),
+            "last_intake_error": self.last_intake_error,
+        }
+
+
+HEALTH = BotHealth()
+
+
+def add_health_routes(server, health: BotHealth = HEALTH):
+    """Register /health and /ready on an httpd.HTTPServer."""
+
+    async def health_endpoint(request):
+        state = health.snapshot()
+        status = HTTPStatus.OK if state["status"] == "healthy" else HTTPStatus.SERVICE_UNAVAILABLE
+        return json_response(json.dumps(state).encode(), status)
+
+    async def ready_endpoint(request):
+        ready = health.ready and health.intake_alive()
+        payload = json.dumps({"ready": ready, "mode": health.mode}).encode()
+        return json_response(payload, HTTPStatus.OK if ready else HTTPStatus.SERVICE_UNAVAILABLE)
+
+    server.route("GET", "/health", health_endpoint)
+    server.route("GET", "/ready", ready_endpoint)
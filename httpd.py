@@ -0,0 +1,175 @@
+"""
+Minimal asyncio HTTP/1.1 server used for the webhook receiver.
+
+It runs on the same event loop as the bot, so request handlers can hand
+work straight to the Application without crossing threads. Only what the
+bot needs is implemented: Content-Length bodies, keep-alive and a flat
+(method, path) route table.
+"""
+
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from http import HTTPStatus
+from urllib.parse import parse_qs, urlsplit
+
+logger = logging.getLogger(__name__)
+
+MAX_HEADER_BYTES = 16 * 1024
+MAX_BODY_BYTES = 1024 * 1024
+IDLE_TIMEOUT = 30.0
+
+
+@dataclass
+class Request:
+    method: str
+    path: str
+    query: dict
+    headers: dict  # lower-cased header names
+    body: bytes = b""
+
+
+@dataclass
+class Response:
+    status: int = 200
+    body: bytes = b""
+    content_type: str = "text/plain; charset=utf-8"
+    headers: dict = field(default_factory=dict)
+
+
+def json_response(payload: bytes, status: int = 200) -> Response:
+    """Build a JSON response from an already-encoded payload."""
+    return Response(status, payload, "application/json")
+
+
+class HTTPServer:
+    """Route-table HTTP server running on the current event loop."""
+
+    def __init__(self, host: str = "0.0.0.0", port: int = 8080):
+        self.host = host
+        self.port = port
+        self.routes = {}
+        self._server = None
+        self._connections = set()
+
+    def route(self, method: str, path: str, handler):
+        """Register an async handler(Request) -> Response for method and path."""
+        self.routes[(method.upper(), path)] = handler
+
+    @property
+    def serving(self) -> bool:
+        return self._server is not None and self._server.is_serving()
+
+    async def start(self):
+        """Start listening; port 0 picks a free port, available afterwards as .port.
+
+        Does nothing when already listening, so a server can be started early
+        and handed to the bot.
+        """
+        if self._server is not None:
+            return
+        self._server = await asyncio.start_server(
+            self._handle_connection, self.host, self.port, limit=MAX_HEADER_BYTES
+        )
+        self.port = self._server.sockets[0].getsockname()[1]
+        logger.info("🌐 HTTP server listening on %s:%s", self.host, self.port)
+
+    async def stop(self):
+        """Stop accepting connections, then close the open ones."""
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        for task in list(self._connections):
+            task.cancel()
+        await asyncio.gather(*self._connections, return_exceptions=True)
+
+    async def _handle_connection(self, reader, writer):
+        task = asyncio.current_task()
+        self._connections.add(task)
+        try:
+            while True:
+                request = await asyncio.wait_for(self._read_request(reader), IDLE_TIMEOUT)
+                if request is None:
+                    break
+                if isinstance(request, Response):
+                    await self._write_response(writer, request, keep_alive=False)
+                    break
+                response = await self._dispatch(request)
+                keep_alive = request.headers.get("connection", "").lower() != "close"
+                await self._write_response(
+                    writer, response, keep_alive, include_body=request.method != "HEAD"
+                )
+                if not keep_alive:
+                    break
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError):
+            pass
+        except asyncio.CancelledError:
+            # Closed by stop(). Returning normally keeps asyncio's stream
+            # callback from logging the cancellation as an error (3.11).
+            pass
+        finally:
+            self._connections.discard(task)
+            writer.close()
+
+    async def _read_request(self, reader):
+        try:
+            head = await reader.readuntil(b"\r\n\r\n")
+        except asyncio.IncompleteReadError:
+            return None
+        except asyncio.LimitOverrunError:
+            return Response(HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE)
+
+        lines = head.decode("latin-1").split("\r\n")
+        try:
+            method, target, _version = lines[0].split(" ", 2)
+        except ValueError:
+            return Response(HTTPStatus.BAD_REQUEST)
+
+        headers = {}
+        for line in lines[1:]:
+            if not line:
+                continue
+            name, _, value = line.partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        if "chunked" in headers.get("transfer-encoding", "").lower():
+            return Response(HTTPStatus.LENGTH_REQUIRED)
+        try:
+            length = int(headers.get("content-length", 0))
+        except ValueError:
+            return Response(HTTPStatus.BAD_REQUEST)
+        if length > MAX_BODY_BYTES:
+            return Response(HTTPStatus.REQUEST_ENTITY_TOO_LARGE)
+        body = await reader.readexactly(length) if length else b""
+
+        url = urlsplit(target)
+        return Request(method.upper(), url.path, parse_qs(url.query), headers, body)
+
+    async def _dispatch(self, request: Request) -> Response:
+        handler = self.routes.get((request.method, request.path))
+        if handler is None and request.method == "HEAD":
+            handler = self.routes.get(("GET", request.path))
+        if handler is None:
+            if any(path == request.path for _, path in self.routes):
+                return Response(HTTPStatus.METHOD_NOT_ALLOWED, b"Method Not Allowed")
+            return Response(HTTPStatus.NOT_FOUND, b"Not Found")
+        try:
+            return await handler(request)
+        except Exception:
+            logger.exception("Unhandled error serving %s %s", request.method, request.path)
+            return Response(HTTPStatus.INTERNAL_SERVER_ERROR, b"Internal Server Error")
+
+    @staticmethod
+    async def _write_response(writer, response: Response, keep_alive: bool, include_body=True):
+        status = HTTPStatus(response.status)
+        head = [
+            f"HTTP/1.1 {status.value} {status.phrase}",
+            f"Content-Type: {response.content_type}",
+            f"Content-Length: {len(response.body)}",
+            "Connection: keep-alive" if keep_alive else "Connection: close",
+        ]
+        head.extend(f"{name}: {value}" for name, value in response.headers.items())
+        payload = ("\r\n".join(head) + "\r\n\r\n").encode("latin-1")
+        writer.write(payload + response.body if include_body else payload)
+        await writer.drain()
@@ -0,0 +1,213 @@
+"""
+Local stand-in for the Telegram Bot API, for load testing.
+
+Implements just enough of the API for the bot to run against it:
+getMe, getUpdates (long polling), sendMessage, editMessageText,
+editMessageReplyMarkup, answerCallbackQuery, answerInlineQuery, setWebhook
+and deleteWebhook. Every response can be
+delayed by a configurable latency, and a share of calls can be answered
+with 429 "Too Many Requests" to exercise flood-control handling.
+
+Run standalone:
+    python loadtest/fake_bot_api.py --port 8081 --latency 0.02 --rate-limit-ratio 0.01
+then start the bot with BOT_API_BASE_URL=http://127.0.0.1:8081/bot.
+"""
+
+import argparse
+import asyncio
+import collections
+import itertools
+import json
+import os
+import random
+import sys
+import time
+from http import HTTPStatus
+from urllib.parse import parse_qs
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from httpd import HTTPServer, json_response  # noqa: E402
+
+DEFAULT_TOKEN = "123456:LOADTEST"
+BOT_USER = {"id": 123456, "is_bot": True, "first_name": "LoadTestBot", "username": "loadtest_bot"}
+
+
+def parse_params(request) -> dict:
+    """Decode Bot API parameters from a JSON or form-encoded body."""
+    if not request.body:
+        return {}
+    if request.headers.get("content-type", "").startswith("application/json"):
+        return json.loads(request.body)
+    params = {}
+    for name, values in parse_qs(request.body.decode("utf-8"), keep_blank_values=True).items():
+        try:
+            params[name] = json.loads(values[-1])
+        except ValueError:
+            params[name] = values[-1]
+    return params
+
+
+class FakeBotAPI:
+    """In-memory Bot API with injectable updates and observable responses."""
+
+    def __init__(self, token=DEFAULT_TOKEN, latency=0.0, jitter=0.0, rate_limit_ratio=0.0, retry_after=1):
+        self.token = token
+        self.latency = latency
+        self.jitter = jitter
+        self.rate_limit_ratio = rate_limit_ratio
+        self.retry_after = retry_after
+        self.webhook_url = ""
+        self.calls = collections.Counter()
+        self.rate_limited = collections.Counter()
+        self.listeners = []  # callables(method, params, timestamp)
+        self._updates = collections.deque()
+        self._update_ids = itertools.count(1)
+        self._message_ids = itertools.count(1000)
+        self._new_updates = asyncio.Event()
+        self._random = random.Random(0)
+        self._handlers = {
+            "getMe": self.get_me,
+            "getUpdates": self.get_updates,
+            "sendMessage": self.send_message,
+            "editMessageText": self.edit_message_text,
+            "editMessageReplyMarkup": self.edit_message_reply_markup,
+            "answerCallbackQuery": self.answer_callback_query,
+            "answerInlineQuery": self.answer_inline_query,
+            "setWebhook": self.set_webhook,
+            "deleteWebhook": self.delete_webhook,
+        }
+
+    # ---------------------- UPDATE INTAKE ----------------------
+    def next_update_id(self) -> int:
+        return next(self._update_ids)
+
+    def enqueue_update(self, update: dict):
+        """Make an update available to the next getUpdates call."""
+        update.setdefault("update_id", self.next_update_id())
+        self._updates.append(update)
+        self._new_updates.set()
+
+    @property
+    def pending_updates(self) -> int:
+        return len(self._updates)
+
+    # ---------------------- HTTP ----------------------
+    def mount(self, server: HTTPServer):
+        """Register every supported method on server."""
+        for method in self._handlers:
+            for verb in ("GET", "POST"):
+                server.route(verb, f"/bot{self.token}/{method}", self._endpoint(method))
+
+    def _endpoint(self, method):
+        async def endpoint(request):
+            return await self.dispatch(method, parse_params(request))
+
+        return endpoint
+
+    async def dispatch(self, method: str, params: dict):
+        self.calls[method] += 1
+        if self.latency or self.jitter:
+            await asyncio.sleep(max(0.0, self.latency + self._random.uniform(-self.jitter, self.jitter)))
+        if method != "getUpdates" and self._random.random() < self.rate_limit_ratio:
+            self.rate_limited[method] += 1
+            return self._error(
+                HTTPStatus.TOO_MANY_REQUESTS,
+                f"Too Many Requests: retry after {self.retry_after}",
+                {"retry_after": self.retry_after},
+            )
+        result = await self._handlers[method](params)
+        now = time.perf_counter()
+        for listener in self.listeners:
+            listener(method, params, now)
+        return json_response(json.dumps({"ok": True, "result": result}).encode())
+
+    @staticmethod
+    def _error(status, description, parameters=None):
+        payload = {"ok": False, "error_code": int(status), "description": description}
+        if parameters:
+            payload["parameters"] = parameters
+        return json_response(json.dumps(payload).encode(), status)
+
+    def _message(self, params: dict) -> dict:
+        chat_id = params.get("chat_id")
+        return {
+            "message_id": params.get("message_id") or next(self._message_ids),
+            "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "private"},
+            "from": BOT_USER,
+            "text": params.get("text", ""),
+        }
+
+    # ---------------------- METHODS ----------------------
+    async def get_me(self, params):
+        return BOT_USER
+
+    async def get_updates(self, params):
+        offset = int(params.get("offset") or 0)
+        limit = int(params.get("limit") or 100)
+        timeout = float(params.get("timeout") or 0)
+        while self._updates and self._updates[0]["update_id"] < offset:
+            self._updates.popleft()
+        if not self._updates and timeout:
+            self._new_updates.clear()
+            try:
+                await asyncio.wait_for(self._new_updates.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        return list(itertools.islice(self._updates, limit))
+
+    async def send_message(self, params):
+        return self._message(params)
+
+    async def edit_message_text(self, params):
+        if params.get("inline_message_id"):
+            return True
+        return self._message(params)
+
+    async def edit_message_reply_markup(self, params):
+        if params.get("inline_message_id"):
+            return True
+        return self._message(params)
+
+    async def answer_callback_query(self, params):
+        return True
+
+    async def answer_inline_query(self, params):
+        return True
+
+    async def set_webhook(self, params):
+        self.webhook_url = params.get("url", "")
+        return True
+
+    async def delete_webhook(self, params):
+        self.webhook_url = ""
+        return True
+
+
+async def serve_forever(api: FakeBotAPI, port: int):
+    server = HTTPServer("127.0.0.1", port)
+    api.mount(server)
+    await server.start()
+    print(f"🧪 Fake Bot API on http://127.0.0.1:{server.port}/bot (token {api.token})")
+    await asyncio.Event().wait()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Local fake Telegram Bot API server")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--token", default=DEFAULT_TOKEN)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every response")
+    parser.add_argument("--jitter", type=float, default=0.0, help="± uniform jitter on the latency")
+    parser.add_argument("--rate-limit-ratio", type=float, default=0.0, help="share of calls answered with 429")
+    parser.add_argument("--retry-after", type=int, default=1, help="retry_after sent with 429 responses")
+    args = parser.parse_args(argv)
+    api = FakeBotAPI(args.token, args.latency, args.jitter, args.rate_limit_ratio, args.retry_after)
+    try:
+        asyncio.run(serve_forever(api, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
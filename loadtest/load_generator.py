@@ -0,0 +1,329 @@
+"""
+End-to-end load generator for the bot.
+
+Starts the fake Bot API (loadtest/fake_bot_api.py), runs the real
+Application from bot_enhanced against it and injects synthetic or recorded
+update streams at a fixed rate. Latency is measured from the moment an
+update becomes available to getUpdates until the bot's first response to it:
+answerCallbackQuery for button presses (matched by callback id),
+answerInlineQuery for inline queries (matched by query id) and sendMessage
+for commands (matched per chat, first in first out).
+
+Examples:
+    # 30 s at 500 updates/s
+    python loadtest/load_generator.py --rate 500 --duration 30
+
+    # step 250, 500, ... up to 4000 updates/s to find the sustainable maximum
+    python loadtest/load_generator.py --ramp 250:250:4000 --duration 10 --slo-p99 0.5
+
+    # replay recorded updates (one Telegram Update JSON object per line)
+    python loadtest/load_generator.py --replay updates.jsonl --rate 1000
+
+By default the bot runs in a subprocess so it does not share a CPU with the
+generator; --in-process runs it on the generator's event loop instead.
+"""
+
+import argparse
+import asyncio
+import collections
+import itertools
+import json
+import logging
+import math
+import os
+import random
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fake_bot_api import DEFAULT_TOKEN, FakeBotAPI  # noqa: E402
+from httpd import HTTPServer  # noqa: E402
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+# ---------------------- UPDATE STREAMS ----------------------
+def menu_callback_data() -> list:
+    """Collect every callback_data the city menu can produce."""
+    os.environ.setdefault("LOG_FILE", "")
+    os.environ.setdefault("FAVORITES_DB", "")
+    os.environ.setdefault("OFFSET_FILE", "")
+    import bot_enhanced
+
+    return [
+        button.callback_data
+        for page in range(bot_enhanced.page_count())
+        for row in bot_enhanced.build_keyboard(page).inline_keyboard
+        for button in row
+    ]
+
+
+def synthetic_stream(chats: int, start_ratio: float, seed: int = 0):
+    """Yield an endless mix of /start commands and menu button presses."""
+    rng = random.Random(seed)
+    callbacks = menu_callback_data()
+    for sequence in itertools.count(1):
+        chat_id = rng.randrange(1, chats + 1)
+        user = {"id": chat_id, "is_bot": False, "first_name": "Load", "username": f"load{chat_id}"}
+        chat = {"id": chat_id, "type": "private"}
+        if rng.random() < start_ratio:
+            yield {
+                "message": {
+                    "message_id": sequence, "date": int(time.time()), "chat": chat, "from": user,
+                    "text": "/start", "entities": [{"type": "bot_command", "offset": 0, "length": 6}],
+                }
+            }
+        else:
+            yield {
+                "callback_query": {
+                    "id": f"cq{sequence}", "from": user, "chat_instance": str(chat_id),
+                    "data": rng.choice(callbacks),
+                    "message": {"message_id": 1, "date": int(time.time()), "chat": chat, "text": "menu"},
+                }
+            }
+
+
+def replay_stream(path: str):
+    """Yield recorded updates from a JSONL file forever, renumbering them."""
+    with open(path, encoding="utf-8") as fh:
+        recorded = [json.loads(line) for line in fh if line.strip()]
+    if not recorded:
+        raise SystemExit(f"❌ No updates in {path}")
+    for update in itertools.cycle(recorded):
+        update = dict(update)
+        update.pop("update_id", None)
+        yield update
+
+
+# ---------------------- MEASUREMENT ----------------------
+class LatencyRecorder:
+    """Correlates injected updates with the bot's first response to them."""
+
+    def __init__(self):
+        self.by_callback = {}
+        self.by_inline_query = {}
+        self.by_chat = collections.defaultdict(collections.deque)
+        self.latencies = []
+        self.injected = 0
+
+    def injected_update(self, update: dict, at: float):
+        self.injected += 1
+        if "callback_query" in update:
+            self.by_callback[update["callback_query"]["id"]] = at
+        elif "inline_query" in update:
+            self.by_inline_query[update["inline_query"]["id"]] = at
+        elif "message" in update:
+            self.by_chat[update["message"]["chat"]["id"]].append(at)
+
+    def on_response(self, method: str, params: dict, at: float):
+        if method == "answerCallbackQuery":
+            sent = self.by_callback.pop(str(params.get("callback_query_id")), None)
+        elif method == "answerInlineQuery":
+            sent = self.by_inline_query.pop(str(params.get("inline_query_id")), None)
+        elif method == "sendMessage":
+            pending = self.by_chat.get(params.get("chat_id"))
+            sent = pending.popleft() if pending else None
+        else:
+            return
+        if sent is not None:
+            self.latencies.append(at - sent)
+
+    @property
+    def outstanding(self) -> int:
+        return len(self.by_callback) + len(self.by_inline_query) + sum(len(q) for q in self.by_chat.values())
+
+    def reset(self):
+        self.__init__()
+
+
+def percentile(values: list, pct: float) -> float:
+    """Nearest-rank percentile."""
+    if not values:
+        return float("nan")
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, math.ceil(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+# ---------------------- DRIVER ----------------------
+async def inject(api: FakeBotAPI, recorder: LatencyRecorder, stream, rate: float, duration: float):
+    """Inject updates open-loop at `rate` per second for `duration` seconds."""
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    sent = 0
+    while True:
+        elapsed = loop.time() - started
+        if elapsed >= duration:
+            break
+        due = int(elapsed * rate) + 1
+        now = time.perf_counter()
+        while sent < due:
+            update = next(stream)
+            update["update_id"] = api.next_update_id()
+            api.enqueue_update(update)
+            recorder.injected_update(update, now)
+            sent += 1
+        await asyncio.sleep(min(0.005, 1 / rate))
+    return sent
+
+
+async def run_step(api, recorder, stream, rate, duration, grace) -> dict:
+    recorder.reset()
+    started = time.perf_counter()
+    sent = await inject(api, recorder, stream, rate, duration)
+    deadline = time.perf_counter() + grace
+    while recorder.outstanding and time.perf_counter() < deadline:
+        await asyncio.sleep(0.05)
+    elapsed = time.perf_counter() - started
+    done = len(recorder.latencies)
+    return {
+        "target_rate": rate,
+        "injected": sent,
+        "completed": done,
+        "throughput": round(done / elapsed, 1),
+        "p50_ms": round(percentile(recorder.latencies, 50) * 1000, 2),
+        "p99_ms": round(percentile(recorder.latencies, 99) * 1000, 2),
+        "max_ms": round(max(recorder.latencies, default=float("nan")) * 1000, 2),
+        "backlog": api.pending_updates,
+        "rate_limited": sum(api.rate_limited.values()),
+    }
+
+
+# Lift the bot's outbound flood control so the harness measures the bot
+# itself; pass --telegram-limits to keep Telegram's real rates.
+UNLIMITED_OUTBOUND = {
+    "OUTBOUND_GLOBAL_RATE": "1000000",
+    "OUTBOUND_CHAT_RATE": "1000000",
+    "OUTBOUND_GROUP_RATE": "1000000",
+}
+
+
+def start_bot_subprocess(base_url: str, telegram_limits: bool):
+    env = dict(
+        os.environ,
+        BOT_TOKEN=DEFAULT_TOKEN,
+        BOT_API_BASE_URL=base_url,
+        LOG_LEVEL="WARNING",
+        LOG_FILE="",
+        FAVORITES_DB="",
+        OFFSET_FILE="",
+    )
+    env.pop("WEBHOOK_URL", None)
+    if not telegram_limits:
+        env.update(UNLIMITED_OUTBOUND)
+    return subprocess.Popen([sys.executable, os.path.join(ROOT, "bot_enhanced.py")], env=env)
+
+
+async def start_bot_in_process(base_url: str, telegram_limits: bool):
+    os.environ.setdefault("LOG_FILE", "")
+    os.environ.setdefault("FAVORITES_DB", "")
+    os.environ.setdefault("OFFSET_FILE", "")
+    import bot_enhanced
+
+    logging.getLogger().setLevel(logging.WARNING)
+    if not telegram_limits:
+        outbound = bot_enhanced.OUTBOUND
+        outbound.global_rate = outbound.chat_rate = outbound.group_rate = float(
+            UNLIMITED_OUTBOUND["OUTBOUND_GLOBAL_RATE"]
+        )
+    stop = asyncio.Event()
+    application = bot_enhanced.build_application(DEFAULT_TOKEN, base_url=base_url)
+    task = asyncio.create_task(bot_enhanced.serve(application, webhook_url=None, stop_event=stop))
+    return stop, task
+
+
+async def run(args) -> list:
+    api = FakeBotAPI(
+        latency=args.api_latency, jitter=args.api_jitter,
+        rate_limit_ratio=args.rate_limit_ratio, retry_after=args.retry_after,
+    )
+    recorder = LatencyRecorder()
+    api.listeners.append(recorder.on_response)
+    server = HTTPServer("127.0.0.1", args.port)
+    api.mount(server)
+    await server.start()
+    base_url = f"http://127.0.0.1:{server.port}/bot"
+
+    if args.in_process:
+        stop, bot_task = await start_bot_in_process(base_url, args.telegram_limits)
+        process = None
+    else:
+        process = start_bot_subprocess(base_url, args.telegram_limits)
+
+    stream = replay_stream(args.replay) if args.replay else synthetic_stream(args.chats, args.start_ratio)
+    try:
+        while api.calls["getUpdates"] == 0:  # wait for the bot to start polling
+            await asyncio.sleep(0.05)
+        if args.ramp:
+            first, step, last = (float(x) for x in args.ramp.split(":"))
+            rates = [first + step * i for i in range(int((last - first) // step) + 1)]
+        else:
+            rates = [args.rate]
+
+        results = []
+        for rate in rates:
+            result = await run_step(api, recorder, stream, rate, args.duration, args.grace)
+            result["sustained"] = (
+                result["completed"] >= 0.99 * result["injected"]
+                and result["p99_ms"] <= args.slo_p99 * 1000
+            )
+            results.append(result)
+            print_row(result)
+            if args.ramp and not result["sustained"]:
+                break
+        return results
+    finally:
+        if process is not None:
+            process.terminate()
+            # Keep serving the fake API while the bot flushes its last calls.
+            await asyncio.get_running_loop().run_in_executor(None, process.wait, 10)
+        else:
+            stop.set()
+            await bot_task
+        await server.stop()
+
+
+def print_row(result: dict):
+    mark = "✅" if result["sustained"] else "❌"
+    print(
+        f"{mark} {result['target_rate']:>8.0f}/s  sent {result['injected']:>7}  done {result['completed']:>7}"
+        f"  thr {result['throughput']:>8.1f}/s  p50 {result['p50_ms']:>8.2f} ms"
+        f"  p99 {result['p99_ms']:>8.2f} ms  max {result['max_ms']:>8.2f} ms  429s {result['rate_limited']}"
+    )
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rate", type=float, default=200, help="updates per second")
+    parser.add_argument("--ramp", metavar="START:STEP:MAX", help="step through rates to find the maximum")
+    parser.add_argument("--duration", type=float, default=10, help="seconds per rate step")
+    parser.add_argument("--grace", type=float, default=5, help="seconds to wait for stragglers")
+    parser.add_argument("--slo-p99", type=float, default=1.0, help="p99 latency bound in seconds")
+    parser.add_argument("--chats", type=int, default=1000, help="distinct synthetic chats")
+    parser.add_argument("--start-ratio", type=float, default=0.1, help="share of /start commands")
+    parser.add_argument("--replay", metavar="JSONL", help="replay recorded updates instead")
+    parser.add_argument("--api-latency", type=float, default=0.0, help="fake API latency in seconds")
+    parser.add_argument("--api-jitter", type=float, default=0.0, help="fake API latency jitter")
+    parser.add_argument("--rate-limit-ratio", type=float, default=0.0, help="share of calls answered 429")
+    parser.add_argument("--retry-after", type=int, default=1)
+    parser.add_argument("--port", type=int, default=0, help="fake API port (0 = any free port)")
+    parser.add_argument("--in-process", action="store_true", help="run the bot on this event loop")
+    parser.add_argument("--telegram-limits", action="store_true",
+                        help="keep the bot's outbound flood control at Telegram's real rates")
+    parser.add_argument("--json", metavar="PATH", help="write step results as JSON")
+    args = parser.parse_args(argv)
+
+    results = asyncio.run(run(args))
+    sustained = [r["target_rate"] for r in results if r["sustained"]]
+    print(f"\n📈 Max sustainable throughput: {max(sustained):.0f} updates/s" if sustained
+          else "\n📉 No rate was sustained")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as fh:
+            json.dump(results, fh, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
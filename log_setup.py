@@ -0,0 +1,150 @@
+"""
+Non-blocking logging for the bot.
+
+Handlers on the event loop only enqueue records; a QueueListener thread
+formats them and does the disk and console I/O. Records can be sampled per
+event (``logger.info(..., extra={"event": "button_press"})``) so very chatty
+INFO lines cost almost nothing, and the log file rotates by size.
+"""
+
+import atexit
+import copy
+import json
+import logging
+import logging.handlers
+import queue
+import threading
+from datetime import datetime, timezone
+
+TEXT_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+
+# Attributes every LogRecord has; anything else was passed through ``extra``.
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+_listener = None
+_queue_handler = None
+
+
+class JsonFormatter(logging.Formatter):
+    """Format records as one JSON object per line."""
+
+    def format(self, record):
+        payload = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS:
+                payload[key] = value
+        if record.exc_info:
+            payload["exc"] = self.formatException(record.exc_info)
+        return json.dumps(payload, ensure_ascii=False, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """Keep one in N records per ``event`` tag at INFO level and below.
+
+    ``rates`` maps event names to N. Warnings and errors always pass, as do
+    records without an event tag or with an event that has no rate.
+    """
+
+    def __init__(self, rates: dict = None):
+        super().__init__()
+        self.rates = dict(rates or {})
+        self._counts = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        if record.levelno > logging.INFO:
+            return True
+        rate = self.rates.get(getattr(record, "event", None))
+        if not rate or rate <= 1:
+            return True
+        with self._lock:
+            count = self._counts.get(record.event, 0)
+            self._counts[record.event] = count + 1
+        return count % rate == 0
+
+
+class _DeferredQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that leaves formatting to the listener thread.
+
+    The stock handler runs the full formatter on the caller's thread; here
+    only the ``%`` message interpolation happens before enqueueing.
+    """
+
+    def prepare(self, record):
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
+def parse_sample_rates(spec: str) -> dict:
+    """Parse ``"button_press=10,inline_query=5"`` into ``{"button_press": 10, ...}``."""
+    rates = {}
+    for item in filter(None, (part.strip() for part in (spec or "").split(","))):
+        event, _, rate = item.partition("=")
+        try:
+            rates[event.strip()] = int(rate)
+        except ValueError:
+            continue
+    return rates
+
+
+def setup_logging(
+    level: str = "INFO",
+    log_file: str = "bot.log",
+    json_format: bool = False,
+    max_bytes: int = 10 * 1024 * 1024,
+    backup_count: int = 5,
+    sample_rates: dict = None,
+):
+    """Route the root logger through a queue to a background listener thread.
+
+    Calling it again replaces the previous configuration. Returns the
+    SamplingFilter so callers can adjust rates at runtime.
+    """
+    global _listener, _queue_handler
+    shutdown_logging()
+
+    formatter = JsonFormatter() if json_format else logging.Formatter(TEXT_FORMAT)
+    handlers = [logging.StreamHandler()]
+    if log_file:
+        handlers.append(
+            logging.handlers.RotatingFileHandler(
+                log_file, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8"
+            )
+        )
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    sampler = SamplingFilter(sample_rates)
+    _queue_handler = _DeferredQueueHandler(queue.SimpleQueue())
+    _queue_handler.addFilter(sampler)
+
+    root = logging.getLogger()
+    root.setLevel(getattr(logging, str(level).upper(), logging.INFO))
+    root.addHandler(_queue_handler)
+
+    _listener = logging.handlers.QueueListener(_queue_handler.queue, *handlers)
+    _listener.start()
+    return sampler
+
+
+def shutdown_logging():
+    """Flush queued records and stop the listener thread."""
+    global _listener, _queue_handler
+    if _queue_handler is not None:
+        logging.getLogger().removeHandler(_queue_handler)
+        _queue_handler = None
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+
+
+atexit.register(shutdown_logging)
@@ -0,0 +1,212 @@
+"""
+Prometheus text-format metrics without external dependencies.
+
+Recording is a dict lookup plus a bisect and a few additions; everything
+else (cumulative buckets, callback gauges, text rendering) happens only
+when /metrics is scraped.
+"""
+
+import bisect
+import functools
+import time
+from http import HTTPStatus
+
+from telegram.request import HTTPXRequest
+
+from httpd import Response
+from profiling import TRACER
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _format_labels(names: tuple, values: tuple, extra: str = "") -> str:
+    pairs = [
+        '%s="%s"' % (name, str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for name, value in zip(names, values)
+    ]
+    if extra:
+        pairs.append(extra)
+    return "{%s}" % ",".join(pairs) if pairs else ""
+
+
+def _format_value(value) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Monotonic counter with optional labels."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+
+    def inc(self, *labelvalues, amount=1):
+        self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+
+    def value(self, *labelvalues):
+        return self._values.get(labelvalues, 0)
+
+    def samples(self):
+        for labelvalues, value in sorted(self._values.items()):
+            yield self.name, _format_labels(self.labelnames, labelvalues), value
+
+
+class Histogram:
+    """Fixed-bucket histogram with optional labels."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = (), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}  # labelvalues -> [per-bucket counts..., +Inf count, sum]
+
+    def observe(self, value: float, *labelvalues):
+        series = self._series.get(labelvalues)
+        if series is None:
+            series = self._series[labelvalues] = [0] * (len(self.buckets) + 1) + [0.0]
+        series[bisect.bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def count(self, *labelvalues) -> int:
+        series = self._series.get(labelvalues)
+        return sum(series[:-1]) if series else 0
+
+    def samples(self):
+        for labelvalues, series in sorted(self._series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                labels = _format_labels(self.labelnames, labelvalues, 'le="%s"' % bound)
+                yield self.name + "_bucket", labels, cumulative
+            cumulative += series[len(self.buckets)]
+            yield self.name + "_bucket", _format_labels(self.labelnames, labelvalues, 'le="+Inf"'), cumulative
+            yield self.name + "_sum", _format_labels(self.labelnames, labelvalues), series[-1]
+            yield self.name + "_count", _format_labels(self.labelnames, labelvalues), cumulative
+
+
+class CallbackMetric:
+    """Gauge or counter whose value is read from a callable at scrape time.
+
+    The callable returns a number, or a dict mapping label-value tuples to
+    numbers when labelnames are given.
+    """
+
+    def __init__(self, name: str, documentation: str, callback, labelnames: tuple = (), kind="gauge"):
+        self.name = name
+        self.documentation = documentation
+        self.callback = callback
+        self.labelnames = tuple(labelnames)
+        self.kind = kind
+
+    def samples(self):
+        value = self.callback()
+        if value is None:
+            return
+        if not self.labelnames:
+            yield self.name, "", value
+            return
+        for labelvalues, item in sorted(value.items()):
+            yield self.name, _format_labels(self.labelnames, labelvalues), item
+
+
+class Registry:
+    """Ordered collection of metrics rendered together."""
+
+    def __init__(self):
+        self._metrics = {}
+
+    def register(self, metric):
+        """Add a metric, replacing any earlier one with the same name."""
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self.register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def gauge_callback(self, name, documentation, callback, labelnames=()):
+        return self.register(CallbackMetric(name, documentation, callback, labelnames, "gauge"))
+
+    def counter_callback(self, name, documentation, callback, labelnames=()):
+        return self.register(CallbackMetric(name, documentation, callback, labelnames, "counter"))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines.append("# HELP %s %s" % (metric.name, metric.documentation))
+            lines.append("# TYPE %s %s" % (metric.name, metric.kind))
+            for name, labels, value in metric.samples():
+                lines.append("%s%s %s" % (name, labels, _format_value(value)))
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+HANDLER_LATENCY = REGISTRY.histogram(
+    "bot_handler_duration_seconds", "Time spent in each update handler.", ("handler",)
+)
+API_LATENCY = REGISTRY.histogram(
+    "bot_telegram_api_duration_seconds", "Round-trip time of outbound Bot API calls.", ("method",)
+)
+API_REQUESTS = REGISTRY.counter(
+    "bot_telegram_api_requests_total", "Outbound Bot API calls by HTTP status.", ("method", "status")
+)
+UPDATES = REGISTRY.counter("bot_updates_total", "Updates received by type.", ("type",))
+ERRORS = REGISTRY.counter("bot_errors_total", "Errors reported to the error handler.", ("error",))
+
+
+def timed(handler, name: str = None):
+    """Wrap an async handler so its duration lands in HANDLER_LATENCY.
+
+    While tracing is on (profiling.TRACER), sampled calls are traced too.
+    """
+    label = name or handler.__name__
+
+    @functools.wraps(handler)
+    async def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            if TRACER.rate:
+                return await TRACER.run(label, handler, *args, **kwargs)
+            return await handler(*args, **kwargs)
+        finally:
+            HANDLER_LATENCY.observe(time.perf_counter() - started, label)
+
+    return wrapper
+
+
+class InstrumentedRequest(HTTPXRequest):
+    """HTTPXRequest that records latency and status per Bot API method."""
+
+    async def do_request(self, url, method, request_data=None, **kwargs):
+        api_method = url.rsplit("/", 1)[-1]
+        started = time.perf_counter()
+        status = "error"
+        try:
+            status, payload = await super().do_request(url, method, request_data, **kwargs)
+            return status, payload
+        finally:
+            finished = time.perf_counter()
+            API_LATENCY.observe(finished - started, api_method)
+            API_REQUESTS.inc(api_method, str(status))
+            if TRACER.rate:
+                TRACER.record(api_method, started, finished)
+
+
+def add_metrics_route(server, registry: Registry = REGISTRY):
+    """Register GET /metrics on an httpd.HTTPServer."""
+
+    async def metrics_endpoint(request):
+        return Response(HTTPStatus.OK, registry.render().encode("utf-8"), CONTENT_TYPE)
+
+    server.route("GET", "/metrics", metrics_endpoint)
@@ -0,0 +1,196 @@
+"""
+Update offsets that survive restarts.
+
+UpdateTracker follows every update from the moment the Application accepts
+it until its handlers finish, and derives the resume offset: the lowest
+update id still being processed, or one past the highest finished id. On
+shutdown the bot drains what it can within a deadline, saves that offset
+with OffsetStore and confirms it to Telegram, so the next instance starts
+after the last processed update and nothing finished is handled twice. An
+update older than the previous instance's offset is dropped as a
+duplicate, and with max_age set, message updates older than max_age
+seconds are dropped as stale instead of being replayed in a burst after
+downtime.
+
+Telegram considers an update delivered once it has been handed over: a
+webhook update when the request is answered, a polled one when the poller
+fetches the batch after it. Updates the deadline cuts off are therefore
+redelivered only if nothing acknowledged them yet (in practice, the last
+polled batch); the rest are lost, at most UPDATE_QUEUE_SIZE of them.
+
+Telegram numbers updates sequentially, but after a week without updates
+the next id is chosen at random, so saved offsets expire before that.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import time
+
+from telegram.ext import Application
+
+logger = logging.getLogger(__name__)
+
+OFFSET_LIFETIME = 6 * 24 * 3600  # seconds; update ids restart at random after a quiet week
+
+
+def update_time(update):
+    """When the update's message was sent or edited, or None for updates without a timestamp."""
+    for field in ("message", "channel_post"):
+        message = getattr(update, field, None)
+        if message is not None:
+            return message.date
+    for field in ("edited_message", "edited_channel_post"):
+        message = getattr(update, field, None)
+        if message is not None:
+            return message.edit_date or message.date
+    return None
+
+
+class UpdateTracker:
+    """Tracks accepted and finished updates to compute a safe resume offset."""
+
+    def __init__(self, max_age: float = 0, clock=time.time):
+        self.max_age = max_age
+        self.clock = clock
+        self.floor = None  # updates below this were handled by a previous instance
+        self.duplicates = 0
+        self.stale = 0
+        self._pending = set()
+        self._highest = None
+
+    @property
+    def pending(self) -> int:
+        """Updates accepted but not finished."""
+        return len(self._pending)
+
+    @property
+    def offset(self):
+        """The first update id not yet fully processed, or None before any update."""
+        if self._pending:
+            return min(self._pending)
+        if self._highest is not None:
+            return self._highest + 1
+        return self.floor
+
+    def accept(self, update) -> bool:
+        """Start tracking update; False when it should be skipped as a duplicate or stale."""
+        update_id = getattr(update, "update_id", None)
+        if update_id is None:
+            return True
+        if self.floor is not None and update_id < self.floor:
+            self.duplicates += 1
+            return False
+        if self.max_age:
+            sent = update_time(update)
+            if sent is not None and self.clock() - sent.timestamp() > self.max_age:
+                self.stale += 1
+                self._finish(update_id)
+                return False
+        self._pending.add(update_id)
+        return True
+
+    def done(self, update):
+        """Mark update as fully processed."""
+        update_id = getattr(update, "update_id", None)
+        if update_id is not None:
+            self._pending.discard(update_id)
+            self._finish(update_id)
+
+    def _finish(self, update_id: int):
+        if self._highest is None or update_id > self._highest:
+            self._highest = update_id
+
+
+class OffsetStore:
+    """The resume offset in a small JSON file, replaced atomically."""
+
+    def __init__(self, path: str, lifetime: float = OFFSET_LIFETIME):
+        self.path = path
+        self.lifetime = lifetime
+
+    def load(self, now: float = None):
+        """Return the saved offset, or None when there is none, no path or it has expired."""
+        if not self.path:
+            return None
+        try:
+            with open(self.path, encoding="utf-8") as fh:
+                saved = json.load(fh)
+            offset, saved_at = int(saved["offset"]), float(saved["saved_at"])
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            logger.warning("Ignoring unreadable offset file %s: %s", self.path, e)
+            return None
+        if (time.time() if now is None else now) - saved_at > self.lifetime:
+            logger.info("Ignoring offset %s saved more than %s s ago", offset, self.lifetime)
+            return None
+        return offset
+
+    def writable(self) -> bool:
+        """Whether save() can create the file, i.e. its directory exists and is writable."""
+        if not self.path:
+            return True
+        return os.access(os.path.dirname(os.path.abspath(self.path)), os.W_OK | os.X_OK)
+
+    def save(self, offset: int):
+        if not self.path or offset is None:
+            return
+        temporary = f"{self.path}.tmp"
+        with open(temporary, "w", encoding="utf-8") as fh:
+            json.dump({"offset": offset, "saved_at": time.time()}, fh)
+            fh.flush()
+            os.fsync(fh.fileno())
+        os.replace(temporary, self.path)
+
+
+class TrackedApplication(Application):
+    """Sequential Application that reports each update to an UpdateTracker."""
+
+    def __init__(self, *, tracker: UpdateTracker, **kwargs):
+        super().__init__(**kwargs)
+        self.tracker = tracker
+        self._handling = None  # the task handling the current update
+        self._abandoned = False  # set when a stop is cut off; later updates are left unhandled
+
+    async def process_update(self, update: object) -> None:
+        if self._abandoned or not self.tracker.accept(update):
+            return
+        # A task of its own, so a cut-off stop can cancel the handler without
+        # cancelling PTB's update fetcher (which ignores cancellation).
+        self._handling = asyncio.ensure_future(super().process_update(update))
+        try:
+            await self._handling
+        except asyncio.CancelledError:
+            if self._abandoned:
+                return
+            raise
+        finally:
+            self._handling = None
+        self.tracker.done(update)
+
+    async def stop(self) -> None:
+        """Stop like Application.stop; if the stop is cancelled, stop handling updates at once."""
+        try:
+            await super().stop()
+        except asyncio.CancelledError:
+            self._abandoned = True
+            if self._handling is not None:
+                self._handling.cancel()
+            raise
+
+
+async def stop_within(application: Application, timeout: float) -> bool:
+    """Stop application, letting queued and running updates finish for up to timeout seconds.
+
+    Past the deadline the running handlers are cancelled and updates still
+    queued are passed over unhandled, so nothing reaches the Bot API after
+    the deadline. Those updates stay unfinished in the tracker and the saved
+    offset points at the first of them. Returns whether everything finished.
+    """
+    try:
+        await asyncio.wait_for(application.stop(), timeout)
+        return True
+    except asyncio.TimeoutError:
+        return False
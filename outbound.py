@@ -0,0 +1,279 @@
+"""
+Flood-control-aware outbound scheduler for Bot API calls.
+
+Telegram limits bots to roughly 30 messages per second overall, about one
+per second per private chat and 20 per minute per group. Calls routed
+through the scheduler wait for a token from a global bucket and from their
+chat's bucket, run in priority order (callback answers, then replies, then
+menu edits), and are retried after the server-provided ``retry_after`` when
+Telegram answers 429. Under a spike, callers wait in the queue instead of
+failing.
+"""
+
+import asyncio
+import contextvars
+import datetime
+import enum
+import heapq
+import itertools
+import logging
+from dataclasses import dataclass, field
+
+from telegram.error import RetryAfter
+
+logger = logging.getLogger(__name__)
+
+
+class Priority(enum.IntEnum):
+    ANSWER = 0  # answerCallbackQuery: cheap, and the user is staring at a spinner
+    REPLY = 1  # new messages
+    EDIT = 2  # menu edits; the newest state is all that matters
+    BACKGROUND = 3  # periodic updates nobody is waiting on
+
+
+class TokenBucket:
+    """Classic token bucket refilled continuously at `rate` tokens per second."""
+
+    __slots__ = ("rate", "burst", "tokens", "updated")
+
+    def __init__(self, rate: float, burst: float, now: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = now
+
+    def _refill(self, now: float):
+        if now > self.updated:
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+
+    def delay(self, now: float) -> float:
+        """Seconds until a token is available (0 if one is available now)."""
+        if now < self.updated:  # paused
+            return self.updated - now
+        self._refill(now)
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def take(self, now: float):
+        self._refill(now)
+        self.tokens -= 1
+
+    def pause(self, until: float):
+        """Hand out nothing before `until`, then a single token."""
+        self.tokens = 1
+        self.updated = max(self.updated, until)
+
+    def idle(self, now: float) -> bool:
+        """True when the bucket is full again and can be forgotten."""
+        self._refill(now)
+        return self.tokens >= self.burst
+
+
+@dataclass(order=True)
+class _Job:
+    priority: int
+    seq: int
+    chat_id: object = field(compare=False)
+    func: object = field(compare=False)
+    args: tuple = field(compare=False)
+    kwargs: dict = field(compare=False)
+    future: asyncio.Future = field(compare=False)
+    context: contextvars.Context = field(compare=False)  # the caller's, so traces follow the call
+    attempts: int = field(default=0, compare=False)
+
+
+def _retry_seconds(error: RetryAfter) -> float:
+    retry_after = error.retry_after
+    if isinstance(retry_after, datetime.timedelta):
+        return retry_after.total_seconds()
+    return float(retry_after)
+
+
+class OutboundScheduler:
+    """Priority queue of Bot API calls paced by global and per-chat token buckets."""
+
+    def __init__(
+        self,
+        global_rate: float = 30,
+        chat_rate: float = 1,
+        group_rate: float = 20 / 60,
+        chat_burst: float = 3,
+        max_concurrency: int = 32,
+        max_retries: int = 3,
+    ):
+        self.global_rate = global_rate
+        self.chat_rate = chat_rate
+        self.group_rate = group_rate
+        self.chat_burst = chat_burst
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.retries = 0
+        self.sent = 0
+        self._ready = []  # heap of _Job
+        self._delayed = []  # heap of (ready_at, seq, _Job) waiting on their chat bucket
+        self._chat_buckets = {}
+        self._global_bucket = None
+        self._paused_until = 0.0
+        self._seq = itertools.count()
+        self._wakeup = asyncio.Event()
+        self._slots = None
+        self._task = None
+        self._stopped = False
+        self._sending = set()
+
+    # ---------------------- PUBLIC API ----------------------
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    @property
+    def depth(self) -> int:
+        """Calls waiting to be sent."""
+        return len(self._ready) + len(self._delayed)
+
+    def depth_by_priority(self) -> dict:
+        counts = {(priority.name.lower(),): 0 for priority in Priority}
+        for job in itertools.chain(self._ready, (item[2] for item in self._delayed)):
+            counts[(Priority(job.priority).name.lower(),)] += 1
+        return counts
+
+    def submit(self, priority: Priority, chat_id, func, *args, **kwargs) -> asyncio.Future:
+        """Queue func(*args, **kwargs) and return a future for its result."""
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._ready, _Job(
+            int(priority), next(self._seq), chat_id, func, args, kwargs, future, contextvars.copy_context()
+        ))
+        self._wakeup.set()
+        return future
+
+    async def send(self, priority: Priority, chat_id, func, *args, **kwargs):
+        """Run a Bot API call through the queue; calls it directly when never started.
+
+        Once stopped, calls fail with RuntimeError rather than bypassing flood control.
+        """
+        if self._stopped:
+            raise RuntimeError("Outbound scheduler stopped")
+        if self._task is None:
+            return await func(*args, **kwargs)
+        return await self.submit(priority, chat_id, func, *args, **kwargs)
+
+    def start(self):
+        """Start dispatching on the running loop."""
+        if self._task is None:
+            loop = asyncio.get_running_loop()
+            self._global_bucket = TokenBucket(self.global_rate, max(1.0, self.global_rate), loop.time())
+            self._slots = asyncio.Semaphore(self.max_concurrency)
+            self._wakeup = asyncio.Event()
+            self._stopped = False
+            self._task = loop.create_task(self._run())
+
+    async def stop(self, timeout: float = 10.0):
+        """Send what is queued within timeout, then stop; leftovers fail with RuntimeError."""
+        if self._task is None:
+            return
+        self._stopped = True
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while (self.depth or self._sending) and loop.time() < deadline:
+            await asyncio.sleep(0.01)
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        for job in itertools.chain(self._ready, (item[2] for item in self._delayed)):
+            if not job.future.done():
+                job.future.set_exception(RuntimeError("Outbound scheduler stopped"))
+        self._ready.clear()
+        self._delayed.clear()
+        if self._sending:
+            await asyncio.gather(*self._sending, return_exceptions=True)
+
+    # ---------------------- DISPATCH ----------------------
+    def _chat_bucket(self, chat_id, now: float) -> TokenBucket:
+        bucket = self._chat_buckets.get(chat_id)
+        if bucket is None:
+            if len(self._chat_buckets) > 10_000:
+                self._chat_buckets = {
+                    key: value for key, value in self._chat_buckets.items() if not value.idle(now)
+                }
+            rate = self.group_rate if isinstance(chat_id, int) and chat_id < 0 else self.chat_rate
+            bucket = self._chat_buckets[chat_id] = TokenBucket(rate, self.chat_burst, now)
+        return bucket
+
+    def _promote_delayed(self, now: float):
+        while self._delayed and self._delayed[0][0] <= now:
+            heapq.heappush(self._ready, heapq.heappop(self._delayed)[2])
+
+    async def _sleep_until(self, when: float):
+        """Sleep until `when` (loop time) or until new work arrives."""
+        self._wakeup.clear()
+        timeout = None if when is None else max(0.0, when - asyncio.get_running_loop().time())
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            now = loop.time()
+            self._promote_delayed(now)
+            if not self._ready:
+                await self._sleep_until(self._delayed[0][0] if self._delayed else None)
+                continue
+            if now < self._paused_until:
+                await asyncio.sleep(self._paused_until - now)
+                continue
+            wait = self._global_bucket.delay(now)
+            if wait > 0:
+                await asyncio.sleep(wait)
+                continue
+
+            job = heapq.heappop(self._ready)
+            if job.future.done():  # caller gave up
+                continue
+            if job.chat_id is not None and job.priority != Priority.ANSWER:
+                bucket = self._chat_bucket(job.chat_id, now)
+                wait = bucket.delay(now)
+                if wait > 0:
+                    heapq.heappush(self._delayed, (now + wait, job.seq, job))
+                    continue
+                bucket.take(now)
+            self._global_bucket.take(now)
+
+            await self._slots.acquire()
+            task = loop.create_task(self._send(job), context=job.context)
+            self._sending.add(task)
+            task.add_done_callback(self._sending.discard)
+
+    async def _send(self, job: _Job):
+        try:
+            result = await job.func(*job.args, **job.kwargs)
+        except RetryAfter as error:
+            self.retries += 1
+            delay = _retry_seconds(error)
+            now = asyncio.get_running_loop().time()
+            # Flood limits are per chat, so a chat's 429 holds back only that
+            # chat; calls without a chat pause everything.
+            if job.chat_id is None:
+                self._paused_until = max(self._paused_until, now + delay)
+            elif job.priority != Priority.ANSWER:
+                self._chat_bucket(job.chat_id, now).pause(now + delay)
+            if job.attempts < self.max_retries and not job.future.done():
+                logger.warning("Flood control hit, retrying in %.1fs", delay)
+                job.attempts += 1
+                heapq.heappush(self._delayed, (now + delay, job.seq, job))
+                self._wakeup.set()
+            elif not job.future.done():
+                job.future.set_exception(error)
+        except Exception as error:
+            if not job.future.done():
+                job.future.set_exception(error)
+        else:
+            self.sent += 1
+            if not job.future.done():
+                job.future.set_result(result)
+        finally:
+            self._slots.release()
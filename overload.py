@@ -0,0 +1,125 @@
+"""
+Load shedding.
+
+OverloadGuard checks event-loop lag and outstanding work (updates queued
+or being handled) every interval. When either stays above its threshold
+for trip_after consecutive checks, the bot switches to degraded mode. It
+switches back on its own once both have stayed below half their threshold
+for recover_after seconds, so a load hovering around a threshold does not
+flap. While degraded, bot_enhanced serves button presses only from what is
+already cached, answers expensive commands with a short "busy" reply and
+drops per-update INFO logging.
+"""
+
+import asyncio
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+RECOVER_RATIO = 0.5  # both signals must fall below this share of their threshold
+
+
+class OverloadGuard:
+    """Switches between normal and degraded mode from lag and work thresholds.
+
+    lag() and work() return the current event-loop lag in seconds and the
+    number of outstanding updates; a threshold of 0 ignores that signal.
+    on_change(degraded, reason) is called on every transition.
+    """
+
+    def __init__(
+        self,
+        lag,
+        work=lambda: 0,
+        lag_threshold: float = 0.5,
+        work_threshold: int = 500,
+        trip_after: int = 2,
+        recover_after: float = 10.0,
+        interval: float = 0.5,
+        on_change=None,
+        clock=time.monotonic,
+    ):
+        self.lag = lag
+        self.work = work
+        self.lag_threshold = lag_threshold
+        self.work_threshold = work_threshold
+        self.trip_after = trip_after
+        self.recover_after = recover_after
+        self.interval = interval
+        self.on_change = on_change
+        self.clock = clock
+        self.degraded = False
+        self.reason = ""
+        self.transitions = {"degraded": 0, "normal": 0}
+        self._over = 0  # consecutive checks over a threshold
+        self._calm_since = None  # when both signals last fell below the recovery level
+        self._changed_at = None
+        self._task = None
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.lag_threshold or self.work_threshold)
+
+    def _overloaded(self, lag: float, work: int, ratio: float = 1.0) -> str:
+        """Why lag or work is over ratio x its threshold, or "" if neither is."""
+        if self.lag_threshold and lag > self.lag_threshold * ratio:
+            return f"event-loop lag {lag * 1000:.0f} ms"
+        if self.work_threshold and work > self.work_threshold * ratio:
+            return f"{work} updates outstanding"
+        return ""
+
+    def check(self, now: float = None) -> bool:
+        """Sample both signals, switching mode if warranted; returns whether degraded."""
+        if not self.enabled:
+            return False
+        now = self.clock() if now is None else now
+        lag, work = self.lag(), self.work()
+        if not self.degraded:
+            reason = self._overloaded(lag, work)
+            self._over = self._over + 1 if reason else 0
+            if self._over >= self.trip_after:
+                self._switch(True, reason, now)
+        elif self._overloaded(lag, work, RECOVER_RATIO):
+            self._calm_since = None
+        elif self._calm_since is None:
+            self._calm_since = now
+        elif now - self._calm_since >= self.recover_after:
+            self._switch(False, f"back to normal after {now - self._changed_at:.0f} s", now)
+        return self.degraded
+
+    def _switch(self, degraded: bool, reason: str, now: float):
+        self.degraded = degraded
+        self.reason = reason
+        self.transitions["degraded" if degraded else "normal"] += 1
+        self._over = 0
+        self._calm_since = None
+        self._changed_at = now
+        if degraded:
+            logger.warning("🚦 Overloaded (%s): shedding load", reason)
+        else:
+            logger.warning("🟢 Load %s", reason)
+        if self.on_change is not None:
+            self.on_change(degraded, reason)
+
+    def start(self):
+        """Start checking on the running loop."""
+        if self._task is None and self.enabled:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        """Stop checking and leave degraded mode."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self.degraded:
+            self._switch(False, "checks stopped", self.clock())
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            self.check()
@@ -0,0 +1,282 @@
+"""
+On-demand tracing and profiling.
+
+Tracing: with a sample rate of N, one update in N is traced. The handler
+run by metrics.timed opens the trace, and every Bot API round trip and
+instrumented function called while it runs (including calls the outbound
+scheduler makes on the handler's behalf) is recorded as a span with its
+start offset and duration. A finished trace is logged as one line (event
+"trace") and the most recent ones are kept for /profile. Functions are
+instrumented by swapping wrappers into their module only while tracing is
+on; with a rate of 0 nothing is wrapped and the hooks in metrics.py cost a
+single attribute check.
+
+Captures: Profiler runs one time-boxed capture at a time and writes it to
+a file, either a cProfile of the event-loop thread (open with pstats or
+snakeviz) or a stack sample of it taken every few milliseconds, saved as
+folded stacks for flamegraph.pl or speedscope. Sampling costs the loop
+far less than cProfile does.
+"""
+
+import asyncio
+import collections
+import contextvars
+import cProfile
+import functools
+import inspect
+import io
+import logging
+import os
+import pstats
+import sys
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+_trace = contextvars.ContextVar("trace", default=None)
+
+CAPTURE_KINDS = ("cpu", "sample")
+MAX_CAPTURE_SECONDS = 300
+SAMPLE_INTERVAL = 0.005  # seconds between stack samples
+
+
+# ---------------------- TRACING ----------------------
+class Trace:
+    """Spans recorded while handling one update."""
+
+    __slots__ = ("name", "started", "duration", "spans")
+
+    def __init__(self, name: str):
+        self.name = name
+        self.started = time.perf_counter()
+        self.duration = None
+        self.spans = []  # (name, seconds after the trace started, seconds)
+
+    def add(self, name: str, started: float, finished: float):
+        self.spans.append((name, started - self.started, finished - started))
+
+    def __str__(self):
+        spans = ", ".join(f"{name} +{offset * 1000:.1f} {took * 1000:.1f} ms" for name, offset, took in self.spans)
+        return f"{self.name} {self.duration * 1000:.1f} ms" + (f": {spans}" if spans else "")
+
+
+def _span_wrapper(func, name: str):
+    if inspect.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            trace = _trace.get()
+            if trace is None:
+                return await func(*args, **kwargs)
+            started = time.perf_counter()
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                trace.add(name, started, time.perf_counter())
+    else:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            trace = _trace.get()
+            if trace is None:
+                return func(*args, **kwargs)
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                trace.add(name, started, time.perf_counter())
+    return wrapper
+
+
+class Tracer:
+    """Samples one update in `rate` for tracing; 0 turns tracing off."""
+
+    def __init__(self, rate: int = 0, keep: int = 20):
+        self.rate = 0
+        self.traced = 0
+        self.recent = collections.deque(maxlen=keep)
+        self._seen = 0
+        self._targets = []  # (object, attribute, span name)
+        self._originals = []  # (object, attribute, had own attribute, original)
+        self.set_rate(rate)
+
+    def instrument(self, target, names, prefix: str = ""):
+        """Record calls to target.<name> as spans while tracing is on.
+
+        target is a module or an object (e.g. a logger); calls that look the
+        attribute up at call time see the wrapper.
+        """
+        for name in names:
+            self._targets.append((target, name, prefix + name))
+            if self.rate:
+                self._patch(target, name, prefix + name)
+
+    def set_rate(self, rate: int):
+        """Trace one update in rate from now on; 0 stops tracing and unwraps everything."""
+        rate = max(0, int(rate))
+        if rate and not self.rate:
+            for target, name, span in self._targets:
+                self._patch(target, name, span)
+        elif not rate and self.rate:
+            self._unpatch()
+        self.rate = rate
+        self._seen = 0
+
+    def _patch(self, target, name: str, span: str):
+        own = vars(target)
+        had = name in own
+        original = own.get(name)
+        self._originals.append((target, name, had, original))
+        setattr(target, name, _span_wrapper(getattr(target, name), span))
+
+    def _unpatch(self):
+        for target, name, had, original in reversed(self._originals):
+            if had:
+                setattr(target, name, original)
+            else:
+                delattr(target, name)
+        self._originals.clear()
+
+    async def run(self, name: str, handler, *args, **kwargs):
+        """Await handler(*args, **kwargs), tracing it if this update is sampled."""
+        self._seen += 1
+        if self._seen % self.rate or _trace.get() is not None:
+            return await handler(*args, **kwargs)
+        trace = Trace(name)
+        token = _trace.set(trace)
+        try:
+            return await handler(*args, **kwargs)
+        finally:
+            _trace.reset(token)
+            trace.duration = time.perf_counter() - trace.started
+            self.traced += 1
+            self.recent.append(trace)
+            logger.info("🔬 Trace %s", trace, extra={"event": "trace"})
+
+    @staticmethod
+    def record(name: str, started: float, finished: float):
+        """Add a span to the current trace, if there is one."""
+        trace = _trace.get()
+        if trace is not None:
+            trace.add(name, started, finished)
+
+
+TRACER = Tracer()
+
+
+# ---------------------- CAPTURES ----------------------
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{os.path.basename(code.co_filename)}:{code.co_name}"
+
+
+class StackSampler:
+    """Samples one thread's Python stack at a fixed interval from a helper thread."""
+
+    def __init__(self, thread_id: int, interval: float = SAMPLE_INTERVAL):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.samples = 0
+        self.stacks = collections.Counter()  # "outer;...;inner" -> samples
+
+    def run(self, seconds: float, stop: threading.Event):
+        deadline = time.monotonic() + seconds
+        while not stop.is_set() and time.monotonic() < deadline:
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                stack.append(_frame_label(frame))
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+                self.samples += 1
+            stop.wait(self.interval)
+
+    def write(self, path: str):
+        with open(path, "w", encoding="utf-8") as fh:
+            for stack, count in self.stacks.most_common():
+                fh.write(f"{stack} {count}\n")
+
+    def summary(self, limit: int = 10) -> str:
+        """The functions on the most sampled stacks, by share of samples."""
+        inclusive = collections.Counter()
+        for stack, count in self.stacks.items():
+            for label in set(stack.split(";")):
+                inclusive[label] += count
+        lines = [f"{self.samples} samples"]
+        lines.extend(
+            f"{count * 100 / self.samples:5.1f}%  {label}" for label, count in inclusive.most_common(limit)
+        )
+        return "\n".join(lines)
+
+
+def _cpu_summary(profile: cProfile.Profile, limit: int = 10) -> str:
+    stream = io.StringIO()
+    stats = pstats.Stats(profile, stream=stream)
+    stats.sort_stats("cumulative")
+    lines = [f"{stats.total_calls} calls, {stats.total_tt:.3f} s"]
+    for func in stats.fcn_list[:limit]:
+        calls, _, _, cumulative, _ = stats.stats[func]
+        filename, _, name = func
+        lines.append(f"{cumulative:7.3f} s {calls:>7}  {os.path.basename(filename)}:{name}")
+    return "\n".join(lines)
+
+
+class Profiler:
+    """Runs one time-boxed profile of the event-loop thread at a time."""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.captures = 0
+        self.current = None  # (kind, seconds) while a capture runs
+        self._task = None
+        self._stop = threading.Event()
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self, kind: str, seconds: float, on_done=None) -> asyncio.Task:
+        """Capture for seconds in the background; on_done(path, summary) is awaited afterwards."""
+        if kind not in CAPTURE_KINDS:
+            raise ValueError(f"unknown capture kind: {kind}")
+        if self.running:
+            raise RuntimeError("a capture is already running")
+        seconds = min(max(float(seconds), 0.1), MAX_CAPTURE_SECONDS)
+        self.current = (kind, seconds)
+        self._stop = threading.Event()
+        self._task = asyncio.get_running_loop().create_task(self._capture(kind, seconds, on_done))
+        return self._task
+
+    async def stop(self):
+        """Cut a running capture short; it is still written."""
+        if self.running:
+            self._stop.set()
+            await asyncio.wait([self._task])
+
+    async def _capture(self, kind: str, seconds: float, on_done):
+        os.makedirs(self.directory or ".", exist_ok=True)
+        path = os.path.join(self.directory, f"{kind}-{time.strftime('%Y%m%d-%H%M%S')}")
+        try:
+            if kind == "cpu":
+                path += ".prof"
+                profile = cProfile.Profile()
+                profile.enable()
+                try:
+                    await asyncio.get_running_loop().run_in_executor(None, self._stop.wait, seconds)
+                finally:
+                    profile.disable()
+                profile.dump_stats(path)
+                summary = _cpu_summary(profile)
+            else:
+                path += ".folded"
+                sampler = StackSampler(threading.get_ident())
+                await asyncio.get_running_loop().run_in_executor(None, sampler.run, seconds, self._stop)
+                sampler.write(path)
+                summary = sampler.summary()
+            self.captures += 1
+            logger.info("📈 %s profile written to %s", kind, path)
+        finally:
+            self.current = None
+        if on_done is not None:
+            await on_done(path, summary)
+        return path
@@ -0,0 +1,198 @@
+"""
+In-memory city search for inline queries.
+
+CityIndex is built once per catalogue and answers a query in two passes:
+
+1. Prefix: a sorted table holds every city name plus every word-suffix of
+   it ("new york", "york"), so "tor" and "york" are a bisect plus a short
+   scan. Exact names rank first, then whole-name prefixes, then word
+   prefixes.
+2. Trigram: when prefixes yield fewer than `limit` results, names sharing
+   trigrams with the query fill the rest, ranked by Jaccard similarity,
+   which tolerates typos such as "torotno".
+
+Results for every one- and two-character prefix are computed at build time;
+other queries are memoized in a small LRU.
+
+AliasTable resolves a typed name to exactly one city for /time: a
+precomputed table maps normalized spellings, abbreviations and common
+nicknames to cities, with a bounded fuzzy fallback for typos.
+"""
+
+import bisect
+import collections
+import difflib
+import heapq
+import re
+import unicodedata
+
+_APOSTROPHES = re.compile(r"['’`]")
+_NON_ALNUM = re.compile(r"[\W_]+")
+# Latin letters NFKD leaves whole, spelled the way their names are usually
+# written in ASCII: "Łódź" -> "lodz", "Tromsø" -> "tromso".
+_TRANSLITERATIONS = str.maketrans({
+    "ß": "ss", "æ": "ae", "œ": "oe", "ø": "o", "ł": "l", "đ": "d", "ð": "d",
+    "þ": "th", "ħ": "h", "ı": "i", "ŀ": "l", "ŧ": "t", "ŋ": "n", "ĸ": "k",
+})
+_WORD_START = re.compile(r"(?<= )\S")
+MIN_SIMILARITY = 0.25  # trigram Jaccard; "torotno" vs "toronto" is 0.27
+
+EXACT, NAME_PREFIX, WORD_PREFIX, FUZZY = range(4)
+
+
+def normalize(text: str) -> str:
+    """Casefold, strip accents and collapse punctuation: "St. John’s, NL" -> "st johns nl".
+
+    Latin letters are folded to ASCII; letters of other scripts are kept.
+    """
+    decomposed = unicodedata.normalize("NFKD", text.casefold())
+    stripped = "".join(ch for ch in decomposed if not unicodedata.combining(ch)).translate(_TRANSLITERATIONS)
+    return _NON_ALNUM.sub(" ", _APOSTROPHES.sub("", stripped)).strip()
+
+
+def trigrams(text: str) -> set:
+    """Word-padded trigrams of normalized text."""
+    grams = set()
+    for word in text.split():
+        padded = f" {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+class CityIndex:
+    """Prefix and trigram index over a fixed list of city names."""
+
+    def __init__(self, names, limit: int = 20, cache_size: int = 4096):
+        self.names = tuple(names)
+        self.limit = limit
+        self.cache_size = cache_size
+        self._normalized = tuple(normalize(name) for name in self.names)
+
+        keys = []
+        postings = collections.defaultdict(list)
+        self._gram_counts = []
+        for idx, norm in enumerate(self._normalized):
+            keys.append((norm, idx))
+            keys.extend((norm[m.start():], idx) for m in _WORD_START.finditer(norm))
+            grams = trigrams(norm)
+            self._gram_counts.append(len(grams))
+            for gram in grams:
+                postings[gram].append(idx)
+        keys.sort()
+        self._keys = tuple(key for key, _ in keys)
+        self._key_ids = tuple(idx for _, idx in keys)
+        self._trigrams = dict(postings)
+
+        self._cache = collections.OrderedDict()
+        self._precomputed = {"": self.names[:limit]}
+        for prefix in {key[:n] for key in self._keys for n in (1, 2) if len(key) >= n}:
+            self._precomputed[prefix] = self._search(prefix)
+
+    def __len__(self):
+        return len(self.names)
+
+    def search(self, query: str) -> tuple:
+        """Return up to `limit` city names matching query, best first."""
+        query = normalize(query)
+        results = self._precomputed.get(query)
+        if results is not None:
+            return results
+        results = self._cache.get(query)
+        if results is not None:
+            self._cache.move_to_end(query)
+            return results
+        results = self._cache[query] = self._search(query)
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return results
+
+    def _search(self, query: str) -> tuple:
+        ranked = {}
+        start = bisect.bisect_left(self._keys, query)
+        for position in range(start, len(self._keys)):
+            key = self._keys[position]
+            if not key.startswith(query):
+                break
+            idx = self._key_ids[position]
+            norm = self._normalized[idx]
+            rank = EXACT if norm == query else NAME_PREFIX if key == norm else WORD_PREFIX
+            if rank < ranked.get(idx, FUZZY + 1):
+                ranked[idx] = rank
+        best = heapq.nsmallest(self.limit, ranked, key=lambda idx: (ranked[idx], self.names[idx]))
+
+        if len(best) < self.limit and len(query) >= 3:
+            best.extend(self._fuzzy(query, self.limit - len(best), exclude=ranked))
+        return tuple(self.names[idx] for idx in best)
+
+    def _fuzzy(self, query: str, limit: int, exclude) -> list:
+        grams = trigrams(query)
+        shared = collections.Counter()
+        for gram in grams:
+            shared.update(self._trigrams.get(gram, ()))
+        scored = []
+        for idx, count in shared.items():
+            similarity = count / (len(grams) + self._gram_counts[idx] - count)
+            if similarity >= MIN_SIMILARITY and idx not in exclude:
+                scored.append((-similarity, self.names[idx], idx))
+        return [idx for _, _, idx in heapq.nsmallest(limit, scored)]
+
+
+# ---------------------- ALIASES ----------------------
+ABBREVIATIONS = {"st": "saint", "ste": "sainte", "ft": "fort", "mt": "mount", "pt": "port"}
+# Words that may be left off a name: "Quebec City" -> "quebec", "Greater Sudbury" -> "sudbury"
+OPTIONAL_WORDS = {"city", "dc", "greater"}
+NICKNAMES = {
+    "nyc": "New York",
+    "la": "Los Angeles",
+    "sf": "San Francisco",
+    "dc": "Washington DC",
+    "philly": "Philadelphia",
+    "vegas": "Las Vegas",
+    "kc": "Kansas City",
+    "okc": "Oklahoma City",
+    "yvr": "Vancouver",
+    "yyz": "Toronto",
+}
+
+
+def canonical(text: str) -> str:
+    """normalize() plus expanded abbreviations: "St Johns" -> "saint johns"."""
+    return " ".join(ABBREVIATIONS.get(word, word) for word in normalize(text).split())
+
+
+class AliasTable:
+    """Resolves typed city names to catalogue names through precomputed aliases."""
+
+    def __init__(self, names, cutoff: float = 0.75):
+        self.cutoff = cutoff
+        self._aliases = {}
+        for name in names:
+            key = canonical(name)
+            self._aliases[key] = name
+            words = key.split()
+            short = " ".join(word for word in words if word not in OPTIONAL_WORDS)
+            if short and short != key:
+                self._aliases.setdefault(short, name)
+        for alias, name in NICKNAMES.items():
+            if name in names:
+                self._aliases.setdefault(alias, name)
+        # Fuzzy candidates are bucketed by first letter, so a lookup only
+        # compares against aliases that start the same way.
+        self._by_initial = collections.defaultdict(list)
+        for key in self._aliases:
+            if key:  # a name made only of punctuation has no alias to match
+                self._by_initial[key[0]].append(key)
+
+    def __len__(self):
+        return len(self._aliases)
+
+    def resolve(self, text: str):
+        """Return the city `text` names, or None when nothing is close enough."""
+        key = canonical(text)
+        if not key:
+            return None
+        name = self._aliases.get(key)
+        if name is not None:
+            return name
+        matches = difflib.get_close_matches(key, self._by_initial.get(key[0], ()), n=1, cutoff=self.cutoff)
+        return self._aliases[matches[0]] if matches else None
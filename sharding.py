@@ -0,0 +1,262 @@
+"""
+Multi-process sharding behind a single update intake.
+
+One process receives updates (polling or webhook) and fans them out to N
+worker processes, each running its own Application. Updates are routed by
+a consistent hash of their chat (see concurrency.chat_key), so a chat
+always lands on the same worker and stays in order while all cores are
+used. Updates travel over a socketpair per worker as length-prefixed JSON.
+Each worker writes its own log file (see worker_path), since several
+processes rotating one file would lose or interleave records.
+
+The pool supervises its workers: a worker that exits is restarted on the
+same shard. Delivery is at most once; updates sitting in a worker that
+dies are lost, as they would be if a single-process bot crashed.
+"""
+
+import asyncio
+import bisect
+import hashlib
+import json
+import logging
+import os
+import socket
+import struct
+import sys
+
+from telegram import Update
+from telegram.ext import Application
+
+from concurrency import chat_key
+
+logger = logging.getLogger(__name__)
+
+FRAME_HEADER = struct.Struct(">I")
+READY = b"R"  # sent by a worker once its Application has started
+WORKER_NAME = "bot-worker-"  # process name prefix; the worker index follows
+
+
+def worker_index():
+    """Index of the worker this process runs as, or None outside a worker."""
+    # Spawned workers have multiprocessing loaded and are named before the
+    # bot module is imported into them, so this works at import time.
+    multiprocessing = sys.modules.get("multiprocessing")
+    if multiprocessing is None:
+        return None
+    name = multiprocessing.current_process().name
+    if not name.startswith(WORKER_NAME) or not name[len(WORKER_NAME):].isdigit():
+        return None
+    return int(name[len(WORKER_NAME):])
+
+
+def worker_path(path: str) -> str:
+    """path with the worker index added in a worker process: "bot.log" -> "bot.worker-0.log"."""
+    index = worker_index()
+    if not path or index is None:
+        return path
+    root, ext = os.path.splitext(path)
+    return f"{root}.worker-{index}{ext}"
+
+
+# ---------------------- ROUTING ----------------------
+def _hash(value: str) -> int:
+    return int.from_bytes(hashlib.blake2b(value.encode(), digest_size=8).digest(), "big")
+
+
+class HashRing:
+    """Consistent hash ring with virtual nodes."""
+
+    def __init__(self, nodes, replicas: int = 64):
+        points = sorted((_hash(f"{node}#{i}"), node) for node in nodes for i in range(replicas))
+        self._hashes = [point for point, _ in points]
+        self._nodes = [node for _, node in points]
+
+    def node_for(self, key) -> object:
+        position = bisect.bisect(self._hashes, _hash(repr(key))) % len(self._hashes)
+        return self._nodes[position]
+
+
+# ---------------------- FRAMING ----------------------
+def encode_frame(update: Update) -> bytes:
+    payload = json.dumps(update.to_dict(), separators=(",", ":")).encode("utf-8")
+    return FRAME_HEADER.pack(len(payload)) + payload
+
+
+async def read_frame(reader: asyncio.StreamReader):
+    """Return the next decoded frame, or None at end of stream."""
+    try:
+        header = await reader.readexactly(FRAME_HEADER.size)
+        payload = await reader.readexactly(FRAME_HEADER.unpack(header)[0])
+    except asyncio.IncompleteReadError:
+        return None
+    return json.loads(payload)
+
+
+async def receive_updates(sock: socket.socket, application: Application):
+    """Worker side: feed updates from the intake into application until it hangs up."""
+    reader, writer = await asyncio.open_connection(sock=sock)
+    writer.write(READY)
+    await writer.drain()
+    try:
+        while True:
+            data = await read_frame(reader)
+            if data is None:
+                return
+            update = Update.de_json(data, application.bot)
+            if update is not None:
+                # Bounded queue: waiting here stops reading the socket, which
+                # in turn makes the intake wait.
+                await application.update_queue.put(update)
+    finally:
+        writer.close()
+
+
+# ---------------------- POOL ----------------------
+class _Worker:
+    __slots__ = ("process", "writer")
+
+    def __init__(self, process, writer):
+        self.process = process
+        self.writer = writer
+
+
+class WorkerPool:
+    """Spawns and supervises `workers` processes running target(index, sock)."""
+
+    def __init__(self, workers: int, target, check_interval: float = 1.0, start_timeout: float = 60.0):
+        self.workers = workers
+        self.target = target
+        self.check_interval = check_interval
+        self.start_timeout = start_timeout
+        self.ring = HashRing(range(workers))
+        self.restarts = 0
+        self.forwarded = 0
+        import multiprocessing  # only sharded deployments pay for it
+
+        self._context = multiprocessing.get_context("spawn")
+        self._workers = {}
+        self._restarting = {}
+        self._supervisor = None
+
+    @property
+    def alive(self) -> int:
+        return sum(1 for worker in self._workers.values() if worker.process.is_alive())
+
+    def healthy(self) -> bool:
+        return self._supervisor is not None and self.alive == self.workers
+
+    async def start(self):
+        """Spawn every worker and wait until they are ready for updates."""
+        await asyncio.gather(*(self._spawn(index) for index in range(self.workers)))
+        self._supervisor = asyncio.get_running_loop().create_task(self._supervise())
+
+    async def _spawn(self, index: int):
+        parent, child = socket.socketpair()
+        process = self._context.Process(
+            target=self.target, args=(index, child), name=f"{WORKER_NAME}{index}", daemon=True
+        )
+        process.start()
+        child.close()
+        reader, writer = await asyncio.open_connection(sock=parent)
+        self._workers[index] = _Worker(process, writer)
+        try:
+            await asyncio.wait_for(reader.readexactly(len(READY)), self.start_timeout)
+        except (asyncio.IncompleteReadError, asyncio.TimeoutError):
+            # Left to the supervisor, which restarts workers that are not alive.
+            logger.error("Worker %s did not become ready", index)
+            return
+        logger.info("Started worker %s (pid %s)", index, process.pid)
+
+    async def _restart(self, index: int):
+        """Replace worker `index`; concurrent callers share one replacement."""
+        pending = self._restarting.get(index)
+        if pending is None:
+            pending = self._restarting[index] = asyncio.ensure_future(self._replace(index))
+            pending.add_done_callback(lambda _: self._restarting.pop(index, None))
+        await asyncio.shield(pending)
+
+    async def _replace(self, index: int):
+        worker = self._workers[index]
+        worker.writer.close()
+        if worker.process.is_alive():
+            worker.process.kill()
+        await asyncio.get_running_loop().run_in_executor(None, worker.process.join)
+        self.restarts += 1
+        await self._spawn(index)
+
+    async def _supervise(self):
+        while True:
+            await asyncio.sleep(self.check_interval)
+            for index, worker in list(self._workers.items()):
+                if not worker.process.is_alive():
+                    logger.error(
+                        "Worker %s exited with code %s, restarting", index, worker.process.exitcode
+                    )
+                    await self._restart(index)
+
+    async def dispatch(self, update: Update):
+        """Send update to the worker owning its chat."""
+        index = self.ring.node_for(chat_key(update))
+        frame = encode_frame(update)
+        for attempt in range(2):
+            worker = self._workers[index]
+            try:
+                worker.writer.write(frame)
+                await worker.writer.drain()
+            except (ConnectionError, OSError):
+                if attempt:
+                    raise
+                logger.error("Worker %s is gone, restarting before delivery", index)
+                await self._restart(index)
+            else:
+                self.forwarded += 1
+                return
+
+    async def stop(self, timeout: float = 10.0):
+        """Hang up on every worker, let them finish, then kill stragglers."""
+        if self._supervisor is not None:
+            self._supervisor.cancel()
+            try:
+                await self._supervisor
+            except asyncio.CancelledError:
+                pass
+            self._supervisor = None
+        for worker in self._workers.values():
+            worker.writer.close()
+        loop = asyncio.get_running_loop()
+        for worker in self._workers.values():
+            await loop.run_in_executor(None, worker.process.join, timeout)
+            if worker.process.is_alive():
+                logger.warning("Worker %s did not stop in time, killing it", worker.process.name)
+                worker.process.kill()
+                await loop.run_in_executor(None, worker.process.join)
+        self._workers.clear()
+
+
+class ShardedApplication(Application):
+    """Intake Application that forwards every update to a WorkerPool instead of handling it."""
+
+    def __init__(self, *, pool: WorkerPool, on_update=None, tracker=None, **kwargs):
+        super().__init__(**kwargs)
+        self.pool = pool
+        self.on_update = on_update
+        self.tracker = tracker  # offsets.UpdateTracker; an update is done once forwarded
+
+    async def start(self) -> None:
+        await self.pool.start()
+        await super().start()
+
+    async def stop(self) -> None:
+        await super().stop()
+        await self.pool.stop()
+
+    async def process_update(self, update: object) -> None:
+        if not isinstance(update, Update):
+            return
+        if self.tracker is not None and not self.tracker.accept(update):
+            return
+        if self.on_update is not None:
+            self.on_update(update)
+        await self.pool.dispatch(update)
+        if self.tracker is not None:
+            self.tracker.done(update)
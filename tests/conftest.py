@@ -0,0 +1,36 @@
+import os
+import sys
+
+import pytest
+
+# Add parent directory to path to import bot modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Keep logs, favorites and the update offset out of files in the checkout
+os.environ.setdefault("LOG_FILE", "")
+os.environ.setdefault("FAVORITES_DB", "")
+os.environ.setdefault("OFFSET_FILE", "")
+
+import bot_enhanced
+from outbound import OutboundScheduler
+
+
+@pytest.fixture
+def restore_catalogue():
+    """Restore the city catalogue and keyboard cache after a test edits them."""
+    saved = dict(bot_enhanced.CITY_TIMEZONES)
+    yield
+    bot_enhanced.CITY_TIMEZONES.clear()
+    bot_enhanced.CITY_TIMEZONES.update(saved)
+    bot_enhanced.rebuild_keyboard_cache()
+
+
+@pytest.fixture(autouse=True)
+def outbound(monkeypatch):
+    """Give each test an outbound scheduler that no earlier test has stopped."""
+    scheduler = OutboundScheduler(
+        global_rate=bot_enhanced.OUTBOUND_GLOBAL_RATE,
+        chat_rate=bot_enhanced.OUTBOUND_CHAT_RATE,
+        group_rate=bot_enhanced.OUTBOUND_GROUP_RATE,
+    )
+    monkeypatch.setattr(bot_enhanced, "OUTBOUND", scheduler)
+    return scheduler
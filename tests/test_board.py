@@ -0,0 +1,79 @@
+import os
+import sys
+from datetime import datetime, timedelta
+
+# Add parent directory to path to import bot modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytz
+
+from board import BoardCache, ZoneGroups, format_offset, render_board, split_message
+from tztables import ZoneTables
+
+CITIES = {
+    "Toronto": "America/Toronto",
+    "Montreal": "America/Toronto",
+    "St. John's": "America/St_Johns",
+    "Vancouver": "America/Vancouver",
+}
+JANUARY = 1_704_110_400  # 2024-01-01 12:00 UTC
+
+
+class TestRenderBoard:
+    def test_grouped_by_offset(self):
+        """Cities are grouped under their UTC offset, west to east"""
+        zones = []
+
+        def local_time(zone, timestamp):
+            zones.append(zone)
+            return datetime.fromtimestamp(timestamp, pytz.timezone(zone))
+
+        groups = ZoneGroups(list(CITIES), CITIES.__getitem__)
+        (board,) = render_board(groups, local_time, JANUARY)
+        lines = board.split("\n")
+        assert lines[0] == "🌍 **World clock** - 12:00 UTC"
+        assert lines[2] == "🕐 **04:00 AM** (UTC−08:00)" and lines[3] == "Vancouver"
+        assert lines[5] == "🕐 **07:00 AM** (UTC−05:00)" and lines[6] == "Toronto, Montreal"
+        assert lines[8] == "🕐 **08:30 AM** (UTC−03:30)"
+        assert zones.count("America/Toronto") == 1
+
+    def test_zones_sharing_an_offset_merge_in_order(self):
+        """Zones with the same offset form one group, names kept in catalogue order"""
+        names = ["Atlanta", "Ottawa", "Toronto", "Zanesville"]
+        zones = {"Atlanta": "America/New_York", "Ottawa": "America/Toronto",
+                 "Toronto": "America/Toronto", "Zanesville": "America/New_York"}
+        groups = ZoneGroups(names, zones.__getitem__)
+        (offset, _, merged), = groups.by_offset(ZoneTables().localtime, JANUARY)
+        assert format_offset(offset) == "UTC−05:00"
+        assert groups.names_in(merged) == names
+
+    def test_format_offset(self):
+        """Offsets render with sign, hours and minutes"""
+        assert format_offset(timedelta(hours=5, minutes=45)) == "UTC+05:45"
+        assert format_offset(timedelta(hours=-3, minutes=-30)) == "UTC−03:30"
+        assert format_offset(timedelta(0)) == "UTC+00:00"
+
+
+class TestSplitMessage:
+    def test_chunks_respect_limit(self):
+        """Lines are packed into chunks no longer than the limit"""
+        chunks = split_message(["a" * 6, "b" * 6, "c" * 6], limit=13)
+        assert chunks == ["aaaaaa\nbbbbbb", "cccccc"]
+
+    def test_long_line_broken_between_names(self):
+        """A line longer than the limit breaks between city names"""
+        chunks = split_message([", ".join(["Toronto"] * 10)], limit=30)
+        assert all(len(chunk) <= 30 for chunk in chunks)
+        assert ", ".join(chunks).count("Toronto") == 10
+
+
+class TestBoardCache:
+    def test_one_render_per_minute_and_version(self):
+        """Requests within a minute share one render; a new minute or catalogue re-renders"""
+        rendered = []
+        cache = BoardCache(lambda minute: rendered.append(minute) or [f"board {minute}"])
+        assert cache.get(1, 120) == ("board 120",)
+        assert cache.get(1, 179.9) == ("board 120",)
+        assert cache.get(1, 180) == ("board 180",)
+        assert cache.get(2, 180) == ("board 180",)
+        assert rendered == [120, 180, 180] and cache.renders == 3
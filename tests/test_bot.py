@@ -8,7 +8,10 @@ import os
 # Add parent directory to path to import bot modules
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+import bot_enhanced
 from bot_enhanced import get_local_time, build_keyboard, CITY_TIMEZONES
+from catalogue import MappedCatalogue, write_catalogue
+from search import normalize
 
 
 class TestTimezoneBot:
@@ -92,5 +95,181 @@ class TestTimezoneBot:
         assert len(canadian_cities) >= 40  # Should have at least 40 Canadian cities
 
 
+class TestKeyboardCache:
+    """Tests for the prebuilt keyboard page table."""
+
+    def test_pages_are_served_from_cache(self):
+        """Repeated lookups return the same markup object."""
+        assert build_keyboard(3) is build_keyboard(3)
+
+    def test_page_count_covers_catalogue(self):
+        """Every city appears on exactly one page, in alphabetical order."""
+        cities = [
+            row[0].text
+            for page in range(bot_enhanced.page_count())
+            for row in build_keyboard(page).inline_keyboard
+            if bot_enhanced.callback_codec().decode(row[0].callback_data).action == "city"
+        ]
+        assert sorted(cities) == sorted(CITY_TIMEZONES)
+        assert cities == sorted(cities, key=normalize)
+
+    def test_out_of_range_pages_are_clamped(self):
+        """Pages outside the table fall back to the first or last page."""
+        assert build_keyboard(-1) is build_keyboard(0)
+        last = bot_enhanced.page_count() - 1
+        assert build_keyboard(last + 10) is build_keyboard(last)
+
+    def test_last_page_has_no_next(self):
+        """The last page only offers Prev navigation."""
+        keyboard = build_keyboard(bot_enhanced.page_count() - 1)
+        labels = [button.text for row in keyboard.inline_keyboard for button in row]
+        assert "Next ➡️" not in labels
+        assert "⬅️ Prev" in labels
+
+    def test_register_cities_bumps_version(self, restore_catalogue):
+        """Adding cities invalidates the table and stamps a new version."""
+        before = bot_enhanced.catalogue_version()
+        old_first_page = build_keyboard(0)
+        new_cities = {f"Zz Test City {i}": "America/Toronto" for i in range(7)}
+        assert bot_enhanced.register_cities(new_cities) == before + 1
+        assert build_keyboard(0) is not old_first_page
+        last = build_keyboard(bot_enhanced.page_count() - 1)
+        assert last.inline_keyboard[0][0].text.startswith("Zz Test City")
+
+    def test_register_cities_refuses_mapped_catalogues(self, monkeypatch, tmp_path):
+        """A catalogue file cannot be extended in place; the error says to rebuild it."""
+        path = tmp_path / "cities.ctz"
+        write_catalogue(str(path), {"Toronto": "America/Toronto"})
+        mapped = MappedCatalogue(str(path))
+        monkeypatch.setattr(bot_enhanced, "CITY_TIMEZONES", mapped)
+        try:
+            with pytest.raises(TypeError, match="rebuild"):
+                bot_enhanced.register_cities({"Ajax": "America/Toronto"})
+        finally:
+            monkeypatch.undo()
+            mapped.close()
+
+    def test_page_cache_is_bounded(self, monkeypatch):
+        """Only the most recently used pages stay rendered."""
+        monkeypatch.setattr(bot_enhanced, "PAGE_CACHE_SIZE", 2)
+        first = build_keyboard(0)
+        build_keyboard(1)
+        build_keyboard(2)
+        assert len(bot_enhanced._page_cache) == 2
+        assert build_keyboard(0) is not first
+        assert build_keyboard(0) == first
+
+
+class TestLetterNavigation:
+    """Tests for jump-to-letter navigation."""
+
+    def test_letter_page_shows_first_city_with_letter(self):
+        """Jumping to a letter lands on the page holding its first city."""
+        page = bot_enhanced.letter_page("T")
+        cities = [row[0].text for row in build_keyboard(page).inline_keyboard]
+        first_t = min((city for city in CITY_TIMEZONES if city.startswith("T")), key=normalize)
+        assert first_t in cities
+
+    def test_letter_is_case_and_accent_insensitive(self):
+        """Lower-case letters jump like upper-case ones."""
+        assert bot_enhanced.letter_page("l") == bot_enhanced.letter_page("L")
+
+    def test_missing_letter(self):
+        """Letters without cities report -1 and are left off the keyboard."""
+        assert bot_enhanced.letter_page("X") == -1
+        labels = [button.text for row in bot_enhanced.letter_keyboard().inline_keyboard for button in row]
+        assert "X" not in labels
+        assert "T" in labels
+
+    def test_menu_links_to_letters(self):
+        """Every menu page offers the A–Z keyboard."""
+        callbacks = [button.callback_data for row in build_keyboard(0).inline_keyboard for button in row]
+        assert bot_enhanced.callbacks.LETTERS_DATA in callbacks
+
+
+class TestTimeCache:
+    """Tests for the per-zone rendered time cache."""
+
+    def test_same_zone_same_second_is_computed_once(self):
+        """Cities sharing a zone reuse one rendering within a second."""
+        before = bot_enhanced.time_cache_stats()
+        with patch("bot_enhanced.time.time", return_value=1_736_942_400.25):
+            toronto = get_local_time("Toronto")
+            montreal = get_local_time("Montreal")
+            ottawa = get_local_time("Ottawa")
+        after = bot_enhanced.time_cache_stats()
+        assert toronto == montreal == ottawa
+        assert after["misses"] - before["misses"] <= 1
+        assert after["hits"] - before["hits"] >= 2
+
+    def test_cache_expires_at_second_boundary(self):
+        """A new second produces a fresh rendering."""
+        with patch("bot_enhanced.time.time", return_value=1_736_942_400.9):
+            first = get_local_time("Toronto")
+        with patch("bot_enhanced.time.time", return_value=1_736_942_401.0):
+            second = get_local_time("Toronto")
+        assert first.startswith("07:00:00 AM")
+        assert second.startswith("07:00:01 AM")
+
+    def test_rendered_format(self):
+        """The rendered text matches the documented layout."""
+        with patch("bot_enhanced.time.time", return_value=1_736_942_400):
+            result = get_local_time("Vancouver")
+        assert result == "04:00:00 AM\n📅 Wednesday, January 15, 2025"
+
+    def test_zone_objects_are_resolved_once(self):
+        """Zone lookups return the same tz object."""
+        assert bot_enhanced.resolve_zone("America/Toronto") is bot_enhanced.resolve_zone("America/Toronto")
+
+
+class TestWorldBoard:
+    """Tests for the shared /board message."""
+
+    def test_board_lists_every_city(self):
+        """Every catalogue city appears on the board."""
+        text = "\n".join(bot_enhanced.world_board())
+        for city in CITY_TIMEZONES:
+            assert city in text
+
+    def test_catalogue_change_rerenders(self, restore_catalogue):
+        """A new catalogue version renders a fresh board within the same minute."""
+        with patch("bot_enhanced.time.time", return_value=1_736_942_400):
+            first = bot_enhanced.world_board()
+            assert bot_enhanced.world_board() is first
+            bot_enhanced.register_cities({"Zz Test City": "Asia/Kolkata"})
+            board = "\n".join(bot_enhanced.world_board())
+        assert "Zz Test City" in board and "(UTC+05:30)" in board
+
+
+class TestWarmUp:
+    """Tests for building lazy structures ahead of the first update."""
+
+    def test_warm_up_builds_everything(self):
+        """Warm-up covers the menu, search, zone groups and every zone table."""
+        sizes = bot_enhanced.warm_up()
+        assert sizes["cities"] == len(CITY_TIMEZONES)
+        assert sizes["zones"] == len(set(CITY_TIMEZONES.values()))
+        assert 0 in bot_enhanced._page_cache
+        assert bot_enhanced._search_version == bot_enhanced.catalogue_version()
+        assert "warm_up" in bot_enhanced.startup.PHASES
+
+    def test_mapped_catalogue_is_not_decoded(self, restore_catalogue, monkeypatch, tmp_path):
+        """With a mapped catalogue, warm-up skips the structures that hold every city."""
+        path = tmp_path / "cities.ctz"
+        write_catalogue(str(path), dict(CITY_TIMEZONES))
+        mapped = MappedCatalogue(str(path))
+        monkeypatch.setattr(bot_enhanced, "CITY_TIMEZONES", mapped)
+        bot_enhanced.rebuild_keyboard_cache()
+        try:
+            sizes = bot_enhanced.warm_up()
+            assert sizes["zones"] == len(mapped.zones())
+            assert bot_enhanced._search_version != bot_enhanced.catalogue_version()
+            assert bot_enhanced._zone_groups_version != bot_enhanced.catalogue_version()
+            assert 0 in bot_enhanced._page_cache
+        finally:
+            monkeypatch.undo()
+            mapped.close()
+
+
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
\ No newline at end of file
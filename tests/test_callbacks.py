@@ -0,0 +1,120 @@
+import asyncio
+import os
+import sys
+from unittest.mock import AsyncMock, Mock
+
+# Add parent directory to path to import bot modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+import bot_enhanced
+import callbacks
+from callbacks import CALLBACK_DATA_LIMIT, CallbackCodec, Press, from_base36, to_base36
+from catalogue import SortedNames
+
+CITIES = {
+    "Toronto": "America/Toronto",
+    "St. John's": "America/St_Johns",
+    "Lévis": "America/Toronto",
+    "Llanfairpwllgwyngyllgogerychwyrndrobwllllantysiliogogogoch, GB": "Europe/London",
+}
+
+
+def codec(cities=CITIES):
+    names = SortedNames(cities)
+    return CallbackCodec(names, names.fingerprint())
+
+
+class TestEncoding:
+    """Tests for the compact callback data format."""
+
+    def test_base36_round_trip(self):
+        """Ids survive base 36 and junk is rejected"""
+        for number in (0, 35, 36, 99_999, 2 ** 40):
+            assert from_base36(to_base36(number)) == number
+        for text in ("", "A", "-1", "1_0", " 1"):
+            with pytest.raises(ValueError):
+                from_base36(text)
+
+    def test_cities_round_trip_within_the_limit(self):
+        """Every city, however long its name, fits in a few bytes and decodes back"""
+        current = codec()
+        for index, name in enumerate(current.names):
+            for action in (callbacks.CITY, callbacks.FAVORITE):
+                data = current.city_data(action, index)
+                assert len(data.encode("utf-8")) <= 12 < CALLBACK_DATA_LIMIT
+                assert current.decode(data) == Press(action, name)
+
+    def test_other_actions_round_trip(self):
+        """Pages, letters and the fixed buttons decode to their action"""
+        current = codec()
+        assert current.decode(callbacks.page_data(1234)) == Press(callbacks.PAGE, 1234)
+        assert current.decode(callbacks.letter_data("T")) == Press(callbacks.LETTER, "T")
+        assert current.decode(callbacks.MINE_DATA) == Press(callbacks.MINE)
+        assert current.decode(callbacks.LETTERS_DATA) == Press(callbacks.LETTERS)
+        assert current.decode(callbacks.UNWATCH_DATA) == Press(callbacks.UNWATCH)
+
+    def test_cities_from_another_catalogue_are_stale(self):
+        """A city index stamped by a different catalogue is not trusted"""
+        old = codec()
+        new = codec({**CITIES, "Ajax": "America/Toronto"})
+        assert old.stamp != new.stamp
+        assert new.decode(old.city_data(callbacks.CITY, 0)) == Press(callbacks.CITY, None, "stale")
+        assert new.decode(new.city_data(callbacks.CITY, 99)) == Press(callbacks.CITY, None, "stale")
+
+    def test_legacy_data_still_decodes(self):
+        """Buttons sent before the switch keep working, dots and all"""
+        current = codec()
+        assert current.decode("city:St. John's") == Press(callbacks.CITY, "St. John's", "legacy")
+        assert current.decode("fav:Toronto") == Press(callbacks.FAVORITE, "Toronto", "legacy")
+        assert current.decode("page:3") == Press(callbacks.PAGE, 3, "legacy")
+        assert current.decode("letter:T") == Press(callbacks.LETTER, "T", "legacy")
+        assert current.decode("mine") == Press(callbacks.MINE, None, "legacy")
+        assert current.decode("unwatch") == Press(callbacks.UNWATCH, None, "legacy")
+        assert current.decode("city:Atlantis") == Press(callbacks.CITY, None, "stale")
+
+    def test_malformed_data_is_rejected(self):
+        """Anything else decodes to None rather than raising"""
+        current = codec()
+        for data in ("", "x.1", "p", "p.1.2", "p.Z", "c.abc", "m.1", "page:x", "mine:1", "city", "nonsense"):
+            assert current.decode(data) is None, data
+
+
+class TestButtonDispatch:
+    """Tests for button_handler's table dispatch."""
+
+    def press(self, data):
+        query = Mock(data=data, inline_message_id=None)
+        query.from_user = Mock(id=7, username="u")
+        query.message = Mock(chat_id=7, message_id=1)
+        query.message.reply_text = AsyncMock()
+        query.answer = AsyncMock()
+        query.edit_message_reply_markup = AsyncMock()
+        asyncio.run(bot_enhanced.button_handler(Mock(callback_query=query), None))
+        return query
+
+    def test_every_action_has_a_handler(self):
+        """The dispatch table covers every action the codec produces"""
+        assert set(bot_enhanced.BUTTON_ACTIONS) == set(callbacks.TAGS.values())
+
+    def test_stale_city_refreshes_the_menu(self, monkeypatch):
+        """A city button from an older catalogue swaps in the current menu instead of guessing"""
+        monkeypatch.setattr(bot_enhanced.EDITS, "window", 0)
+        query = self.press(f"c.{'zzz' if bot_enhanced.callback_codec().stamp != 'zzz' else 'yyy'}.0")
+        query.message.reply_text.assert_not_called()
+        assert query.answer.call_args.args == (bot_enhanced.STALE_BUTTON,)
+        assert query.edit_message_reply_markup.call_args.kwargs["reply_markup"] is bot_enhanced.build_keyboard(0)
+
+    def test_legacy_page_button_still_pages(self, monkeypatch):
+        """Old "page:N" buttons keep paging"""
+        monkeypatch.setattr(bot_enhanced.EDITS, "window", 0)
+        query = self.press("page:1")
+        assert query.edit_message_reply_markup.call_args.kwargs["reply_markup"] is bot_enhanced.build_keyboard(1)
+
+    def test_unknown_data_is_ignored(self):
+        """Unrecognised data is answered and otherwise ignored"""
+        query = self.press("nonsense")
+        query.answer.assert_called_once()
+        query.message.reply_text.assert_not_called()
+        query.edit_message_reply_markup.assert_not_called()
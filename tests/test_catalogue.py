@@ -0,0 +1,135 @@
+import os
+import sys
+
+# Add parent directory to path to import bot modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+from catalogue import MappedCatalogue, SortedNames, fold_key, menu_order, read_city_file, write_catalogue
+
+CITIES = {
+    "Toronto": "America/Toronto",
+    "Lévis": "America/Toronto",
+    "Trois-Rivières": "America/Toronto",
+    "St. John's": "America/St_Johns",
+    "Vancouver": "America/Vancouver",
+    "Los Angeles": "America/Los_Angeles",
+    "A Very Long City Name That Exceeds The Key Width": "America/Chicago",
+    "A Very Long City Name That Exceeds The Key Width Too": "America/Denver",
+}
+
+
+@pytest.fixture
+def catalogue(tmp_path):
+    path = tmp_path / "cities.ctz"
+    write_catalogue(str(path), CITIES)
+    mapped = MappedCatalogue(str(path))
+    yield mapped
+    mapped.close()
+
+
+class TestMappedCatalogue:
+    def test_mapping(self, catalogue):
+        """The mapped catalogue behaves like the dict it was built from"""
+        assert len(catalogue) == len(CITIES)
+        assert dict(catalogue) == CITIES
+        assert catalogue["Lévis"] == "America/Toronto"
+        assert catalogue.get("Atlantis") is None
+        assert "St. John's" in catalogue
+        assert 42 not in catalogue
+
+    def test_long_names_sharing_a_key(self, catalogue):
+        """Names whose folded keys collide after truncation stay distinct"""
+        assert catalogue["A Very Long City Name That Exceeds The Key Width"] == "America/Chicago"
+        assert catalogue["A Very Long City Name That Exceeds The Key Width Too"] == "America/Denver"
+
+    def test_names_in_menu_order(self, catalogue):
+        """Names are sorted by their folded form, so accents sort with their letter"""
+        names = list(catalogue.names)
+        assert names == list(SortedNames(CITIES))
+        assert names.index("Lévis") < names.index("Los Angeles")
+        assert catalogue.names[-1] == "Vancouver"
+        assert catalogue.names[1:3] == names[1:3]
+
+    def test_first_index(self, catalogue):
+        """first_index finds the first name with a prefix, or -1"""
+        assert catalogue.names[catalogue.names.first_index("t")] == "Toronto"
+        assert catalogue.names.first_index("x") == -1
+
+    def test_position_and_fingerprint(self, catalogue):
+        """Both name sequences find a name's index, and their fingerprints track changes"""
+        for names in (catalogue.names, SortedNames(CITIES)):
+            assert [names.position(name) for name in names] == list(range(len(CITIES)))
+            assert names.position("A Very Long City Name That Exceeds The Key Width Too") >= 0
+            assert names.position("Atlantis") == -1
+        assert SortedNames(CITIES).fingerprint() == SortedNames(dict(CITIES)).fingerprint()
+        assert SortedNames(CITIES).fingerprint() != SortedNames({**CITIES, "Ajax": "America/Toronto"}).fingerprint()
+        assert isinstance(catalogue.names.fingerprint(), int)
+
+    def test_zones_are_interned(self, catalogue):
+        """Each zone is stored once"""
+        assert catalogue.zones() == tuple(sorted(set(CITIES.values())))
+
+    def test_rejects_other_files(self, tmp_path):
+        """Files without the catalogue header are refused"""
+        path = tmp_path / "bogus.ctz"
+        path.write_bytes(b"not a catalogue" * 4)
+        with pytest.raises(ValueError):
+            MappedCatalogue(str(path))
+
+    def test_rejects_catalogues_from_older_versions(self, tmp_path):
+        """A file built with the older key folding must be rebuilt"""
+        path = tmp_path / "old.ctz"
+        write_catalogue(str(path), CITIES)
+        path.write_bytes(b"CTZ1" + path.read_bytes()[4:])
+        with pytest.raises(ValueError, match="rebuild"):
+            MappedCatalogue(str(path))
+
+    def test_names_outside_ascii(self, tmp_path):
+        """Names in other scripts get keys of their own and are found by prefix"""
+        cities = {**CITIES, "Москва": "Europe/Moscow", "Łódź": "Europe/Warsaw"}
+        path = tmp_path / "cities.ctz"
+        write_catalogue(str(path), cities)
+        mapped = MappedCatalogue(str(path))
+        try:
+            assert dict(mapped) == cities
+            assert mapped.names[mapped.names.first_index("мо")] == "Москва"
+            assert mapped.names[mapped.names.first_index("lo")] == "Łódź"
+        finally:
+            mapped.close()
+
+    def test_menu_order(self, catalogue):
+        """menu_order uses the mapped order as is and sorts plain dicts"""
+        assert menu_order(catalogue) is catalogue.names
+        assert list(menu_order(CITIES)) == list(catalogue.names)
+
+
+class TestBuilding:
+    def test_fold_key(self):
+        """Keys are folded, truncated and NUL-padded"""
+        assert fold_key("Lévis", 8) == b"levis\0\0\0"
+        assert fold_key("Trois-Rivières", 8) == b"trois ri"
+
+    def test_name_zone_file(self, tmp_path):
+        """Two-column files are read as name and zone"""
+        path = tmp_path / "cities.tsv"
+        path.write_text("Toronto\tAmerica/Toronto\nbroken line\n", encoding="utf-8")
+        assert read_city_file(str(path)) == {"Toronto": "America/Toronto"}
+
+    def test_geonames_duplicates_and_long_names(self, tmp_path):
+        """GeoNames duplicates are disambiguated by country; long names are kept"""
+        def row(name, country, population, zone):
+            columns = [""] * 19
+            columns[1], columns[8], columns[10], columns[14], columns[17] = name, country, "01", str(population), zone
+            return "\t".join(columns)
+
+        path = tmp_path / "cities15000.txt"
+        path.write_text("\n".join([
+            row("London", "CA", 400000, "America/Toronto"),
+            row("London", "GB", 8000000, "Europe/London"),
+            row("X" * 70, "US", 20000, "America/Chicago"),
+        ]), encoding="utf-8")
+        assert read_city_file(str(path)) == {
+            "London": "Europe/London", "London, CA": "America/Toronto", "X" * 70: "America/Chicago",
+        }
@@ -0,0 +1,112 @@
+import asyncio
+import os
+import sys
+from unittest.mock import AsyncMock, patch
+
+# Add parent directory to path to import bot modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from telegram import Update, User
+from telegram.ext import Application, ExtBot, TypeHandler
+
+import bot_enhanced
+from concurrency import ChatOrderedApplication, chat_key
+
+
+def message_update(update_id, chat_id, delay):
+    update = Update.de_json({
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id, "date": 0, "text": str(delay),
+            "chat": {"id": chat_id, "type": "private"},
+        },
+    }, None)
+    return update
+
+
+def build(max_in_flight):
+    return (
+        Application.builder()
+        .token("1:test")
+        .application_class(ChatOrderedApplication, {"max_in_flight": max_in_flight})
+        .build()
+    )
+
+
+async def initialize(application):
+    """Initialize without calling getMe on the real Bot API."""
+    bot_user = User(1, "TestBot", True, username="test_bot")
+    with patch.object(ExtBot, "get_me", AsyncMock(return_value=bot_user)):
+        await application.initialize()
+
+
+class TestChatOrderedApplication:
+    """Tests for per-chat ordered concurrent processing."""
+
+    def test_chats_run_in_parallel_but_stay_ordered(self):
+        """A slow chat does not block others, and each chat keeps its order."""
+        application = build(max_in_flight=10)
+        events = []
+
+        async def handler(update, context):
+            events.append(("start", update.update_id))
+            await asyncio.sleep(float(update.message.text))
+            events.append(("end", update.update_id))
+
+        application.add_handler(TypeHandler(Update, handler))
+
+        async def run():
+            await initialize(application)
+            # chat 1: slow then fast; chat 2: fast
+            for update in (message_update(1, 1, 0.05), message_update(2, 1, 0), message_update(3, 2, 0)):
+                await application.process_update(update)
+            await application.wait_idle()
+
+        asyncio.run(run())
+        finished = [uid for kind, uid in events if kind == "end"]
+        assert finished.index(3) < finished.index(1)  # chat 2 overtook the slow chat 1
+        assert finished.index(1) < finished.index(2)  # chat 1 stayed in order
+        assert events.index(("end", 1)) < events.index(("start", 2))
+
+    def test_in_flight_bound_applies_backpressure(self):
+        """process_update blocks once max_in_flight updates are outstanding."""
+        application = build(max_in_flight=2)
+        release = asyncio.Event()
+
+        async def handler(update, context):
+            await release.wait()
+
+        application.add_handler(TypeHandler(Update, handler))
+
+        async def run():
+            await initialize(application)
+            await application.process_update(message_update(1, 1, 0))
+            await application.process_update(message_update(2, 2, 0))
+            third = asyncio.ensure_future(application.process_update(message_update(3, 3, 0)))
+            await asyncio.sleep(0.01)
+            blocked = not third.done()
+            in_flight = application.in_flight
+            release.set()
+            await third
+            await application.wait_idle()
+            return blocked, in_flight, application.in_flight, application.active_lanes
+
+        blocked, in_flight, after, lanes = asyncio.run(run())
+        assert blocked
+        assert in_flight == 2
+        assert after == 0
+        assert lanes == 0
+
+    def test_chat_key_falls_back_to_user(self):
+        """Updates without a chat are ordered per user."""
+        update = Update.de_json({
+            "update_id": 1,
+            "inline_query": {"id": "1", "query": "tor", "offset": "",
+                             "from": {"id": 9, "is_bot": False, "first_name": "A"}},
+        }, None)
+        assert chat_key(update) == ("user", 9)
+
+    def test_build_application_concurrency_switch(self):
+        """UPDATE_CONCURRENCY selects the ordered concurrent application."""
+        assert isinstance(bot_enhanced.build_application("1:x", concurrency=8), ChatOrderedApplication)
+        assert not isinstance(bot_enhanced.build_application("1:x", concurrency=0), ChatOrderedApplication)
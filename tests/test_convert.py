@@ -0,0 +1,83 @@
+import os
+import sys
+from datetime import datetime
+
+# Add parent directory to path to import bot modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytz
+
+import bot_enhanced
+from convert import AMBIGUOUS, NONEXISTENT, localize, parse_request, parse_time
+
+TORONTO = pytz.timezone("America/Toronto")
+SPRING_FORWARD = 1_710_072_000  # 2024-03-10 12:00 UTC
+FALL_BACK = 1_730_635_200  # 2024-11-03 12:00 UTC
+
+
+class TestParsing:
+    def test_time_formats(self):
+        """12- and 24-hour times, noon and midnight are understood"""
+        assert parse_time("3pm Toronto") == (15, 0, "Toronto")
+        assert parse_time("3:30 p.m. Toronto") == (15, 30, "Toronto")
+        assert parse_time("12am x") == (0, 0, "x")
+        assert parse_time("15:05 x") == (15, 5, "x")
+        assert parse_time("noon") == (12, 0, "")
+        assert parse_time("midnight x")[:2] == (0, 0)
+
+    def test_invalid_times(self):
+        """Out-of-range and missing times are rejected"""
+        for text in ("13pm Toronto", "25:00 Toronto", "3 Toronto", "Toronto"):
+            assert parse_time(text) is None
+
+    def test_request(self):
+        """A request splits into time, source and optional target"""
+        assert parse_request("3pm Toronto to Vancouver") == (15, 0, "Toronto", "Vancouver")
+        assert parse_request("3pm new york in la") == (15, 0, "new york", "la")
+        assert parse_request("9:15 am Toronto") == (9, 15, "Toronto", None)
+        assert parse_request("3pm") is None
+
+
+class TestLocalize:
+    def test_ambiguous_time_uses_first_occurrence(self):
+        """A fall-back wall time resolves to the earlier, daylight instant"""
+        instant, note = localize(TORONTO, datetime(2024, 11, 3, 1, 30))
+        assert note == AMBIGUOUS
+        assert instant.tzname() == "EDT"
+
+    def test_nonexistent_time_moves_past_the_gap(self):
+        """A spring-forward wall time is moved forward by the gap"""
+        instant, note = localize(TORONTO, datetime(2024, 3, 10, 2, 30))
+        assert note == NONEXISTENT
+        assert (instant.hour, instant.minute, instant.tzname()) == (3, 30, "EDT")
+
+    def test_regular_time(self):
+        """Ordinary wall times are localized without a note"""
+        instant, note = localize(TORONTO, datetime(2024, 1, 10, 15, 0))
+        assert note is None and instant.utcoffset().total_seconds() == -5 * 3600
+
+
+class TestConvertCommand:
+    def test_city_to_city(self):
+        """Converting between two cities reports the target's time and date change"""
+        (reply,) = bot_enhanced.convert_time("11:30 pm vancouver to toronto", now=FALL_BACK)
+        assert reply == "🔁 **11:30 PM** in **Vancouver** is **02:30 AM** in **Toronto** (Mon Nov 04)"
+
+    def test_dst_note(self):
+        """A skipped wall time is explained alongside the answer"""
+        (reply,) = bot_enhanced.convert_time("2:30am toronto to vancouver", now=SPRING_FORWARD)
+        assert "**03:30 AM** in **Toronto**" in reply
+        assert "skipped in Toronto" in reply
+
+    def test_every_city(self):
+        """Without a target, every catalogue city is listed under its local time"""
+        text = "\n".join(bot_enhanced.convert_time("3pm toronto", now=FALL_BACK))
+        assert "🕐 **12:00 PM** (UTC−08:00)" in text
+        assert "🕐 **04:30 PM** (UTC−03:30)" in text
+        for city in bot_enhanced.CITY_TIMEZONES:
+            assert city in text
+
+    def test_unknown_city(self):
+        """Unknown cities get an error instead of a conversion"""
+        (reply,) = bot_enhanced.convert_time("3pm toronto to zq_xv")
+        assert reply.startswith("❌") and "zq\\_xv" in reply
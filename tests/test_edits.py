@@ -0,0 +1,127 @@
+import asyncio
+import os
+import sys
+from types import SimpleNamespace
+
+# Add parent directory to path to import bot modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+from telegram.error import BadRequest
+
+from edits import EditCoalescer, message_key
+
+
+def sender(sent):
+    async def send(markup):
+        sent.append(markup)
+
+    return send
+
+
+class TestMessageKey:
+    def test_chat_message(self):
+        """Regular messages are keyed by chat and message id"""
+        query = SimpleNamespace(inline_message_id=None, message=SimpleNamespace(chat_id=5, message_id=9))
+        assert message_key(query) == (5, 9)
+
+    def test_inline_message(self):
+        """Inline messages are keyed by their inline message id"""
+        assert message_key(SimpleNamespace(inline_message_id="abc", message=None)) == "abc"
+
+
+class TestEditCoalescer:
+    def test_identical_edit_skipped(self):
+        """An edit that would send the markup already on screen is skipped"""
+        async def scenario():
+            edits = EditCoalescer(window=0)
+            sent = []
+            edits.remember((1, 1), "page0")
+            await edits.edit((1, 1), "page0", sender(sent))
+            await edits.edit((1, 1), "page1", sender(sent))
+            await edits.edit((1, 1), "page1", sender(sent))
+            return edits, sent
+
+        edits, sent = asyncio.run(scenario())
+        assert sent == ["page1"]
+        assert (edits.sent, edits.skipped) == (1, 2)
+
+    def test_burst_coalesced(self):
+        """A burst of edits within the window sends only the final state"""
+        async def scenario():
+            edits = EditCoalescer(window=0.05)
+            sent = []
+            for page in ("page1", "page2", "page3"):
+                await edits.edit((1, 1), page, sender(sent))
+            assert sent == []
+            await edits.drain()
+            return edits, sent
+
+        edits, sent = asyncio.run(scenario())
+        assert sent == ["page3"]
+        assert edits.coalesced == 2
+
+    def test_burst_back_to_start_sends_nothing(self):
+        """Next then Prev within the window leaves the message untouched"""
+        async def scenario():
+            edits = EditCoalescer(window=0.05)
+            sent = []
+            edits.remember((1, 1), "page0")
+            await edits.edit((1, 1), "page1", sender(sent))
+            await edits.edit((1, 1), "page0", sender(sent))
+            await edits.drain()
+            return sent
+
+        assert asyncio.run(scenario()) == []
+
+    def test_messages_independent(self):
+        """Different messages are never coalesced together"""
+        async def scenario():
+            edits = EditCoalescer(window=0.05)
+            sent = []
+            await edits.edit((1, 1), "a", sender(sent))
+            await edits.edit((2, 1), "b", sender(sent))
+            await edits.drain()
+            return sorted(sent)
+
+        assert asyncio.run(scenario()) == ["a", "b"]
+
+    def test_not_modified_remembered(self):
+        """A "message is not modified" rejection still records the markup"""
+        async def scenario():
+            edits = EditCoalescer(window=0)
+
+            async def rejected(markup):
+                raise BadRequest("Message is not modified: specified new message content is the same")
+
+            await edits.edit((1, 1), "page1", rejected)
+            sent = []
+            await edits.edit((1, 1), "page1", sender(sent))
+            return sent
+
+        assert asyncio.run(scenario()) == []
+
+    def test_other_errors_raise_and_forget(self):
+        """Other failures propagate and the message state is forgotten"""
+        async def scenario():
+            edits = EditCoalescer(window=0)
+            edits.remember((1, 1), "page0")
+
+            async def broken(markup):
+                raise BadRequest("Message to edit not found")
+
+            with pytest.raises(BadRequest):
+                await edits.edit((1, 1), "page1", broken)
+            sent = []
+            await edits.edit((1, 1), "page0", sender(sent))
+            return sent
+
+        assert asyncio.run(scenario()) == ["page0"]
+
+    def test_lru_bound(self):
+        """Only the most recent max_messages messages are tracked"""
+        edits = EditCoalescer(max_messages=2)
+        for key in range(3):
+            edits.remember(key, "m")
+        assert 0 not in edits._rendered
+        assert 2 in edits._rendered
@@ -0,0 +1,134 @@
+import asyncio
+import os
+import sqlite3
+import sys
+from unittest.mock import AsyncMock, Mock
+
+# Add parent directory to path to import bot modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import bot_enhanced
+from favorites import FavoritesStore, UserCities
+
+
+class TestUserCities:
+    def test_shortlist(self):
+        """Favorites come first, then recent cities not already listed"""
+        cities = UserCities(["Toronto"], ["Ottawa", "Toronto", "Regina"])
+        assert cities.shortlist(3) == ["Toronto", "Ottawa", "Regina"]
+        assert cities.shortlist(2) == ["Toronto", "Ottawa"]
+
+    def test_empty_is_falsy(self):
+        """Users without cities have nothing to show"""
+        assert not UserCities()
+
+
+class TestFavoritesStore:
+    def test_recent_cities(self):
+        """Recent cities are newest first, deduplicated and capped"""
+        async def scenario():
+            store = FavoritesStore("", max_recent=3)
+            for city in ("A", "B", "A", "C", "D"):
+                await store.record_use(1, city)
+            return await store.load(1)
+
+        assert asyncio.run(scenario()).recent == ["D", "C", "A"]
+
+    def test_toggle_favorite(self):
+        """Toggling adds and then removes a favorite"""
+        async def scenario():
+            store = FavoritesStore("")
+            added = await store.toggle_favorite(1, "Toronto")
+            removed = await store.toggle_favorite(1, "Toronto")
+            return added, removed, (await store.load(1)).favorites
+
+        assert asyncio.run(scenario()) == (True, False, [])
+
+    def test_write_behind_persists(self, tmp_path):
+        """Changes reach SQLite on flush and survive a restart"""
+        path = str(tmp_path / "favorites.db")
+
+        async def write():
+            store = FavoritesStore(path, flush_interval=60)
+            await store.start()
+            await store.toggle_favorite(42, "Toronto")
+            await store.record_use(42, "Ottawa")
+            pending = store.pending_writes
+            await store.stop()
+            return pending
+
+        async def read():
+            store = FavoritesStore(path)
+            await store.start()
+            try:
+                return await store.load(42)
+            finally:
+                await store.stop()
+
+        assert asyncio.run(write()) == 1
+        cities = asyncio.run(read())
+        assert (cities.favorites, cities.recent) == (["Toronto"], ["Ottawa"])
+        with sqlite3.connect(path) as db:
+            assert db.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+
+    def test_lru_evicts_without_losing_writes(self, tmp_path):
+        """Evicted users are reloaded from pending writes or disk"""
+        async def scenario():
+            store = FavoritesStore(str(tmp_path / "favorites.db"), capacity=2, flush_interval=60)
+            await store.start()
+            try:
+                for user_id in range(5):
+                    await store.toggle_favorite(user_id, f"City {user_id}")
+                assert len(store._cache) == 2
+                before_flush = (await store.load(0)).favorites
+                await store.flush()
+                for user_id in range(2, 5):
+                    await store.load(user_id)
+                after_flush = (await store.load(1)).favorites
+                return before_flush, after_flush, store.writes
+            finally:
+                await store.stop()
+
+        assert asyncio.run(scenario()) == (["City 0"], ["City 1"], 5)
+
+    def test_unopenable_database_falls_back_to_memory(self, tmp_path):
+        """A database that cannot be created leaves the store working in memory"""
+        async def scenario():
+            store = FavoritesStore(str(tmp_path / "missing" / "favorites.db"))
+            await store.start()
+            try:
+                await store.toggle_favorite(42, "Toronto")
+                return (await store.load(42)).favorites, store.cached(7)
+            finally:
+                await store.stop()
+
+        assert asyncio.run(scenario()) == (["Toronto"], True)
+
+
+class TestFavoritesMenu:
+    def press(self, data, user_id=7):
+        query = Mock(data=data, inline_message_id=None)
+        query.from_user = Mock(id=user_id, username="u")
+        query.message = Mock(chat_id=user_id, message_id=1)
+        query.message.reply_text = AsyncMock()
+        query.answer = AsyncMock()
+        query.edit_message_reply_markup = AsyncMock()
+        asyncio.run(bot_enhanced.button_handler(Mock(callback_query=query), None))
+        return query
+
+    def test_first_page_shows_recent_and_favorites(self, monkeypatch):
+        """Used and starred cities become the user's first menu page"""
+        monkeypatch.setattr(bot_enhanced, "FAVORITES", FavoritesStore(""))
+        monkeypatch.setattr(bot_enhanced.EDITS, "window", 0)
+        assert asyncio.run(bot_enhanced.first_page(7)) is bot_enhanced.build_keyboard(0)
+
+        query = self.press(bot_enhanced.city_data("city", "Toronto"))
+        reply_markup = query.message.reply_text.call_args.kwargs["reply_markup"]
+        assert reply_markup.inline_keyboard[0][0].callback_data == bot_enhanced.city_data("fav", "Toronto")
+
+        query = self.press(bot_enhanced.city_data("fav", "Ottawa"))
+        markup = query.edit_message_reply_markup.call_args.kwargs["reply_markup"]
+        assert markup.inline_keyboard[0][0].text == "★ Remove from favorites"
+
+        labels = [row[0].text for row in asyncio.run(bot_enhanced.first_page(7)).inline_keyboard]
+        assert labels[:2] == ["⭐ Ottawa", "🕘 Toronto"]
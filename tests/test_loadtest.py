@@ -0,0 +1,118 @@
+import asyncio
+import itertools
+import os
+import sys
+import time
+
+# Add parent and loadtest directories to path to import the harness
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "loadtest"))
+
+import bot_enhanced
+from fake_bot_api import DEFAULT_TOKEN, FakeBotAPI
+from httpd import HTTPServer
+from load_generator import LatencyRecorder, percentile, synthetic_stream
+
+
+async def drive(updates, listener=None, **api_options):
+    """Run the real Application against the fake API until every update is answered."""
+    api = FakeBotAPI(**api_options)
+    recorder = LatencyRecorder()
+    api.listeners.append(recorder.on_response)
+    if listener is not None:
+        api.listeners.append(listener)
+    server = HTTPServer("127.0.0.1", 0)
+    api.mount(server)
+    await server.start()
+
+    application = bot_enhanced.build_application(
+        DEFAULT_TOKEN, base_url=f"http://127.0.0.1:{server.port}/bot"
+    )
+    stop = asyncio.Event()
+    bot = asyncio.create_task(bot_enhanced.serve(application, webhook_url=None, stop_event=stop))
+    try:
+        for update in updates:
+            update["update_id"] = api.next_update_id()
+            api.enqueue_update(update)
+            recorder.injected_update(update, 0.0)
+        async with asyncio.timeout(10):
+            while recorder.outstanding:
+                await asyncio.sleep(0.02)
+    finally:
+        stop.set()
+        await bot
+        await server.stop()
+    return api, recorder
+
+
+class TestLoadHarness:
+    """End-to-end tests running the bot against the fake Bot API."""
+
+    def test_bot_answers_synthetic_updates(self):
+        """Commands and button presses all get a response from the real Application."""
+        updates = list(itertools.islice(synthetic_stream(chats=5, start_ratio=0.3), 20))
+        api, recorder = asyncio.run(drive(updates))
+        assert len(recorder.latencies) == 20
+        assert api.calls["getMe"] == 1
+        assert api.calls["answerCallbackQuery"] + api.calls["sendMessage"] >= 20
+
+    def test_inline_queries_and_text_edits_are_answered(self):
+        """Recorded streams with inline queries and live-clock edits replay against the fake API."""
+        user = {"id": 9, "is_bot": False, "first_name": "Load"}
+        updates = [{"inline_query": {"id": "iq1", "from": user, "query": "tor", "offset": ""}}]
+        api, recorder = asyncio.run(drive(updates))
+        assert len(recorder.latencies) == 1
+        assert api.calls["answerInlineQuery"] == 1
+
+        edit = asyncio.run(api.dispatch("editMessageText", {"chat_id": 9, "message_id": 4, "text": "12:00"}))
+        assert edit.status == 200
+        assert b'"message_id": 4' in edit.body
+
+    def test_warm_up_finishes_before_intake(self, monkeypatch):
+        """No update is answered while warm-up is still rebuilding caches on its thread."""
+        finished = []
+
+        def slow_warm_up():
+            time.sleep(0.3)
+            finished.append(time.perf_counter())
+            return {}
+
+        monkeypatch.setattr(bot_enhanced, "WARM_UP", True)
+        monkeypatch.setattr(bot_enhanced, "warm_up", slow_warm_up)
+        answered = []
+        updates = list(itertools.islice(synthetic_stream(chats=3, start_ratio=1.0), 3))
+        api, recorder = asyncio.run(drive(updates, listener=lambda method, params, at: method == "sendMessage" and answered.append(at)))
+        assert finished and answered and min(answered) > finished[0]
+
+    def test_busy_chat_does_not_delay_other_chats(self):
+        """A chat held back by per-chat pacing does not hold up replies to another chat."""
+        def start(chat_id):
+            user = {"id": chat_id, "is_bot": False, "first_name": "Load"}
+            return {"message": {
+                "message_id": 1, "date": int(time.time()), "chat": {"id": chat_id, "type": "private"},
+                "from": user, "text": "/start", "entities": [{"type": "bot_command", "offset": 0, "length": 6}],
+            }}
+
+        replies = []
+
+        def listener(method, params, at):
+            if method == "sendMessage":
+                replies.append((int(params["chat_id"]), at))
+
+        api, recorder = asyncio.run(drive([start(1) for _ in range(6)] + [start(2)], listener=listener))
+        busy = [at for chat_id, at in replies if chat_id == 1]
+        other = [at for chat_id, at in replies if chat_id == 2]
+        assert len(busy) == 6 and len(other) == 1
+        assert other[0] < busy[-1] - 1
+
+    def test_rate_limit_injection(self):
+        """The fake API can answer a share of calls with 429."""
+        api = FakeBotAPI(rate_limit_ratio=1.0)
+        response = asyncio.run(api.dispatch("sendMessage", {"chat_id": 1, "text": "hi"}))
+        assert response.status == 429
+        assert b'"retry_after": 1' in response.body
+
+    def test_percentile(self):
+        assert percentile([5, 1, 3, 2, 4], 50) == 3
+        assert percentile(list(range(1, 101)), 99) == 99
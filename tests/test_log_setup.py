@@ -0,0 +1,81 @@
+import json
+import logging
+import os
+import sys
+
+import pytest
+
+# Add parent directory to path to import bot modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import log_setup
+from log_setup import JsonFormatter, SamplingFilter, parse_sample_rates, setup_logging
+
+
+def make_record(level=logging.INFO, event=None, msg="pressed %s", args=("page:1",)):
+    record = logging.LogRecord("bot", level, __file__, 1, msg, args, None)
+    if event is not None:
+        record.event = event
+    return record
+
+
+@pytest.fixture
+def restore_logging():
+    """Reinstate the bot's logging configuration after a test replaces it."""
+    root = logging.getLogger()
+    level = root.level
+    yield
+    log_setup.shutdown_logging()
+    setup_logging(level=logging.getLevelName(level), log_file=None)
+
+
+class TestSamplingFilter:
+    """Tests for per-event log sampling."""
+
+    def test_keeps_one_in_n(self):
+        """Only every Nth tagged INFO record passes."""
+        sampler = SamplingFilter({"button_press": 4})
+        kept = [sampler.filter(make_record(event="button_press")) for _ in range(12)]
+        assert kept.count(True) == 3
+
+    def test_untagged_and_warnings_always_pass(self):
+        """Sampling never drops untagged records or warnings."""
+        sampler = SamplingFilter({"button_press": 1000})
+        assert all(sampler.filter(make_record()) for _ in range(5))
+        assert all(
+            sampler.filter(make_record(logging.WARNING, event="button_press")) for _ in range(5)
+        )
+
+    def test_parse_sample_rates(self):
+        """Rate specs ignore malformed entries."""
+        assert parse_sample_rates("button_press=10, start=2,bad=x,") == {"button_press": 10, "start": 2}
+        assert parse_sample_rates("") == {}
+
+
+class TestJsonFormatter:
+    """Tests for structured JSON output."""
+
+    def test_includes_message_and_extras(self):
+        """The JSON line carries the interpolated message and extra fields."""
+        line = JsonFormatter().format(make_record(event="button_press"))
+        payload = json.loads(line)
+        assert payload["msg"] == "pressed page:1"
+        assert payload["event"] == "button_press"
+        assert payload["level"] == "INFO"
+
+
+class TestQueuedLogging:
+    """Tests for the queue-backed handler chain."""
+
+    def test_records_reach_rotating_file(self, tmp_path, restore_logging):
+        """Records are written by the listener thread and the file rotates."""
+        log_file = tmp_path / "bot.log"
+        setup_logging(log_file=str(log_file), max_bytes=200, backup_count=2, json_format=True)
+        logger = logging.getLogger("test_log_setup")
+        for i in range(20):
+            logger.info("line %d", i)
+        log_setup.shutdown_logging()
+
+        lines = log_file.read_text(encoding="utf-8").splitlines()
+        assert json.loads(lines[-1])["msg"] == "line 19"
+        assert (tmp_path / "bot.log.1").exists()
@@ -0,0 +1,105 @@
+import asyncio
+import os
+import sys
+from unittest.mock import patch
+
+# Add parent directory to path to import bot modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from telegram import Update
+from telegram.request import HTTPXRequest
+
+from bot_enhanced import update_type
+from helpers import http_request
+from httpd import HTTPServer
+from metrics import (
+    API_LATENCY,
+    HANDLER_LATENCY,
+    InstrumentedRequest,
+    Registry,
+    add_metrics_route,
+    timed,
+)
+
+
+class TestExposition:
+    """Tests for Prometheus text rendering."""
+
+    def test_histogram_buckets_are_cumulative(self):
+        """Bucket counts accumulate and +Inf equals _count."""
+        registry = Registry()
+        histogram = registry.histogram("latency_seconds", "Latency.", ("handler",), buckets=(0.1, 1.0))
+        for value in (0.05, 0.1, 0.5, 3.0):
+            histogram.observe(value, "start")
+        text = registry.render()
+        assert 'latency_seconds_bucket{handler="start",le="0.1"} 2' in text
+        assert 'latency_seconds_bucket{handler="start",le="1.0"} 3' in text
+        assert 'latency_seconds_bucket{handler="start",le="+Inf"} 4' in text
+        assert 'latency_seconds_count{handler="start"} 4' in text
+        assert 'latency_seconds_sum{handler="start"} 3.65' in text
+
+    def test_counters_and_callbacks(self):
+        """Counters and scrape-time callbacks render with HELP/TYPE lines."""
+        registry = Registry()
+        registry.counter("errors_total", "Errors.", ("error",)).inc("BadRequest")
+        registry.gauge_callback("queue_depth", "Depth.", lambda: 7)
+        text = registry.render()
+        assert "# TYPE errors_total counter" in text
+        assert 'errors_total{error="BadRequest"} 1' in text
+        assert "# TYPE queue_depth gauge" in text
+        assert "queue_depth 7" in text
+
+    def test_metrics_route(self):
+        """GET /metrics serves the registry in text format."""
+        registry = Registry()
+        registry.gauge_callback("answer", "The answer.", lambda: 42)
+
+        async def run():
+            server = HTTPServer("127.0.0.1", 0)
+            add_metrics_route(server, registry)
+            await server.start()
+            try:
+                return await http_request(server.port, "GET", "/metrics")
+            finally:
+                await server.stop()
+
+        status, headers, body = asyncio.run(run())
+        assert status == 200
+        assert headers["content-type"].startswith("text/plain; version=0.0.4")
+        assert b"answer 42" in body
+
+
+class TestInstrumentation:
+    """Tests for handler and outbound API timing."""
+
+    def test_timed_handler_records_latency(self):
+        """Wrapped handlers observe their duration under their name."""
+        async def sample_handler(update, context):
+            return "done"
+
+        before = HANDLER_LATENCY.count("sample_handler")
+        assert asyncio.run(timed(sample_handler)(None, None)) == "done"
+        assert HANDLER_LATENCY.count("sample_handler") == before + 1
+
+    def test_api_calls_are_timed_per_method(self):
+        """Outbound requests are labelled with the Bot API method."""
+        async def fake_do_request(self, url, method, request_data=None, **kwargs):
+            return 200, b'{"ok": true}'
+
+        before = API_LATENCY.count("sendMessage")
+        with patch.object(HTTPXRequest, "do_request", fake_do_request):
+            request = InstrumentedRequest()
+            result = asyncio.run(request.do_request("https://api.telegram.org/bot1:x/sendMessage", "POST"))
+        assert result == (200, b'{"ok": true}')
+        assert API_LATENCY.count("sendMessage") == before + 1
+
+    def test_update_type(self):
+        """Updates are classified by their payload field."""
+        update = Update.de_json(
+            {"update_id": 1, "callback_query": {
+                "id": "1", "chat_instance": "c", "data": "page:1",
+                "from": {"id": 1, "is_bot": False, "first_name": "A"},
+            }},
+            None,
+        )
+        assert update_type(update) == "callback_query"
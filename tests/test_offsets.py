@@ -0,0 +1,211 @@
+import asyncio
+import json
+import os
+import sys
+import time
+from unittest.mock import AsyncMock, patch
+
+# Add parent directory to path to import bot modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from telegram import Update, User
+from telegram.ext import Application, ExtBot, TypeHandler
+
+from concurrency import ChatOrderedApplication
+from offsets import OffsetStore, TrackedApplication, UpdateTracker, stop_within
+
+
+def message_update(update_id, chat_id=1, date=0, text="0"):
+    return Update.de_json({
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id, "date": date, "text": text,
+            "chat": {"id": chat_id, "type": "private"},
+        },
+    }, None)
+
+
+def build(application_class, **kwargs):
+    return Application.builder().token("1:test").application_class(application_class, kwargs).build()
+
+
+async def initialize(application):
+    """Initialize without calling getMe on the real Bot API."""
+    bot_user = User(1, "TestBot", True, username="test_bot")
+    with patch.object(ExtBot, "get_me", AsyncMock(return_value=bot_user)):
+        await application.initialize()
+
+
+class TestUpdateTracker:
+    """Tests for the resume offset watermark."""
+
+    def test_offset_waits_for_the_oldest_unfinished_update(self):
+        """Updates finishing out of order do not move the offset past an unfinished one"""
+        tracker = UpdateTracker()
+        assert tracker.offset is None
+        first, second, third = (message_update(i) for i in (5, 6, 7))
+        for update in (first, second, third):
+            assert tracker.accept(update)
+        tracker.done(third)
+        tracker.done(second)
+        assert tracker.offset == 5 and tracker.pending == 1
+        tracker.done(first)
+        assert tracker.offset == 8 and tracker.pending == 0
+
+    def test_updates_below_the_floor_are_duplicates(self):
+        """Updates a previous instance already handled are skipped"""
+        tracker = UpdateTracker()
+        tracker.floor = 10
+        assert tracker.offset == 10
+        assert not tracker.accept(message_update(9))
+        assert tracker.accept(message_update(10))
+        assert tracker.duplicates == 1
+
+    def test_stale_messages_are_dropped_but_counted_as_handled(self):
+        """With max_age set, old messages are skipped and the offset moves past them"""
+        tracker = UpdateTracker(max_age=60, clock=lambda: 1_000)
+        assert not tracker.accept(message_update(1, date=900))
+        assert tracker.accept(message_update(2, date=990))
+        assert tracker.stale == 1
+        assert tracker.offset == 2
+
+
+class TestOffsetStore:
+    """Tests for the offset file."""
+
+    def test_round_trip(self, tmp_path):
+        """A saved offset loads back, and the file is replaced atomically"""
+        store = OffsetStore(str(tmp_path / "offset.json"))
+        assert store.load() is None
+        store.save(42)
+        store.save(43)
+        assert store.load() == 43
+        assert os.listdir(tmp_path) == ["offset.json"]
+
+    def test_unreadable_or_expired_offsets_are_ignored(self, tmp_path):
+        """A corrupt file or an offset older than the lifetime gives no offset"""
+        path = tmp_path / "offset.json"
+        store = OffsetStore(str(path), lifetime=60)
+        path.write_text("{not json")
+        assert store.load() is None
+        store.save(42)
+        assert store.load(now=time.time() + 120) is None
+        assert json.loads(path.read_text())["offset"] == 42
+
+    def test_no_path_disables_persistence(self):
+        """An empty path neither loads nor writes"""
+        store = OffsetStore("")
+        store.save(1)
+        assert store.load() is None
+        assert store.writable()
+
+    def test_unwritable_location_is_reported(self, tmp_path):
+        """writable() is False when save() could not create the file"""
+        assert OffsetStore(str(tmp_path / "offset.json")).writable()
+        assert not OffsetStore(str(tmp_path / "missing" / "offset.json")).writable()
+
+
+class TestDrain:
+    """Tests for tracked applications and the shutdown deadline."""
+
+    def test_applications_report_finished_updates(self):
+        """Sequential and chat-ordered applications both feed the tracker"""
+        for application_class, kwargs in ((TrackedApplication, {}), (ChatOrderedApplication, {"max_in_flight": 4})):
+            tracker = UpdateTracker()
+            tracker.floor = 2
+            application = build(application_class, tracker=tracker, **kwargs)
+            handled = []
+
+            async def handler(update, context):
+                handled.append(update.update_id)
+
+            application.add_handler(TypeHandler(Update, handler))
+
+            async def run():
+                await initialize(application)
+                for update_id in (1, 2, 3):
+                    await application.process_update(message_update(update_id, chat_id=update_id))
+                if hasattr(application, "wait_idle"):
+                    await application.wait_idle()
+
+            asyncio.run(run())
+            assert sorted(handled) == [2, 3], application_class
+            assert tracker.offset == 4 and tracker.duplicates == 1
+
+    def test_stop_within_gives_up_at_the_deadline(self):
+        """A handler that outlives the deadline leaves its update unfinished"""
+        tracker = UpdateTracker()
+        application = build(ChatOrderedApplication, tracker=tracker, max_in_flight=4)
+
+        async def handler(update, context):
+            await asyncio.sleep(float(update.message.text))
+
+        application.add_handler(TypeHandler(Update, handler))
+
+        async def run():
+            await initialize(application)
+            await application.start()
+            await application.update_queue.put(message_update(1, chat_id=1, text="0"))
+            await application.update_queue.put(message_update(2, chat_id=2, text="5"))
+            await asyncio.sleep(0.05)
+            started = time.monotonic()
+            finished = await stop_within(application, 0.2)
+            return finished, time.monotonic() - started
+
+        finished, took = asyncio.run(run())
+        assert not finished
+        assert took < 1
+        assert tracker.offset == 2 and tracker.pending == 1
+
+    def test_sequential_stop_within_stops_handling_at_the_deadline(self):
+        """Past the deadline the running handler is cancelled and queued updates are not handled"""
+        tracker = UpdateTracker()
+        application = build(TrackedApplication, tracker=tracker)
+        started, cancelled = [], []
+
+        async def handler(update, context):
+            started.append(update.update_id)
+            try:
+                await asyncio.sleep(5)
+            except asyncio.CancelledError:
+                cancelled.append(update.update_id)
+                raise
+
+        application.add_handler(TypeHandler(Update, handler))
+
+        async def run():
+            await initialize(application)
+            await application.start()
+            for update_id in (1, 2, 3):
+                await application.update_queue.put(message_update(update_id))
+            await asyncio.sleep(0.05)
+            finished = await stop_within(application, 0.2)
+            await asyncio.sleep(0.1)  # let the fetcher reach the queued updates
+            return finished
+
+        assert not asyncio.run(run())
+        assert started == [1] and cancelled == [1]
+        assert tracker.offset == 1 and tracker.pending == 1
+
+    def test_stop_drains_queued_updates_behind_the_in_flight_bound(self):
+        """Lanes opened while stop() empties the queue are waited for too"""
+        tracker = UpdateTracker()
+        application = build(ChatOrderedApplication, tracker=tracker, max_in_flight=1)
+        handled = []
+
+        async def handler(update, context):
+            await asyncio.sleep(0.01)
+            handled.append(update.update_id)
+
+        application.add_handler(TypeHandler(Update, handler))
+
+        async def run():
+            await initialize(application)
+            await application.start()
+            for update_id in range(1, 6):
+                await application.update_queue.put(message_update(update_id, chat_id=update_id))
+            return await stop_within(application, 2)
+
+        assert asyncio.run(run())
+        assert sorted(handled) == [1, 2, 3, 4, 5]
+        assert tracker.pending == 0 and tracker.offset == 6
@@ -0,0 +1,162 @@
+import asyncio
+import os
+import sys
+
+# Add parent directory to path to import bot modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+from telegram.error import RetryAfter
+
+from outbound import OutboundScheduler, Priority, TokenBucket
+
+
+def recorder(calls):
+    async def call(label):
+        calls.append((label, asyncio.get_running_loop().time()))
+        return label
+
+    return call
+
+
+class TestTokenBucket:
+    def test_burst_then_rate(self):
+        """A full bucket allows a burst, then one token per 1/rate seconds"""
+        bucket = TokenBucket(rate=2, burst=2, now=0.0)
+        bucket.take(0.0)
+        bucket.take(0.0)
+        assert bucket.delay(0.0) == pytest.approx(0.5)
+        assert bucket.delay(0.5) == 0.0
+
+    def test_pause(self):
+        """A paused bucket hands out nothing until the pause ends"""
+        bucket = TokenBucket(rate=100, burst=5, now=0.0)
+        bucket.pause(3.0)
+        assert bucket.delay(1.0) == pytest.approx(2.0)
+        assert bucket.delay(3.0) == 0.0
+
+
+class TestOutboundScheduler:
+    def test_send_without_start_calls_directly(self):
+        """send() falls back to a direct call when the scheduler is not running"""
+        async def scenario():
+            scheduler = OutboundScheduler()
+            calls = []
+            assert await scheduler.send(Priority.REPLY, 1, recorder(calls), "direct") == "direct"
+            assert scheduler.depth == 0
+            return calls
+
+        assert [label for label, _ in asyncio.run(scenario())] == ["direct"]
+
+    def test_priority_order(self):
+        """Queued calls go out answers first, then replies, then edits"""
+        async def scenario():
+            scheduler = OutboundScheduler(max_concurrency=1)
+            calls = []
+            call = recorder(calls)
+            futures = [
+                scheduler.submit(Priority.EDIT, 1, call, "edit"),
+                scheduler.submit(Priority.REPLY, 2, call, "reply"),
+                scheduler.submit(Priority.ANSWER, 3, call, "answer"),
+            ]
+            assert scheduler.depth == 3
+            assert scheduler.depth_by_priority()[("edit",)] == 1
+            scheduler.start()
+            await asyncio.gather(*futures)
+            await scheduler.stop()
+            return calls
+
+        assert [label for label, _ in asyncio.run(scenario())] == ["answer", "reply", "edit"]
+
+    def test_chat_rate_spaces_calls(self):
+        """Calls to one chat beyond its burst are spaced by the chat rate"""
+        async def scenario():
+            scheduler = OutboundScheduler(chat_rate=20, chat_burst=1)
+            calls = []
+            call = recorder(calls)
+            scheduler.start()
+            await asyncio.gather(*(scheduler.send(Priority.REPLY, 7, call, i) for i in range(3)))
+            await scheduler.stop()
+            return calls
+
+        times = [at for _, at in asyncio.run(scenario())]
+        assert times[2] - times[0] >= 0.09
+
+    def test_other_chats_not_held_back(self):
+        """One chat's bucket does not delay another chat"""
+        async def scenario():
+            scheduler = OutboundScheduler(chat_rate=1, chat_burst=1)
+            call = recorder([])
+            scheduler.start()
+            await scheduler.send(Priority.REPLY, 1, call, "first")
+            loop = asyncio.get_running_loop()
+            started = loop.time()
+            await scheduler.send(Priority.REPLY, 2, call, "second")
+            elapsed = loop.time() - started
+            await scheduler.stop()
+            return elapsed
+
+        assert asyncio.run(scenario()) < 0.5
+
+    def test_retry_after_is_retried(self):
+        """A 429 is retried after retry_after instead of failing the caller"""
+        async def scenario():
+            scheduler = OutboundScheduler()
+            attempts = []
+
+            async def flaky():
+                attempts.append(asyncio.get_running_loop().time())
+                if len(attempts) == 1:
+                    raise RetryAfter(0)
+                return "sent"
+
+            scheduler.start()
+            result = await scheduler.send(Priority.REPLY, 1, flaky)
+            await scheduler.stop()
+            return result, scheduler.retries, len(attempts)
+
+        assert asyncio.run(scenario()) == ("sent", 1, 2)
+
+    def test_retries_give_up(self):
+        """After max_retries the RetryAfter reaches the caller"""
+        async def scenario():
+            scheduler = OutboundScheduler(max_retries=1)
+
+            async def always_limited():
+                raise RetryAfter(0)
+
+            scheduler.start()
+            try:
+                with pytest.raises(RetryAfter):
+                    await scheduler.send(Priority.REPLY, None, always_limited)
+            finally:
+                await scheduler.stop()
+
+        asyncio.run(scenario())
+
+    def test_stop_fails_leftovers(self):
+        """Calls still queued when stop() times out fail with RuntimeError"""
+        async def scenario():
+            scheduler = OutboundScheduler(chat_rate=0.01, chat_burst=1)
+            call = recorder([])
+            scheduler.start()
+            await scheduler.send(Priority.REPLY, 1, call, "first")
+            pending = scheduler.submit(Priority.REPLY, 1, call, "second")
+            await scheduler.stop(timeout=0.05)
+            with pytest.raises(RuntimeError):
+                await pending
+
+        asyncio.run(scenario())
+
+    def test_send_after_stop_is_refused(self):
+        """A stopped scheduler refuses calls instead of sending them unpaced"""
+        async def scenario():
+            calls = []
+            scheduler = OutboundScheduler()
+            scheduler.start()
+            await scheduler.stop()
+            with pytest.raises(RuntimeError):
+                await scheduler.send(Priority.REPLY, 1, recorder(calls), "late")
+            return calls
+
+        assert asyncio.run(scenario()) == []
@@ -0,0 +1,146 @@
+import asyncio
+import logging
+import os
+import sys
+from unittest.mock import AsyncMock, Mock
+
+# Add parent directory to path to import bot modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+import bot_enhanced
+import callbacks
+from overload import OverloadGuard
+
+
+class Signals:
+    lag = 0.0
+    work = 0
+
+
+def guard(**kwargs):
+    signals = Signals()
+    changes = []
+    options = dict(lag_threshold=0.5, work_threshold=100, trip_after=2, recover_after=10)
+    options.update(kwargs)
+    overload = OverloadGuard(
+        lambda: signals.lag, lambda: signals.work,
+        on_change=lambda degraded, reason: changes.append((degraded, reason)), **options,
+    )
+    return overload, signals, changes
+
+
+class TestOverloadGuard:
+    """Tests for switching in and out of degraded mode."""
+
+    def test_trips_on_sustained_lag_not_a_spike(self):
+        """One slow check is tolerated; consecutive ones degrade"""
+        overload, signals, changes = guard()
+        signals.lag = 0.8
+        assert not overload.check(now=0)
+        signals.lag = 0.0
+        assert not overload.check(now=1)
+        signals.lag = 0.8
+        overload.check(now=2)
+        assert overload.check(now=3)
+        assert changes == [(True, "event-loop lag 800 ms")]
+
+    def test_trips_on_outstanding_work(self):
+        """Too many queued or running updates degrade too"""
+        overload, signals, _ = guard(trip_after=1)
+        signals.work = 150
+        assert overload.check(now=0)
+        assert overload.reason == "150 updates outstanding"
+
+    def test_recovers_after_staying_calm(self):
+        """Load must stay below half the thresholds for recover_after seconds"""
+        overload, signals, changes = guard(trip_after=1)
+        signals.work = 150
+        overload.check(now=0)
+        signals.work = 70  # under the threshold but above half of it
+        assert overload.check(now=30)
+        signals.work = 10
+        assert overload.check(now=31)
+        signals.work = 60
+        assert overload.check(now=35)  # a relapse restarts the calm period
+        signals.work = 10
+        overload.check(now=36)
+        assert overload.check(now=45)
+        assert not overload.check(now=46)
+        assert changes[-1] == (False, "back to normal after 46 s")
+        assert overload.transitions == {"degraded": 1, "normal": 1}
+
+    def test_zero_thresholds_disable(self):
+        """With both thresholds at 0 the guard never degrades or starts"""
+        overload, signals, _ = guard(lag_threshold=0, work_threshold=0, trip_after=1)
+        signals.lag, signals.work = 10.0, 10_000
+        assert not overload.enabled
+        assert not overload.check(now=0)
+
+    def test_stop_leaves_degraded_mode(self):
+        """Stopping the checks restores normal mode"""
+        overload, signals, changes = guard(trip_after=1, interval=0.01)
+        signals.work = 150
+
+        async def run():
+            overload.start()
+            await asyncio.sleep(0.05)
+            degraded = overload.degraded
+            await overload.stop()
+            return degraded
+
+        assert asyncio.run(run())
+        assert not overload.degraded and changes[-1] == (False, "checks stopped")
+
+
+@pytest.fixture
+def degraded(monkeypatch):
+    """Put the bot's guard in degraded mode for one test."""
+    monkeypatch.setattr(bot_enhanced.EDITS, "window", 0)
+    bot_enhanced.LOAD._switch(True, "test", 0)
+    yield bot_enhanced.LOAD
+    bot_enhanced.LOAD._switch(False, "test over", 0)
+
+
+class TestDegradedBot:
+    """Tests for what the bot sheds while degraded."""
+
+    def press(self, data):
+        query = Mock(data=data, inline_message_id=None)
+        query.from_user = Mock(id=7, username="u")
+        query.message = Mock(chat_id=7, message_id=1)
+        query.message.reply_text = AsyncMock()
+        query.answer = AsyncMock()
+        query.edit_message_reply_markup = AsyncMock()
+        asyncio.run(bot_enhanced.button_handler(Mock(callback_query=query), None))
+        return query
+
+    def test_expensive_commands_get_a_busy_reply(self, degraded):
+        """/board answers busy at once instead of rendering"""
+        update = Mock()
+        update.effective_chat = Mock(id=1)
+        update.message.reply_text = AsyncMock()
+        command = bot_enhanced.unless_overloaded(bot_enhanced.board_command)
+        asyncio.run(command(update, Mock(args=[])))
+        update.message.reply_text.assert_called_once_with(bot_enhanced.BUSY_TEXT)
+
+    def test_buttons_are_served_from_cache_only(self, degraded, monkeypatch):
+        """A cached page is shown; an unrendered one is refused with a busy toast"""
+        monkeypatch.setattr(bot_enhanced, "PAGE_CACHE_SIZE", 1024)
+        bot_enhanced.build_keyboard(0)
+        cached = self.press(callbacks.page_data(0))
+        assert cached.edit_message_reply_markup.call_args.kwargs["reply_markup"] is bot_enhanced.build_keyboard(0)
+
+        bot_enhanced._page_cache.pop(1, None)
+        refused = self.press(callbacks.page_data(1))
+        assert refused.answer.call_args.args == (bot_enhanced.BUSY_TEXT,)
+        refused.edit_message_reply_markup.assert_not_called()
+        assert not bot_enhanced.page_is_cached(1)
+
+    def test_info_logging_is_suppressed(self, degraded):
+        """Per-update INFO lines are dropped until load recovers"""
+        assert not bot_enhanced.logger.isEnabledFor(logging.INFO)
+        bot_enhanced.LOAD._switch(False, "recovered", 0)
+        assert bot_enhanced.logger.level == logging.NOTSET
+        bot_enhanced.LOAD._switch(True, "test", 0)
@@ -0,0 +1,202 @@
+import asyncio
+import os
+import pstats
+import sys
+import time
+import types
+from unittest.mock import AsyncMock, Mock
+
+# Add parent directory to path to import bot modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+import bot_enhanced
+from metrics import timed
+from outbound import OutboundScheduler, Priority
+from profiling import TRACER, Profiler, Tracer
+
+
+@pytest.fixture
+def tracing():
+    """Trace every update through the shared tracer, switching it off afterwards."""
+    TRACER.set_rate(1)
+    TRACER.recent.clear()
+    yield TRACER
+    TRACER.set_rate(0)
+
+
+def helpers():
+    module = types.SimpleNamespace()
+
+    def lookup(city):
+        return city.upper()
+
+    async def fetch(city):
+        return module.lookup(city)
+
+    module.lookup, module.fetch = lookup, fetch
+    return module
+
+
+class TestTracer:
+    """Tests for sampled per-update traces."""
+
+    def test_wrappers_exist_only_while_tracing(self):
+        """Instrumented functions are the originals whenever tracing is off"""
+        module = helpers()
+        original = module.lookup
+        tracer = Tracer()
+        tracer.instrument(module, ("lookup",))
+        assert module.lookup is original
+        tracer.set_rate(3)
+        assert module.lookup is not original and module.lookup("a") == "A"
+        tracer.set_rate(0)
+        assert module.lookup is original
+
+    def test_spans_cover_helpers_and_api_calls(self):
+        """A traced handler records instrumented calls and API round trips in order"""
+        module = helpers()
+        tracer = Tracer(rate=1)
+        tracer.instrument(module, ("lookup", "fetch"), "city.")
+
+        async def handler(city):
+            started = time.perf_counter()
+            tracer.record("sendMessage", started, started + 0.002)
+            return await module.fetch(city)
+
+        assert asyncio.run(tracer.run("handler", handler, "oslo")) == "OSLO"
+        (trace,) = tracer.recent
+        assert [span[0] for span in trace.spans] == ["sendMessage", "city.lookup", "city.fetch"]
+        assert trace.duration >= trace.spans[-1][2]
+        assert str(trace).startswith("handler ")
+
+    def test_one_update_in_rate_is_traced(self):
+        """The sample rate picks every Nth update"""
+        tracer = Tracer(rate=3)
+
+        async def handler():
+            return None
+
+        async def run():
+            for _ in range(9):
+                await tracer.run("handler", handler)
+
+        asyncio.run(run())
+        assert tracer.traced == 3
+
+    def test_outbound_calls_join_the_callers_trace(self, tracing):
+        """Calls the scheduler makes for a traced handler land in its trace"""
+        scheduler = OutboundScheduler()
+
+        async def send_message():
+            started = time.perf_counter()
+            TRACER.record("sendMessage", started, time.perf_counter())
+
+        async def handler():
+            await scheduler.send(Priority.REPLY, 1, send_message)
+
+        async def run():
+            scheduler.start()
+            try:
+                await timed(handler)()
+            finally:
+                await scheduler.stop()
+
+        asyncio.run(run())
+        assert [span[0] for span in TRACER.recent[-1].spans] == ["sendMessage"]
+
+
+class TestProfiler:
+    """Tests for time-boxed captures."""
+
+    @pytest.mark.parametrize("kind", ["cpu", "sample"])
+    def test_capture_is_written(self, tmp_path, kind):
+        """A capture writes its file and reports a summary"""
+        profiler = Profiler(str(tmp_path))
+        done = []
+
+        async def on_done(path, summary):
+            done.append((path, summary))
+
+        async def busy():
+            deadline = time.monotonic() + 0.3
+            while time.monotonic() < deadline:
+                sum(range(1000))
+                await asyncio.sleep(0)
+
+        async def run():
+            task = profiler.start(kind, 0.2, on_done)
+            with pytest.raises(RuntimeError):
+                profiler.start(kind, 0.2)
+            await busy()
+            await task
+
+        asyncio.run(run())
+        (path, summary), = done
+        assert os.path.dirname(path) == str(tmp_path) and os.path.getsize(path) > 0
+        assert profiler.captures == 1 and not profiler.running
+        if kind == "cpu":
+            assert pstats.Stats(path).total_calls > 0
+        else:
+            assert "samples" in summary.splitlines()[0]
+
+    def test_stop_cuts_a_capture_short(self, tmp_path):
+        """Stopping ends a long capture promptly and still writes it"""
+        profiler = Profiler(str(tmp_path))
+
+        async def run():
+            task = profiler.start("sample", 60)
+            await asyncio.sleep(0.05)
+            started = time.monotonic()
+            await profiler.stop()
+            return task.result(), time.monotonic() - started
+
+        path, took = asyncio.run(run())
+        assert os.path.exists(path)
+        assert took < 1
+
+
+class TestProfileCommand:
+    """Tests for the admin-only /profile command."""
+
+    def command(self, user_id, *args):
+        update = Mock()
+        update.effective_user = Mock(id=user_id)
+        update.effective_chat = Mock(id=user_id)
+        update.message.reply_text = AsyncMock()
+        asyncio.run(bot_enhanced.profile_command(update, Mock(args=list(args))))
+        return update.message.reply_text
+
+    def test_non_admins_are_ignored(self, monkeypatch):
+        """Only ADMIN_IDS may change tracing"""
+        monkeypatch.setattr(bot_enhanced, "ADMIN_IDS", {1})
+        reply = self.command(2, "trace", "1")
+        reply.assert_not_called()
+        assert TRACER.rate == 0
+
+    def test_admin_toggles_tracing(self, monkeypatch):
+        """/profile trace N switches sampling on and 0 switches it off"""
+        monkeypatch.setattr(bot_enhanced, "ADMIN_IDS", {1})
+        original = bot_enhanced.get_local_time
+        try:
+            self.command(1, "trace", "5")
+            assert TRACER.rate == 5 and bot_enhanced.get_local_time is not original
+        finally:
+            self.command(1, "trace", "0")
+        assert TRACER.rate == 0 and bot_enhanced.get_local_time is original
+
+    def test_bad_arguments_show_usage(self, monkeypatch):
+        """A malformed request answers with the usage text"""
+        monkeypatch.setattr(bot_enhanced, "ADMIN_IDS", {1})
+        reply = self.command(1, "trace", "lots")
+        assert reply.call_args.args[0] == bot_enhanced.PROFILE_USAGE
+
+    def test_handlers_are_traced(self, tracing):
+        """A traced /time lists the helpers it called"""
+        update = Mock()
+        update.effective_chat = Mock(id=1)
+        update.message.reply_text = AsyncMock()
+        asyncio.run(timed(bot_enhanced.time_command)(update, Mock(args=["toronto"])))
+        spans = [span[0] for span in TRACER.recent[-1].spans]
+        assert "resolve_city" in spans and "get_local_time" in spans
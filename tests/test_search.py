@@ -0,0 +1,166 @@
+import asyncio
+import os
+import sys
+from unittest.mock import AsyncMock, Mock
+
+# Add parent directory to path to import bot modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import bot_enhanced
+from search import AliasTable, CityIndex, normalize, trigrams
+
+CITIES = ["New York", "Newark", "Toronto", "Montréal", "St. John's", "San Jose", "San Diego", "York"]
+
+
+class TestNormalize:
+    def test_accents_and_punctuation(self):
+        """Accents, case and punctuation are folded away"""
+        assert normalize("  Montréal, QC ") == "montreal qc"
+        assert normalize("St. John’s") == normalize("St. John's") == "st johns"
+
+    def test_letters_without_a_decomposition(self):
+        """Latin letters NFKD keeps whole are transliterated and other scripts are kept"""
+        assert normalize("Łódź") == "lodz"
+        assert normalize("Tromsø") == "tromso"
+        assert normalize("Þórshöfn") == "thorshofn"
+        assert normalize("Москва") == "москва"
+
+    def test_trigrams_are_word_padded(self):
+        """Trigrams are taken per word with space padding"""
+        assert trigrams("ab cd") == {" ab", "ab ", " cd", "cd "}
+
+
+class TestCityIndex:
+    def test_prefix(self):
+        """Whole-name prefixes match"""
+        assert CityIndex(CITIES).search("tor") == ("Toronto",)
+
+    def test_word_prefix(self):
+        """Prefixes of later words match too, ranked after name prefixes"""
+        assert CityIndex(CITIES).search("york") == ("York", "New York")
+
+    def test_ranking(self):
+        """Exact names rank before longer names sharing the prefix"""
+        assert CityIndex(CITIES).search("new")[:2] == ("New York", "Newark")
+
+    def test_accent_insensitive(self):
+        """Queries match regardless of accents and punctuation"""
+        index = CityIndex(CITIES)
+        assert index.search("montreal") == ("Montréal",)
+        assert index.search("st johns") == ("St. John's",)
+
+    def test_typo_falls_back_to_trigrams(self):
+        """Misspelled queries are answered by trigram similarity"""
+        assert CityIndex(CITIES).search("torotno") == ("Toronto",)
+
+    def test_no_match(self):
+        """Unrelated queries return nothing"""
+        assert CityIndex(CITIES).search("zzzz") == ()
+
+    def test_empty_query_lists_catalogue(self):
+        """An empty query returns the first cities of the catalogue"""
+        assert CityIndex(CITIES, limit=3).search("") == ("New York", "Newark", "Toronto")
+
+    def test_limit(self):
+        """At most `limit` results are returned"""
+        names = [f"City {i}" for i in range(100)]
+        assert len(CityIndex(names, limit=5).search("city")) == 5
+
+    def test_results_are_cached(self):
+        """Repeated queries are served from the LRU"""
+        index = CityIndex(CITIES, cache_size=1)
+        first = index.search("toro")
+        assert index.search("TORO") is first
+        index.search("newa")
+        assert "toro" not in index._cache
+
+
+class TestInlineQuery:
+    def test_search_follows_catalogue(self, restore_catalogue):
+        """The index is rebuilt when the catalogue changes"""
+        assert bot_enhanced.search_cities("zebra") == ()
+        bot_enhanced.register_cities({"Zebraville": "America/Toronto"})
+        assert bot_enhanced.search_cities("zebra") == ("Zebraville",)
+
+    def test_inline_query_answers_with_times(self):
+        """Inline queries are answered with one article per matching city"""
+        query = Mock(query="vanc")
+        query.answer = AsyncMock()
+        asyncio.run(bot_enhanced.inline_query(Mock(inline_query=query), None))
+        results = query.answer.call_args.args[0]
+        assert [result.title for result in results] == ["🕐 Vancouver"]
+        assert "Vancouver" in results[0].input_message_content.message_text
+        assert query.answer.call_args.kwargs["cache_time"] == bot_enhanced.INLINE_CACHE_TIME
+
+
+class TestAliasTable:
+    NAMES = ["Lévis", "Trois-Rivières", "St. John's", "Quebec City", "Greater Sudbury",
+             "Washington DC", "New York", "Fort Worth", "Ajax"]
+
+    def test_accents_and_punctuation(self):
+        """Typed names resolve regardless of accents, hyphens and apostrophes"""
+        table = AliasTable(self.NAMES)
+        assert table.resolve("levis") == "Lévis"
+        assert table.resolve("trois rivieres") == "Trois-Rivières"
+        assert table.resolve("St. John’s") == "St. John's"
+        assert table.resolve("st johns") == "St. John's"
+
+    def test_abbreviations(self):
+        """Common abbreviations are expanded both ways"""
+        table = AliasTable(self.NAMES)
+        assert table.resolve("saint johns") == "St. John's"
+        assert table.resolve("ft worth") == "Fort Worth"
+
+    def test_optional_words_and_nicknames(self):
+        """Qualifiers may be dropped and well-known nicknames resolve"""
+        table = AliasTable(self.NAMES)
+        assert table.resolve("quebec") == "Quebec City"
+        assert table.resolve("sudbury") == "Greater Sudbury"
+        assert table.resolve("NYC") == "New York"
+        assert table.resolve("dc") == "Washington DC"
+
+    def test_nicknames_only_for_known_cities(self):
+        """Nicknames for cities outside the catalogue are not added"""
+        assert AliasTable(["Toronto"]).resolve("la") is None
+
+    def test_typos(self):
+        """Close misspellings fall back to fuzzy matching"""
+        table = AliasTable(self.NAMES)
+        assert table.resolve("trois riveres") == "Trois-Rivières"
+        assert table.resolve("new yrok") == "New York"
+
+    def test_unknown(self):
+        """Unrelated or empty input resolves to None"""
+        table = AliasTable(self.NAMES)
+        assert table.resolve("atlantis") is None
+        assert table.resolve("  ") is None
+
+    def test_names_outside_ascii(self):
+        """Non-Latin names resolve and a name without letters does not break the table"""
+        table = AliasTable(["Москва", "Łódź", "?!"])
+        assert table.resolve("москва") == "Москва"
+        assert table.resolve("Lodz") == "Łódź"
+        assert table.resolve("?!") is None
+
+
+class TestTimeCommand:
+    def run_command(self, *args):
+        update = Mock()
+        update.message.reply_text = AsyncMock()
+        asyncio.run(bot_enhanced.time_command(update, Mock(args=list(args))))
+        return update.message.reply_text.call_args.args[0]
+
+    def test_resolves_typed_name(self):
+        """/time answers with the local time of the resolved city"""
+        reply = self.run_command("trois", "rivieres")
+        assert reply.startswith("🕐 **Trois-Rivières**")
+
+    def test_unknown_city_suggests(self):
+        """Unknown names get an error, with user input escaped"""
+        reply = self.run_command("zq_xv")
+        assert reply.startswith("❌")
+        assert "zq\\_xv" in reply
+
+    def test_usage(self):
+        """/time without a city explains its usage"""
+        assert self.run_command().startswith("ℹ️ Usage")
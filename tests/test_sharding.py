@@ -0,0 +1,132 @@
+import asyncio
+import collections
+import itertools
+import os
+import socket
+import sys
+
+# Add parent and loadtest directories to path to import the harness
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "loadtest"))
+
+from telegram import Update
+
+import bot_enhanced
+from fake_bot_api import DEFAULT_TOKEN, FakeBotAPI
+from httpd import HTTPServer
+from load_generator import LatencyRecorder, synthetic_stream
+from sharding import HashRing, WorkerPool, encode_frame, read_frame, worker_path
+
+
+def exit_at_once(index, sock):
+    """Worker target that dies immediately, to exercise supervision."""
+
+
+def message_update(update_id, chat_id):
+    return Update.de_json({
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id, "date": 0, "text": "/start",
+            "chat": {"id": chat_id, "type": "private"},
+        },
+    }, None)
+
+
+class TestHashRing:
+    def test_stable_and_spread(self):
+        """A key always maps to the same node and every node gets keys"""
+        ring = HashRing(range(4))
+        owners = collections.Counter(ring.node_for(chat_id) for chat_id in range(4000))
+        assert set(owners) == {0, 1, 2, 3}
+        assert min(owners.values()) > 600
+        assert all(ring.node_for(chat_id) == ring.node_for(chat_id) for chat_id in range(100))
+
+    def test_adding_a_node_moves_few_keys(self):
+        """Growing from 4 to 5 nodes remaps roughly a fifth of the keys"""
+        before, after = HashRing(range(4)), HashRing(range(5))
+        moved = sum(before.node_for(key) != after.node_for(key) for key in range(10000))
+        assert moved < 3000
+
+    def test_workers_log_to_their_own_file(self, monkeypatch):
+        """Inside a worker the log path gains the worker index; elsewhere it is unchanged"""
+        import multiprocessing
+
+        assert worker_path("bot.log") == "bot.log"
+        monkeypatch.setattr(multiprocessing.current_process(), "name", "bot-worker-3")
+        assert worker_path("logs/bot.log") == os.path.join("logs", "bot.worker-3.log")
+        assert worker_path("") == ""
+
+
+class TestFraming:
+    def test_round_trip(self):
+        """Updates survive encoding over a socket"""
+        async def scenario():
+            left, right = socket.socketpair()
+            _, writer = await asyncio.open_connection(sock=left)
+            reader, other = await asyncio.open_connection(sock=right)
+            writer.write(encode_frame(message_update(7, 42)))
+            await writer.drain()
+            writer.close()
+            first = await read_frame(reader)
+            second = await read_frame(reader)
+            other.close()
+            return first, second
+
+        first, second = asyncio.run(scenario())
+        assert first["update_id"] == 7
+        assert first["message"]["chat"]["id"] == 42
+        assert second is None
+
+
+class TestWorkerPool:
+    def test_dead_workers_are_restarted(self):
+        """The supervisor restarts workers that exit"""
+        async def scenario():
+            pool = WorkerPool(1, exit_at_once, check_interval=0.05)
+            await pool.start()
+            try:
+                async with asyncio.timeout(10):
+                    while pool.restarts < 1:
+                        await asyncio.sleep(0.05)
+            finally:
+                await pool.stop()
+            return pool
+
+        assert asyncio.run(scenario()).restarts >= 1
+
+    def test_sharded_bot_answers_every_update(self, monkeypatch):
+        """An intake with two workers answers every update against the fake API"""
+        async def scenario():
+            api = FakeBotAPI()
+            recorder = LatencyRecorder()
+            api.listeners.append(recorder.on_response)
+            server = HTTPServer("127.0.0.1", 0)
+            api.mount(server)
+            await server.start()
+            base_url = f"http://127.0.0.1:{server.port}/bot"
+            # Workers are fresh processes and read their settings from the environment.
+            monkeypatch.setenv("BOT_TOKEN", DEFAULT_TOKEN)
+            monkeypatch.setenv("BOT_API_BASE_URL", base_url)
+            monkeypatch.setenv("LOG_FILE", "")
+
+            application = bot_enhanced.build_intake(DEFAULT_TOKEN, base_url=base_url, workers=2)
+            stop = asyncio.Event()
+            bot = asyncio.create_task(bot_enhanced.serve(application, webhook_url=None, stop_event=stop))
+            try:
+                for update in itertools.islice(synthetic_stream(chats=10, start_ratio=0.3), 30):
+                    update["update_id"] = api.next_update_id()
+                    api.enqueue_update(update)
+                    recorder.injected_update(update, 0.0)
+                async with asyncio.timeout(30):
+                    while recorder.outstanding:
+                        await asyncio.sleep(0.05)
+                assert application.pool.alive == 2
+                assert application.pool.forwarded == 30
+            finally:
+                stop.set()
+                await bot
+                await server.stop()
+            return recorder
+
+        assert len(asyncio.run(scenario()).latencies) == 30
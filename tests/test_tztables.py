@@ -0,0 +1,92 @@
+import os
+import sys
+import zoneinfo
+from datetime import datetime
+
+# Add parent directory to path to import bot modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+import pytz
+
+import bot_enhanced
+from tztables import ZoneTable, ZoneTables, parse_years
+
+ZONES = sorted(set(bot_enhanced.CITY_TIMEZONES.values()) | {"UTC", "Asia/Kolkata", "Australia/Lord_Howe"})
+SAMPLES = range(0, 2_145_916_800, 86_400 * 7 + 3_607)  # weekly-ish, 1970 to 2038
+# The system zoneinfo may come from a newer tzdata release than pytz's bundled
+# copy, whose future rules can differ (e.g. after a province drops DST), so
+# the zoneinfo cross-check stops at settled history.
+SETTLED = 1_735_689_600  # 2025-01-01
+
+
+def probes(table: ZoneTable):
+    """Instants either side of every transition plus a regular sweep."""
+    for instant in table.transitions[1:]:
+        yield from (instant - 1, instant, instant + 1)
+    yield from SAMPLES
+
+
+class TestZoneTable:
+    @pytest.mark.parametrize("zone", ZONES)
+    def test_matches_pytz(self, zone):
+        """Offsets and local times agree with pytz at and around every transition"""
+        table = ZoneTable(zone)
+        tz = pytz.timezone(zone)
+        for instant in probes(table):
+            expected = datetime.fromtimestamp(instant, tz)
+            local = table.localtime(instant)
+            assert local.utcoffset() == expected.utcoffset(), (zone, instant)
+            assert local.replace(tzinfo=None) == expected.replace(tzinfo=None)
+            assert local.tzname() == expected.tzname()
+
+    @pytest.mark.parametrize("zone", ZONES)
+    def test_matches_zoneinfo(self, zone):
+        """Offsets agree with the system zoneinfo database up to 2025"""
+        table = ZoneTable(zone)
+        tz = zoneinfo.ZoneInfo(zone)
+        for instant in probes(table):
+            if instant >= SETTLED:
+                continue
+            expected = datetime.fromtimestamp(instant, tz).utcoffset().total_seconds()
+            assert table.utcoffset(instant) == expected, (zone, instant)
+
+    def test_next_change(self):
+        """The next change is the next instant the offset differs"""
+        table = ZoneTable("America/Toronto")
+        instant, before, after = table.next_change(1_730_000_000)  # late October 2024
+        assert datetime.fromtimestamp(instant, pytz.utc) == datetime(2024, 11, 3, 6, tzinfo=pytz.utc)
+        assert (before.tzname(None), after.tzname(None)) == ("EDT", "EST")
+
+    def test_no_change_without_dst(self):
+        """Zones that do not observe DST have no next change"""
+        assert ZoneTable("America/Regina").next_change(1_730_000_000) is None
+        assert ZoneTable("UTC").next_change(0) is None
+
+    def test_range_is_configurable(self):
+        """Only transitions inside the year range are stored; outside it pytz answers"""
+        table = ZoneTable("America/Toronto", 2020, 2021)
+        assert len(table) == 5  # the offset in force on Jan 1 2020 plus four changes
+        assert not table.covers(1_700_000_000)
+        assert table.utcoffset(1_700_000_000) == -5 * 3600
+
+
+class TestZoneTables:
+    def test_tables_are_shared(self):
+        """Each zone's table is built once"""
+        tables = ZoneTables()
+        assert tables.get("America/Toronto") is tables.get("America/Toronto")
+        assert tables.build(["America/Toronto", "America/Vancouver"]) > 0 and len(tables) == 2
+
+    def test_parse_years(self):
+        """Year ranges parse, single years included"""
+        assert parse_years("1970-2037") == (1970, 2037)
+        assert parse_years("2024") == (2024, 2024)
+        with pytest.raises(ValueError):
+            parse_years("2030-2020")
+
+    def test_time_command_mentions_next_change(self):
+        """The clock change line names both abbreviations"""
+        assert bot_enhanced.clock_change("America/Toronto", 1_730_000_000) == (
+            "🔁 Clocks change Sun, Nov 03 at 02:00 AM (EDT → EST)"
+        )
@@ -0,0 +1,155 @@
+import asyncio
+import os
+import sys
+
+# Add parent directory to path to import bot modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from telegram.error import BadRequest, Forbidden
+
+from watch import WatchScheduler
+
+
+def scheduler(sent, rendered=None, fail=None, **kwargs):
+    """A WatchScheduler that records renders and sends; fail maps chat_id -> exception."""
+    def render(zone, now):
+        if rendered is not None:
+            rendered.append(zone)
+        return f"time in {zone}"
+
+    async def send(watcher, text):
+        if fail and watcher.chat_id in fail:
+            raise fail[watcher.chat_id]
+        sent.append((watcher.chat_id, watcher.message_id, text))
+
+    return WatchScheduler(render, lambda city, text: f"{city}: {text}", send, **kwargs)
+
+
+async def tick(watches, now=0):
+    queued = watches.tick(now)
+    await asyncio.sleep(0)
+    await asyncio.gather(*watches._sending)
+    return queued
+
+
+class TestWatchScheduler:
+    def test_each_zone_rendered_once_per_tick(self):
+        """Watchers sharing a zone cost one render per tick"""
+        async def scenario():
+            sent, rendered = [], []
+            watches = scheduler(sent, rendered)
+            for chat in range(50):
+                watches.add(chat, 1, "Toronto", "America/Toronto", now=0)
+            watches.add(99, 1, "Vancouver", "America/Vancouver", now=0)
+            assert await tick(watches) == 51
+            return watches, sent, rendered
+
+        watches, sent, rendered = asyncio.run(scenario())
+        assert sorted(rendered) == ["America/Toronto", "America/Vancouver"]
+        assert len(sent) == 51 and (0, 1, "Toronto: time in America/Toronto") in sent
+        assert (len(watches), watches.zones, watches.edits) == (51, 2, 51)
+
+    def test_per_chat_limit(self):
+        """A chat cannot run more than max_per_chat clocks"""
+        watches = scheduler([], max_per_chat=2)
+        assert watches.add(1, 1, "Toronto", "America/Toronto")
+        assert watches.add(1, 2, "Toronto", "America/Toronto")
+        assert not watches.add(1, 3, "Toronto", "America/Toronto")
+        assert watches.remove(1, 1)
+        assert watches.add(1, 3, "Toronto", "America/Toronto")
+
+    def test_remove(self):
+        """Removed watchers are no longer edited and empty zones disappear"""
+        async def scenario():
+            sent = []
+            watches = scheduler(sent)
+            watches.add(1, 1, "Toronto", "America/Toronto", now=0)
+            assert watches.remove(1, 1)
+            assert not watches.remove(1, 1)
+            await tick(watches)
+            return watches, sent
+
+        watches, sent = asyncio.run(scenario())
+        assert sent == [] and watches.zones == 0
+
+    def test_expired_watchers_dropped(self):
+        """Watchers stop being edited after their lifetime"""
+        async def scenario():
+            sent = []
+            watches = scheduler(sent, lifetime=120)
+            watches.add(1, 1, "Toronto", "America/Toronto", now=0)
+            await tick(watches, now=60)
+            await tick(watches, now=120)
+            return watches, sent
+
+        watches, sent = asyncio.run(scenario())
+        assert len(sent) == 1 and len(watches) == 0
+
+    def test_deleted_message_drops_watcher(self):
+        """A failed edit on a deleted message or blocked chat removes the watcher"""
+        async def scenario():
+            sent = []
+            fail = {
+                1: BadRequest("Message to edit not found"),
+                2: Forbidden("bot was blocked by the user"),
+                3: BadRequest("Message is not modified"),
+            }
+            watches = scheduler(sent, fail=fail)
+            for chat in (1, 2, 3, 4):
+                watches.add(chat, 1, "Toronto", "America/Toronto", now=0)
+            await tick(watches)
+            return watches, sent
+
+        watches, sent = asyncio.run(scenario())
+        assert watches.dropped == 2
+        assert len(watches) == 2 and sent == [(4, 1, "Toronto: time in America/Toronto")]
+
+    def test_slow_edit_skips_tick(self):
+        """A watcher whose last edit is still queued is not queued again"""
+        async def scenario():
+            release = asyncio.Event()
+            sent = []
+
+            async def send(watcher, text):
+                await release.wait()
+                sent.append(text)
+
+            watches = WatchScheduler(lambda zone, now: zone, lambda city, text: text, send)
+            watches.add(1, 1, "Toronto", "America/Toronto", now=0)
+            assert watches.tick(0) == 1
+            await asyncio.sleep(0)
+            assert watches.tick(60) == 0
+            release.set()
+            await asyncio.gather(*watches._sending)
+            return watches, sent
+
+        watches, sent = asyncio.run(scenario())
+        assert watches.skipped == 1 and len(sent) == 1
+
+    def test_early_wake_renders_the_new_minute(self):
+        """A timer that fires just before the minute turns over still renders that minute"""
+        readings = iter([119.9, 119.99, 120.0])
+
+        def clock():
+            return next(readings, 120.0)
+
+        async def scenario():
+            rendered = []
+            ticked = asyncio.Event()
+
+            def render(zone, now):
+                rendered.append(now)
+                ticked.set()
+                return "12:02"
+
+            async def send(watcher, text):
+                pass
+
+            watches = WatchScheduler(render, lambda city, text: text, send, clock=clock)
+            watches.add(1, 1, "Toronto", "America/Toronto", now=0)
+            watches.start()
+            await asyncio.wait_for(ticked.wait(), 5)
+            await watches.stop()
+            return rendered
+
+        assert asyncio.run(scenario()) == [120]
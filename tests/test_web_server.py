@@ -0,0 +1,133 @@
+import asyncio
+import gzip
+import json
+import os
+import sys
+import time
+
+# Add parent directory to path to import bot modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import startup
+from health import BotHealth, add_health_routes
+from helpers import http_request
+from web_server import build_status_server
+
+
+async def fetch(server, path, headers=None):
+    await server.start()
+    try:
+        return await http_request(server.port, "GET", path, headers=headers)
+    finally:
+        await server.stop()
+
+
+class TestStatusPage:
+    """Tests for the precomputed status page."""
+
+    def test_page_is_served_with_etag(self):
+        """The page carries an ETag and HTML body."""
+        status, headers, body = asyncio.run(fetch(build_status_server(0), "/"))
+        assert status == 200
+        assert headers["etag"].startswith('"')
+        assert b"Telegram Time Zone Bot" in body
+
+    def test_matching_etag_returns_304(self):
+        """Clients holding the current ETag get an empty 304."""
+        server = build_status_server(0)
+        _, headers, _ = asyncio.run(fetch(server, "/"))
+        status, _, body = asyncio.run(fetch(server, "/", {"If-None-Match": headers["etag"]}))
+        assert status == 304
+        assert body == b""
+
+    def test_gzip_is_negotiated(self):
+        """Clients accepting gzip receive the precompressed body."""
+        status, headers, body = asyncio.run(
+            fetch(build_status_server(0), "/", {"Accept-Encoding": "gzip, deflate"})
+        )
+        assert status == 200
+        assert headers["content-encoding"] == "gzip"
+        assert b"Telegram Time Zone Bot" in gzip.decompress(body)
+
+
+class TestHealthEndpoints:
+    """Tests for the live /health and /ready endpoints."""
+
+    def make_server(self, health):
+        server = build_status_server(0)
+        add_health_routes(server, health)
+        return server
+
+    def test_health_reports_dead_intake(self):
+        """/health is 503 until an intake is attached and alive."""
+        health = BotHealth()
+        status, _, body = asyncio.run(fetch(self.make_server(health), "/health"))
+        assert status == 503
+        assert json.loads(body)["intake_alive"] is False
+
+    def test_health_reports_live_state(self):
+        """/health reflects mode, update timestamps and loop lag."""
+        health = BotHealth()
+        health.attach("polling", lambda: True)
+        health.record_update()
+        status, _, body = asyncio.run(fetch(self.make_server(health), "/health"))
+        state = json.loads(body)
+        assert status == 200
+        assert state["mode"] == "polling"
+        assert state["updates_seen"] == 1
+        assert state["last_update_at"] is not None
+        assert "loop_lag_ms" in state
+
+    def test_ready_follows_startup(self):
+        """/ready is 503 until the runner marks the bot ready."""
+        health = BotHealth()
+        health.attach("webhook", lambda: True)
+        status, _, _ = asyncio.run(fetch(self.make_server(health), "/ready"))
+        assert status == 503
+        health.ready = True
+        status, _, _ = asyncio.run(fetch(self.make_server(health), "/ready"))
+        assert status == 200
+
+    def test_lag_monitor_measures_blocking(self):
+        """A blocked loop shows up as lag."""
+        health = BotHealth()
+
+        async def run():
+            health.lag_monitor.interval = 0.01
+            health.lag_monitor.start()
+            await asyncio.sleep(0.02)
+            time.sleep(0.1)
+            await asyncio.sleep(0.03)
+            await health.lag_monitor.stop()
+
+        asyncio.run(run())
+        assert health.lag_monitor.max_lag >= 0.05
+
+
+class TestColdStart:
+    """Tests for early serving and startup instrumentation."""
+
+    def test_port_serves_before_bot_runs(self, monkeypatch):
+        """The status page and /ready answer while the bot is still loading."""
+        import bot_enhanced
+        import web_server
+
+        seen = {}
+
+        async def fake_run(http_server):
+            seen["page"] = await http_request(http_server.port, "GET", "/")
+            seen["ready"] = await http_request(http_server.port, "GET", "/ready")
+
+        monkeypatch.setattr(bot_enhanced, "run", fake_run)
+        asyncio.run(web_server.run(0))
+        assert seen["page"][0] == 200
+        assert seen["ready"][0] == 503
+        assert "import" in startup.PHASES
+
+    def test_phases_are_timed(self):
+        """Phases record their duration and appear in the summary."""
+        with startup.phase("test_phase"):
+            time.sleep(0.01)
+        assert startup.PHASES["test_phase"] >= 0.01
+        assert "test_phase " in startup.summary()
+        del startup.PHASES["test_phase"]
@@ -0,0 +1,103 @@
+import asyncio
+import json
+import os
+import sys
+
+import pytest
+
+# Add parent directory to path to import bot modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from helpers import http_request
+from httpd import HTTPServer
+from webhook import WebhookReceiver, webhook_endpoint
+
+SECRET = "s3cret-token"
+UPDATE = {
+    "update_id": 42,
+    "message": {
+        "message_id": 1,
+        "date": 1736942400,
+        "chat": {"id": 7, "type": "private"},
+        "text": "/start",
+    },
+}
+
+
+class FakeApplication:
+    def __init__(self, maxsize=10):
+        self.bot = None
+        self.update_queue = asyncio.Queue(maxsize=maxsize)
+
+
+async def post_update(maxsize=10, secret=SECRET, body=None, repeat=1):
+    application = FakeApplication(maxsize)
+    receiver = WebhookReceiver(application, SECRET)
+    server = HTTPServer("127.0.0.1", 0)
+    server.route("POST", "/webhook", receiver.handle)
+    await server.start()
+    try:
+        payload = json.dumps(UPDATE).encode() if body is None else body
+        statuses = []
+        for _ in range(repeat):
+            status, _, _ = await http_request(
+                server.port, "POST", "/webhook", payload,
+                {"X-Telegram-Bot-Api-Secret-Token": secret},
+            )
+            statuses.append(status)
+    finally:
+        await server.stop()
+    return statuses, application.update_queue
+
+
+class TestWebhookReceiver:
+    """Tests for the webhook HTTP receiver."""
+
+    def test_valid_update_is_queued(self):
+        """A correctly signed update lands on the update queue."""
+        statuses, queue = asyncio.run(post_update())
+        assert statuses == [200]
+        assert queue.get_nowait().update_id == 42
+
+    def test_bad_secret_is_rejected(self):
+        """Requests without the right secret token are refused."""
+        statuses, queue = asyncio.run(post_update(secret="wrong"))
+        assert statuses == [403]
+        assert queue.empty()
+
+    def test_malformed_body_is_rejected(self):
+        """Non-JSON payloads get a 400."""
+        statuses, queue = asyncio.run(post_update(body=b"not json"))
+        assert statuses == [400]
+        assert queue.empty()
+
+    def test_full_queue_returns_503(self):
+        """Once the bounded queue is full Telegram is told to retry."""
+        statuses, queue = asyncio.run(post_update(maxsize=2, repeat=3))
+        assert statuses == [200, 200, 503]
+        assert queue.qsize() == 2
+
+    def test_unknown_path_is_404(self):
+        """Only registered routes are served."""
+        async def run():
+            server = HTTPServer("127.0.0.1", 0)
+            await server.start()
+            try:
+                return await http_request(server.port, "GET", "/nope")
+            finally:
+                await server.stop()
+
+        status, _, _ = asyncio.run(run())
+        assert status == 404
+
+
+class TestWebhookEndpoint:
+    """Tests for splitting WEBHOOK_URL into public URL and local path."""
+
+    @pytest.mark.parametrize("url, expected", [
+        ("https://bot.example.com", ("https://bot.example.com/webhook", "/webhook")),
+        ("https://bot.example.com/", ("https://bot.example.com/webhook", "/webhook")),
+        ("https://bot.example.com/tg/hook", ("https://bot.example.com/tg/hook", "/tg/hook")),
+    ])
+    def test_endpoint(self, url, expected):
+        assert webhook_endpoint(url) == expected
@@ -0,0 +1,122 @@
+"""
+Precomputed UTC offset tables.
+
+For each zone, ZoneTable holds the UTC instants at which the zone's offset
+or abbreviation changes within a year range, sorted, alongside the offset
+in force from each instant. Finding the offset for an instant is a bisect
+over a compact array instead of a trip through pytz's tzinfo machinery,
+and the same table answers "when do the clocks next change?".
+
+Tables are built from pytz's compiled transitions, so they agree with pytz
+by construction (tests check them against pytz and zoneinfo). pytz lists
+transitions up to 2037; instants outside the table's range fall back to
+pytz.
+"""
+
+import bisect
+from array import array
+from datetime import datetime, timedelta, timezone
+
+import pytz
+
+EPOCH = datetime(1970, 1, 1)
+
+
+def _epoch(naive_utc: datetime) -> int:
+    return (naive_utc - EPOCH) // timedelta(seconds=1)
+
+
+def parse_years(text: str) -> tuple:
+    """Parse a year range such as "1970-2037" into (1970, 2037)."""
+    first, _, last = text.partition("-")
+    first, last = int(first), int(last or first)
+    if first > last:
+        raise ValueError(f"empty year range: {text}")
+    return first, last
+
+
+class ZoneTable:
+    """Sorted UTC transition instants and offsets of one zone within a year range."""
+
+    __slots__ = ("zone", "start", "end", "transitions", "offsets", "tzinfos", "_tz")
+
+    def __init__(self, zone: str, first_year: int = 1970, last_year: int = 2037):
+        self.zone = zone
+        self._tz = pytz.timezone(zone)
+        self.start = _epoch(datetime(first_year, 1, 1))
+        self.end = _epoch(datetime(last_year + 1, 1, 1))
+
+        times = getattr(self._tz, "_utc_transition_times", None)
+        if times:
+            rows = [(_epoch(when), info[0], info[2]) for when, info in zip(times, self._tz._transition_info)]
+        else:  # a fixed-offset zone such as UTC
+            rows = [(self.start, self._tz.utcoffset(None), self._tz.tzname(None))]
+        # The row in force at `start`, then every change inside the range.
+        first = max(0, bisect.bisect_right([row[0] for row in rows], self.start) - 1)
+        rows = [(self.start,) + rows[first][1:]] + [row for row in rows[first + 1:] if row[0] < self.end]
+
+        interned = {}
+        self.transitions = array("q", [row[0] for row in rows])
+        self.offsets = array("i", [row[1] // timedelta(seconds=1) for row in rows])
+        self.tzinfos = tuple(
+            interned.setdefault((offset, name), timezone(offset, name)) for _, offset, name in rows
+        )
+
+    def __len__(self):
+        return len(self.transitions)
+
+    def covers(self, timestamp: float) -> bool:
+        return self.start <= timestamp < self.end
+
+    def _row(self, timestamp: float) -> int:
+        return bisect.bisect_right(self.transitions, timestamp) - 1
+
+    def utcoffset(self, timestamp: float) -> int:
+        """Offset from UTC in seconds at timestamp."""
+        if not self.covers(timestamp):
+            return datetime.fromtimestamp(timestamp, self._tz).utcoffset() // timedelta(seconds=1)
+        return self.offsets[self._row(timestamp)]
+
+    def localtime(self, timestamp: float) -> datetime:
+        """timestamp as an aware local datetime with a fixed-offset tzinfo."""
+        if not self.covers(timestamp):
+            return datetime.fromtimestamp(timestamp, self._tz)
+        return datetime.fromtimestamp(timestamp, self.tzinfos[self._row(timestamp)])
+
+    def next_change(self, timestamp: float):
+        """Return (instant, tzinfo before, tzinfo after) of the next offset change, or None."""
+        row = self._row(timestamp)
+        if row < 0:
+            return None
+        for later in range(row + 1, len(self.transitions)):
+            if self.offsets[later] != self.offsets[row]:
+                return self.transitions[later], self.tzinfos[row], self.tzinfos[later]
+        return None
+
+
+class ZoneTables:
+    """Lazily built ZoneTable per zone, all covering the same year range."""
+
+    def __init__(self, first_year: int = 1970, last_year: int = 2037):
+        self.first_year = first_year
+        self.last_year = last_year
+        self._tables = {}
+
+    def __len__(self):
+        return len(self._tables)
+
+    def get(self, zone: str) -> ZoneTable:
+        table = self._tables.get(zone)
+        if table is None:
+            table = self._tables[zone] = ZoneTable(zone, self.first_year, self.last_year)
+        return table
+
+    def build(self, zones) -> int:
+        """Build the tables of zones up front; returns the total number of rows."""
+        return sum(len(self.get(zone)) for zone in set(zones))
+
+    def localtime(self, zone: str, timestamp: float) -> datetime:
+        return self.get(zone).localtime(timestamp)
+
+    def next_change(self, zone: str, timestamp: float):
+        return self.get(zone).next_change(timestamp)
@@ -0,0 +1,175 @@
+"""
+Live clock messages for /watch.
+
+WatchScheduler keeps watchers grouped by IANA zone and wakes once per
+minute boundary. On each tick it renders every zone's time for that
+minute once (not for whatever time the tick happens to run), formats
+each watched city's text once, and hands the edits to a paced sender (the
+outbound queue), so rendering cost follows the number of distinct zones
+rather than the number of watchers. A watcher whose previous edit is still
+queued skips the tick instead of piling up behind the rate limit, and
+watchers whose message was deleted, or whose chat blocked the bot, are
+dropped on the first failed edit.
+"""
+
+import asyncio
+import logging
+import time
+
+from telegram.error import BadRequest, Forbidden
+
+logger = logging.getLogger(__name__)
+
+
+class Watcher:
+    """One live clock message."""
+
+    __slots__ = ("chat_id", "message_id", "city", "zone", "bot", "expires", "pending")
+
+    def __init__(self, chat_id, message_id, city, zone, bot, expires):
+        self.chat_id = chat_id
+        self.message_id = message_id
+        self.city = city
+        self.zone = zone
+        self.bot = bot
+        self.expires = expires
+        self.pending = None  # the edit still queued from an earlier tick
+
+
+class WatchScheduler:
+    """Minute-aligned scheduler for live clock messages, grouped by zone."""
+
+    def __init__(
+        self, render, format_text, send, lifetime: float = 3600, max_per_chat: int = 5, clock=time.time
+    ):
+        self.render = render  # (zone, timestamp) -> time text
+        self.format_text = format_text  # (city, time text) -> message text
+        self.send = send  # async (watcher, text) -> None
+        self.lifetime = lifetime
+        self.max_per_chat = max_per_chat
+        self.clock = clock
+        self.edits = 0
+        self.skipped = 0
+        self.dropped = 0
+        self._zones = {}  # zone -> {(chat_id, message_id): Watcher}
+        self._per_chat = {}  # chat_id -> number of watchers
+        self._task = None
+        self._sending = set()
+
+    def __len__(self):
+        return sum(len(group) for group in self._zones.values())
+
+    @property
+    def zones(self) -> int:
+        return len(self._zones)
+
+    # ---------------------- WATCHERS ----------------------
+    def add(self, chat_id, message_id, city: str, zone: str, bot=None, now: float = None) -> bool:
+        """Start updating a message; False when the chat already has max_per_chat watchers."""
+        if self._per_chat.get(chat_id, 0) >= self.max_per_chat:
+            return False
+        now = self.clock() if now is None else now
+        watcher = Watcher(chat_id, message_id, city, zone, bot, now + self.lifetime)
+        group = self._zones.setdefault(zone, {})
+        if (chat_id, message_id) not in group:
+            self._per_chat[chat_id] = self._per_chat.get(chat_id, 0) + 1
+        group[(chat_id, message_id)] = watcher
+        return True
+
+    def remove(self, chat_id, message_id) -> bool:
+        """Stop updating a message; False if it was not being watched."""
+        for zone, group in self._zones.items():
+            if group.pop((chat_id, message_id), None) is not None:
+                self._forget(zone, group, chat_id)
+                return True
+        return False
+
+    def _forget(self, zone, group, chat_id):
+        if not group:
+            del self._zones[zone]
+        remaining = self._per_chat[chat_id] - 1
+        if remaining:
+            self._per_chat[chat_id] = remaining
+        else:
+            del self._per_chat[chat_id]
+
+    # ---------------------- TICKS ----------------------
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        for task in list(self._sending):
+            task.cancel()
+        await asyncio.gather(*self._sending, return_exceptions=True)
+
+    async def _run(self):
+        while True:
+            # The loop sleeps on a monotonic timer and may wake a little before
+            # the wall clock turns over, so the minute is fixed up front and
+            # the sleep repeated until it has been reached.
+            minute = (self.clock() // 60 + 1) * 60
+            while (delay := minute - self.clock()) > 0:
+                await asyncio.sleep(delay)
+            try:
+                self.tick(minute)
+            except Exception as e:
+                logger.error("Watch tick failed: %s", e)
+
+    def tick(self, now: float = None):
+        """Queue one edit per live watcher showing the time at now; returns the number queued."""
+        now = self.clock() if now is None else now
+        queued = 0
+        loop = asyncio.get_running_loop()
+        for zone, group in list(self._zones.items()):
+            zone_text = None
+            texts = {}
+            for key, watcher in list(group.items()):
+                if watcher.expires <= now:
+                    del group[key]
+                    self._forget(zone, group, watcher.chat_id)
+                    continue
+                if watcher.pending is not None and not watcher.pending.done():
+                    self.skipped += 1
+                    continue
+                if zone_text is None:
+                    zone_text = self.render(zone, now)
+                text = texts.get(watcher.city)
+                if text is None:
+                    text = texts[watcher.city] = self.format_text(watcher.city, zone_text)
+                task = loop.create_task(self._deliver(watcher, text))
+                watcher.pending = task
+                self._sending.add(task)
+                task.add_done_callback(self._sending.discard)
+                queued += 1
+        return queued
+
+    async def _deliver(self, watcher: Watcher, text: str):
+        try:
+            await self.send(watcher, text)
+        except BadRequest as e:
+            if "not modified" in str(e).lower():
+                return
+            self._drop(watcher, e)
+        except Forbidden as e:
+            self._drop(watcher, e)
+        except Exception as e:
+            logger.warning("Watch edit for chat %s failed: %s", watcher.chat_id, e)
+        else:
+            self.edits += 1
+
+    def _drop(self, watcher: Watcher, reason):
+        group = self._zones.get(watcher.zone, {})
+        if group.get((watcher.chat_id, watcher.message_id)) is watcher:
+            del group[(watcher.chat_id, watcher.message_id)]
+            self._forget(watcher.zone, group, watcher.chat_id)
+            self.dropped += 1
+            logger.info("Dropped watcher in chat %s: %s", watcher.chat_id, reason)
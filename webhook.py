@@ -0,0 +1,101 @@
+"""
+Webhook mode for the Telegram bot.
+
+Telegram POSTs each update to WEBHOOK_URL. The receiver checks the secret
+token Telegram echoes back in X-Telegram-Bot-Api-Secret-Token, decodes the
+update and drops it into the Application's bounded update queue. When the
+queue is full it answers 503 so Telegram retries later instead of the bot
+buffering without limit.
+"""
+
+import asyncio
+import hmac
+import json
+import logging
+import secrets
+from http import HTTPStatus
+from urllib.parse import urlsplit
+
+from telegram import Update
+
+from httpd import Request, Response
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WEBHOOK_PATH = "/webhook"
+SECRET_HEADER = "x-telegram-bot-api-secret-token"
+
+
+def webhook_endpoint(webhook_url: str) -> tuple:
+    """Split WEBHOOK_URL into the public URL to register and the local path to serve.
+
+    A bare origin such as ``https://bot.example.com`` is served on /webhook.
+    """
+    path = urlsplit(webhook_url).path.rstrip("/")
+    if not path:
+        return webhook_url.rstrip("/") + DEFAULT_WEBHOOK_PATH, DEFAULT_WEBHOOK_PATH
+    return webhook_url, path
+
+
+class WebhookReceiver:
+    """Validates incoming webhook requests and queues the decoded updates."""
+
+    def __init__(self, application, secret_token: str):
+        self.application = application
+        self.secret_token = secret_token
+        self.accepted = 0
+        self.rejected = 0
+
+    async def handle(self, request: Request) -> Response:
+        """HTTP handler for POST <webhook path>."""
+        token = request.headers.get(SECRET_HEADER, "")
+        if not hmac.compare_digest(token.encode(), self.secret_token.encode()):
+            self.rejected += 1
+            logger.warning("Rejected webhook request with a bad secret token")
+            return Response(HTTPStatus.FORBIDDEN, b"Forbidden")
+
+        try:
+            update = Update.de_json(json.loads(request.body), self.application.bot)
+        except (ValueError, TypeError, KeyError):
+            update = None
+        if update is None:
+            self.rejected += 1
+            return Response(HTTPStatus.BAD_REQUEST, b"Bad Request")
+
+        try:
+            self.application.update_queue.put_nowait(update)
+        except asyncio.QueueFull:
+            self.rejected += 1
+            logger.warning("Update queue full, asking Telegram to retry update %s", update.update_id)
+            return Response(HTTPStatus.SERVICE_UNAVAILABLE, b"Busy")
+
+        self.accepted += 1
+        return Response(HTTPStatus.OK, b"OK")
+
+
+async def start_webhook(application, server, webhook_url: str, secret_token: str = None):
+    """Mount the receiver on server and register the webhook with Telegram.
+
+    Returns the WebhookReceiver. The server must already be listening so
+    Telegram's first delivery does not fail.
+    """
+    public_url, path = webhook_endpoint(webhook_url)
+    secret_token = secret_token or secrets.token_urlsafe(32)
+
+    receiver = WebhookReceiver(application, secret_token)
+    server.route("POST", path, receiver.handle)
+    await application.bot.set_webhook(
+        url=public_url,
+        secret_token=secret_token,
+        allowed_updates=Update.ALL_TYPES,
+    )
+    logger.info("🔗 Webhook registered at %s", public_url)
+    return receiver
+
+
+async def stop_webhook(application):
+    """Remove the webhook so a later polling run is not blocked."""
+    try:
+        await application.bot.delete_webhook()
+    except Exception:
+        logger.exception("Failed to delete webhook")